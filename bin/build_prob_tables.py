@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+"""
+Dieses Skript erzeugt alle Hilfstabellen für die Wahrscheinlichkeitsberechnung (`p_high` und `p_low`) im Voraus.
+
+Die Tabellen werden parallel in mehreren Prozessen erzeugt (je Tabelle ein Auftrag). Zu jeder fertigen Tabelle werden
+Größe, Erzeugungsdauer und SHA-256-Prüfsummen der Dateien im Manifest `manifest.json` im Tabellenordner festgehalten.
+Ein abgebrochener Lauf kann einfach neu gestartet werden: Tabellen, deren Dateien zum Manifest passen, werden
+übersprungen; bereits vorhandene Pickle-Dateien werden nur noch ins Binärformat konvertiert.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from multiprocessing import Pool
+from time import time
+
+from src import config
+from src.lib.combinations import stringify_type, CombinationType
+from src.lib.prob import tables_hi, tables_lo
+
+# Module je Tabellenart
+modules = {
+    "hi": tables_hi,
+    "lo": tables_lo,
+}
+
+
+def get_manifest_filename() -> str:
+    """
+    :return: Der Dateiname des Manifests.
+    """
+    return os.path.join(config.DATA_PATH, "prob", "manifest.json")
+
+
+def load_manifest() -> dict:
+    """
+    Lädt das Manifest.
+
+    :return: Je Tabelle (z.B. "street05_hi") die Angaben zu den Dateien; ein leeres Dict, wenn es kein Manifest gibt.
+    """
+    file = get_manifest_filename()
+    if not os.path.exists(file):
+        return {}
+    with open(file, "r") as fp:
+        return json.load(fp)
+
+
+def save_manifest(manifest: dict):
+    """
+    Speichert das Manifest (unter temporärem Namen, dann umbenannt).
+
+    :param manifest: Das Manifest.
+    """
+    file = get_manifest_filename()
+    tmp = f"{file}.tmp"
+    with open(tmp, "w") as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    os.replace(tmp, file)
+
+
+def sha256(file: str) -> str:
+    """
+    Berechnet die SHA-256-Prüfsumme einer Datei.
+
+    :param file: Der Dateiname.
+    :return: Die Prüfsumme als Hex-String.
+    """
+    h = hashlib.sha256()
+    with open(file, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_files(sfx: str, t: CombinationType, m: int) -> dict:
+    """
+    :param sfx: Art der Tabelle ("hi" oder "lo").
+    :param t: Typ der Kombination.
+    :param m: Länge der Kombination.
+    :return: Die Dateinamen der Tabelle ("pickle" und "binary").
+    """
+    module = modules[sfx]
+    return {
+        "pickle": getattr(module, f"get_filename_{sfx}")(t, m),
+        "binary": getattr(module, f"get_binary_filename_{sfx}")(t, m),
+    }
+
+
+def is_complete(entry: dict, files: dict) -> bool:
+    """
+    Prüft, ob die Dateien einer Tabelle zum Eintrag im Manifest passen.
+
+    :param entry: Der Eintrag im Manifest (oder None).
+    :param files: Die Dateinamen der Tabelle (siehe get_files()).
+    :return: True, wenn alle Dateien vorhanden sind und die Prüfsummen stimmen.
+    """
+    if not entry:
+        return False
+    for kind, file in files.items():
+        if not os.path.exists(file) or os.path.getsize(file) != entry[kind]["size"] or sha256(file) != entry[kind]["sha256"]:
+            return False
+    return True
+
+
+def init_worker():
+    """
+    Unterdrückt die Fortschrittsanzeige der Tabellengenerierung im Worker-Prozess (die Ausgaben der parallel laufenden
+    Prozesse würden sich sonst vermischen).
+    """
+    sys.stdout = open(os.devnull, "w")
+
+
+def build(task: tuple) -> tuple:
+    """
+    Erzeugt eine Tabelle (wird im Worker-Prozess ausgeführt).
+
+    :param task: Art, Typ und Länge der Tabelle.
+    :return: Der Task und der Eintrag für das Manifest.
+    """
+    sfx, t, m = task
+    module = modules[sfx]
+    files = get_files(sfx, t, m)
+    time_start = time()
+    if not os.path.exists(files["pickle"]):
+        getattr(module, f"create_table_{sfx}")(t, m)
+    if os.path.exists(files["binary"]):
+        os.remove(files["binary"])  # passt nicht zum Manifest, neu konvertieren
+    getattr(module, f"load_pattern_table_{sfx}")(t, m)
+    entry = {kind: {"size": os.path.getsize(file), "sha256": sha256(file)} for kind, file in files.items()}
+    entry["seconds"] = round(time() - time_start, 3)
+    return task, entry
+
+
+def main(args: argparse.Namespace) -> int:
+    manifest = {} if args.force else load_manifest()
+    tasks = []
+    for sfx in args.tables:
+        for t, m in getattr(modules[sfx], f"get_table_keys_{sfx}")():
+            name = f"{stringify_type(t, m)}_{sfx}"
+            if is_complete(manifest.get(name), get_files(sfx, t, m)):
+                print(f"{name:<14} vorhanden")
+            else:
+                tasks.append((sfx, t, m))
+
+    if not tasks:
+        print("Alle Tabellen sind vorhanden")
+        return 0
+
+    print(f"Erzeuge {len(tasks)} Tabellen mit {args.worker} Prozessen...")
+    time_start = time()
+    with Pool(processes=args.worker, initializer=init_worker) as pool:
+        # noinspection PyTypeChecker
+        for (sfx, t, m), entry in pool.imap_unordered(build, tasks):
+            name = f"{stringify_type(t, m)}_{sfx}"
+            manifest[name] = entry
+            save_manifest(manifest)  # nach jeder Tabelle, damit ein Abbruch nichts verliert
+            size = (entry["pickle"]["size"] + entry["binary"]["size"]) / 1024 / 1024
+            print(f"{name:<14} {entry['seconds']:10.3f} s {size:10.1f} MB")
+    print(f"Gesamtzeit: {time() - time_start:5.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Erzeugt alle Hilfstabellen für p_high und p_low (parallel, fortsetzbar).")
+    parser.add_argument("-w", "--worker", type=int, default=os.cpu_count(), help=f"Anzahl Prozesse (Default: {os.cpu_count()}).")
+    parser.add_argument("-t", "--tables", nargs="+", choices=["hi", "lo"], default=["hi", "lo"], help="Zu erzeugende Tabellenarten (Default: hi lo).")
+    parser.add_argument("-f", "--force", action="store_true", help="Ignoriert das Manifest und konvertiert bzw. prüft alle Tabellen neu.")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""
+Dieses Skript prüft die schnelle Wahrscheinlichkeitsberechnung (`p_high` und `p_low`) in realistischen Spielständen.
+
+Für zufällige Spielstände mit 30 bis 40 verfügbaren Karten werden `p_high` und `p_low` mit dem Orakel (vollständige
+Aufzählung im Rangraum, parallel in mehreren Prozessen) exakt berechnet und mit `prob_of_higher_combi_or_bomb` und
+`prob_of_lower_combi` verglichen. Ausgegeben werden die maximale Abweichung und der Durchsatz des Orakels.
+
+Da das Orakel keine Farbbomben kennt, wird `p_high` ohne Bomben mit `prob_of_higher_combi` verglichen. Für die Schranken
+von `prob_of_higher_combi_or_bomb` wird geprüft, ob sie sich mit den exakten Schranken überschneiden, die sich aus dem
+Orakel (Kombination oder 4er-Bombe) und der Wahrscheinlichkeit einer Farbbombe ergeben.
+"""
+
+import argparse
+import random
+import sys
+
+from src.lib.cards import deck, stringify_cards
+from src.lib.combinations import stringify_combination, validate_combination, CombinationType
+from src.lib.prob.prob_hi import prob_of_higher_combi, prob_of_higher_combi_or_bomb, prob_of_higher_color_bomb
+from src.lib.prob.prob_lo import prob_of_lower_combi
+from src.lib.prob.prob_oracle import oracle_probs
+
+# alle gültigen Kombinationen (ohne Passen)
+combinations = [(t, m, r) for t in CombinationType for m in range(1, 15) for r in range(17) if validate_combination((t, m, r))]
+
+
+def main(args: argparse.Namespace) -> int:
+    rnd = random.Random(args.seed)
+    max_dev_high = max_dev_low = max_violation = 0.0
+    worst = None
+    hands = vectors = 0
+    seconds = 0.0
+    for i in range(args.states):
+        n = rnd.randint(args.min_cards, args.max_cards)
+        k = rnd.randint(1, 14)
+        cards = sorted(rnd.sample(deck, n), reverse=True)
+        combis = rnd.sample(combinations, args.combis)
+        result = oracle_probs(cards, k, combis, workers=args.workers)
+        hands += result.hands
+        vectors += result.vectors
+        seconds += result.seconds
+        p_color = prob_of_higher_color_bomb(cards, k)
+        for c, combination in enumerate(combis):
+            dev_low = abs(prob_of_lower_combi(cards, k, combination) - result.p_low[c])
+            if combination[0] == CombinationType.BOMB and combination[1] >= 5:
+                dev_high = violation = 0.0  # Farbbombe (im Rangraum nicht zu erkennen)
+            else:
+                dev_high = abs(prob_of_higher_combi(cards, k, combination) - result.p_high[c])
+                p_min, p_max = prob_of_higher_combi_or_bomb(cards, k, combination)
+                lo = max(result.p_high_4[c], p_color)
+                hi = min(result.p_high_4[c] + p_color, 1.0)
+                violation = max(0.0, p_min - hi, lo - p_max)
+            if max(dev_high, dev_low, violation) > max(max_dev_high, max_dev_low, max_violation):
+                worst = (cards, k, combination)
+            max_dev_high = max(max_dev_high, dev_high)
+            max_dev_low = max(max_dev_low, dev_low)
+            max_violation = max(max_violation, violation)
+        print(f"{i + 1:3d}: n={n:2d} k={k:2d}  {result.vectors:10d} Vektoren  {result.hands:16d} Hände  {result.seconds:7.2f} s")
+
+    print(f"Maximale Abweichung p_high: {max_dev_high:.3e}")
+    print(f"Maximale Abweichung p_low:  {max_dev_low:.3e}")
+    print(f"Maximale Verletzung der Schranken von p_high (mit Bomben): {max_violation:.3e}")
+    if worst:
+        cards, k, combination = worst
+        print(f"Größte Abweichung bei: {stringify_cards(cards)}, k={k}, {stringify_combination(combination)}")
+    if seconds > 0:
+        print(f"Durchsatz: {vectors / seconds:,.0f} Vektoren/s, {hands / seconds:,.0f} Hände/s")
+    return 0 if max(max_dev_high, max_dev_low, max_violation) <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vergleicht p_high und p_low mit einer vollständigen Aufzählung.")
+    parser.add_argument("-s", "--states", type=int, default=10, help="Anzahl zufälliger Spielstände.")
+    parser.add_argument("-c", "--combis", type=int, default=20, help="Anzahl zufälliger Kombinationen je Spielstand.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Anzahl Prozesse (Standard: Anzahl CPUs).")
+    parser.add_argument("--min-cards", type=int, default=30, help="Minimale Anzahl verfügbarer Karten.")
+    parser.add_argument("--max-cards", type=int, default=40, help="Maximale Anzahl verfügbarer Karten.")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Erlaubte Abweichung.")
+    parser.add_argument("--seed", type=int, default=None, help="Startwert des Zufallsgenerators.")
+    sys.exit(main(parser.parse_args()))
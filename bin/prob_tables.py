@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+"""
+Dieses Skript blendet die Hilfstabellen für die Wahrscheinlichkeitsberechnung (`p_high` und `p_low`) ein und prüft sie.
+
+Fehlende Binärdateien werden dabei aus den Pickle-Dateien erzeugt. Ein Aufruf vor dem Start der Arena oder des Servers
+sorgt dafür, dass die Tabellen im Page-Cache liegen und kein Prozess sie beim ersten Zugriff konvertieren muss.
+"""
+
+import argparse
+import sys
+from time import time
+
+from src.lib.combinations import stringify_type
+from src.lib.prob.tables_hi import preload_tables_hi
+from src.lib.prob.tables_lo import preload_tables_lo
+
+
+def main(args: argparse.Namespace) -> int:
+    time_start = time()
+    failed = [(t, m, "hi") for t, m in preload_tables_hi(verify=args.verify)]
+    failed += [(t, m, "lo") for t, m in preload_tables_lo(verify=args.verify)]
+    print(f"Dauer: {time() - time_start:5.3f} s")
+    if failed:
+        print(f"Fehlende oder fehlerhafte Tabellen: {', '.join(f'{stringify_type(t, m)}_{sfx}' for t, m, sfx in failed)}")
+        return 1
+    print("Alle Tabellen ok")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blendet die Hilfstabellen für p_high und p_low ein und prüft sie.")
+    parser.add_argument("--verify", action="store_true", help="Prüft zusätzlich die Konsistenz jeder Tabelle (liest alle Seiten).")
+    sys.exit(main(parser.parse_args()))
@@ -45,7 +45,7 @@ def main(args: argparse.Namespace):
     print("--- Los gehts ---")
 
     # Wettkampf durchführen
-    arena = Arena(agents=agents, max_games=args.max_games, worker=args.worker, verbose=args.verbose)
+    arena = Arena(agents=agents, max_games=args.max_games, worker=args.worker, shared_cache_size=args.cache_size, verbose=args.verbose)
     arena.run()
 
     # Ergebnis auswerten
@@ -56,6 +56,10 @@ def main(args: argparse.Namespace):
     print(f"Zeit/Runde: {arena.seconds * 1000 / arena.rounds:5.3f} ms")
     print(f"Runden/Partie: {arena.rounds / arena.games:2.1f}")
     print(f"Stiche/Runde: {arena.tricks / arena.rounds:2.1f}")
+    if arena.cache_hits + arena.cache_misses:
+        print(f"Cache-Trefferquote: {arena.cache_hits * 100 / (arena.cache_hits + arena.cache_misses):4.1f} % ({arena.cache_hits} Treffer, {arena.cache_misses} Fehltreffer)")
+        if arena.cache_rejected:
+            print(f"Nicht gespeichert (zu groß): {arena.cache_rejected}")
     print("--- Ergebnis ---")
     wins, lost, draws = arena.rating
     print(f"Team 20 gewonnen: {wins:>5d} - {wins * 100 / arena.games:4.1f} %")
@@ -75,6 +79,7 @@ if __name__ == "__main__":
     parser.add_argument("agent4", nargs="?", default="RandomAgent", help="Agent 4 (Default: RandomAgent).")
     parser.add_argument("-n", "--max-games", type=int, default=10, help=f"Maximale Anzahl der zu spielenden Partien (Default: {10}).")
     parser.add_argument("-w", "--worker", type=int, default=config.ARENA_WORKER, help=f"Wenn größer 1, werden die Partien in entsprechend vielen Prozessen parallel ausgeführt (Default: {config.ARENA_WORKER}).")
+    parser.add_argument("-c", "--cache-size", type=int, default=config.ARENA_SHARED_CACHE_SIZE, help=f"Anzahl Einträge im prozessübergreifenden Cache für Kombinationen und Partitionen; 0 = kein Cache (Default: {config.ARENA_SHARED_CACHE_SIZE}).")
     parser.add_argument("-v", "--verbose", action="store_true", help=f"Spielverlauf ausführlich anzeigen.")
 
     # Main-Routine starten
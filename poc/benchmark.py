@@ -63,6 +63,29 @@ def benchmark_build_combinations():
     # 2.228ms per loop
 
 
+def benchmark_build_streets():
+    # Straßen und Farbbomben werden per Belegungszähler über das Rang-Histogramm gebildet, jede Straße genau einmal.
+    # Die Zeit pro Straße sollte daher auch bei Phönix- und Bomben-lastigen Händen ungefähr konstant bleiben.
+    # noinspection PyProtectedMember
+    from src.lib.combinations import _build_streets
+    for hand in ('Ph GK BD RB RZ R9 R8 R7 R6 B5 G4 G3 B2 Ma',
+                 'S6 R6 G6 B5 S5 R4 G4 B3 S3 R3 G2 B2 S2 Ph',
+                 'R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph',  # 3 Bomben + Phönix
+                 'Ph SA GA SK GK SD GD SB GB SZ GZ S9 G9 Ma',  # 2 Farben über 10 Ränge
+                 'Ph S9 G9 B9 S8 G8 B8 S7 G7 B7 S6 G6 B6 S5'):  # 3 Farben über 5 Ränge
+        cards = parse_cards(hand)
+        cards.sort(reverse=True)
+        bombs, streets = _build_streets(cards, True)
+        count = len(bombs) + len(streets)
+        t = timeit(lambda: _build_streets(cards, True), number=1000)
+        print(f'_build_streets({hand}), {count:4d} Straßen/Farbbomben: {t:5.3f} ms per loop, {t * 1000 / count:5.3f} µs pro Straße')
+    # 355 Straßen/Farbbomben: 0.312 ms per loop, 0.879 µs pro Straße (vorher 0.278 ms, 355 Straßen)
+    # 432 Straßen/Farbbomben: 0.541 ms per loop, 1.252 µs pro Straße (vorher 0.809 ms, 684 Straßen inkl. Duplikate)
+    #  64 Straßen/Farbbomben: 0.119 ms per loop, 1.856 µs pro Straße (vorher 0.324 ms, 64 Straßen)
+    # 528 Straßen/Farbbomben: 0.576 ms per loop, 1.091 µs pro Straße (vorher 0.998 ms, 976 Straßen inkl. Duplikate)
+    # 351 Straßen/Farbbomben: 0.402 ms per loop, 1.144 µs pro Straße (vorher 0.660 ms, 513 Straßen inkl. Duplikate)
+
+
 def remove_list_items():
     arr = [(10, False), (30, False), (1, True), (5, True), (70, False), (9, True)]
 
@@ -7,6 +7,7 @@ from multiprocessing import Pool, Manager, cpu_count
 from src import config
 from src.common.logger import logger
 from src.game_engine import GameEngine
+from src.lib.shared_cache import SharedCache, attach_shared_cache, detach_shared_cache
 from src.players.agent import Agent
 from src.public_state import PublicState
 from time import time
@@ -38,6 +39,7 @@ class Arena:
     def __init__(self, agents: list[Agent], max_games: int, verbose: bool = False,
                  early_stopping: bool = False, win_rate: float = config.ARENA_WIN_RATE,
                  worker: int = config.ARENA_WORKER,
+                 shared_cache_size: int = config.ARENA_SHARED_CACHE_SIZE,
                  seed: int = None):
         """
             Initialisiert eine neue Instanz der Arena-Klasse.
@@ -51,6 +53,7 @@ class Arena:
             :param early_stopping: Wenn True, wird der Wettkampf abgebrochen, sobald die gewünschte Gewinnquote erreicht oder nicht mehr erreicht werden kann.
             :param win_rate: Gewünschte Gewinnquote (WIN / (WIN + LOST)); wird nur verwendet, wenn early_stopping gesetzt ist.
             :param worker: Wenn größer 1, werden die Partien in entsprechend vielen Prozessen parallel ausgeführt.
+            :param shared_cache_size: Wenn größer 0, teilen sich die Prozesse einen Cache mit entsprechend vielen Einträgen für die Kombinationen und Partitionen der Hände.
             :param seed: Seed für den Zufallsgenerator.
             :raises AssertionError: Falls die Anzahl der Agenten nicht 4 beträgt.
             """
@@ -61,6 +64,7 @@ class Arena:
         self._early_stopping = early_stopping
         self._win_rate = win_rate
         self._worker = worker
+        self._shared_cache_size = shared_cache_size
         self._seed = seed
         self._stop_event = Manager().Event() if worker > 1 else asyncio.Event()  # Event zum Unterbrechen der Partie
         #self._progbar = Progbar(max_games, stateful_metrics=["Wins", "Lost", "Draws"])
@@ -71,6 +75,9 @@ class Arena:
         self._rounds: int = 0  # Rundenzähler über alle Partien
         self._tricks: int = 0  # Stichzähler über alle Partien
         self._rating = [0, 0, 0]  # Kumulative Bewertung des Teams 20 (Anzahl Partien gewonnenen, verloren, unentschieden)
+        self._cache_hits: int = 0  # Treffer im prozessübergreifenden Cache
+        self._cache_misses: int = 0  # Fehltreffer im prozessübergreifenden Cache
+        self._cache_rejected: int = 0  # Nutzdaten, die zu groß für den prozessübergreifenden Cache waren
 
     def run(self):
         """
@@ -82,18 +89,33 @@ class Arena:
         #if not self._verbose:
         #    self._progbar.update(0, values=[("Wins", 0), ("Lost", 0), ("Draws", 0)])
 
-        if self._worker > 1:
-            pool = Pool(processes=self._worker)
-            for game_index in range(self._max_games):
-                pool.apply_async(self._play_game, args=(game_index,), callback=self._update)
-            # processes = [pool.apply_async(self._play_game, args=(game_index,)) for game_index in range(max_games)]
-            # for p in processes:
-            #     self._update(p.get())
-            pool.close()  # verhindert, dass weitere Aufgaben an den Pool gesendet werden
-            pool.join()  # warten, bis die Worker-Prozesse beendet sind
-        else:  # worker == 1
-            for game_index in range(self._max_games):
-                self._update(self._play_game(game_index))
+        # Prozessübergreifender Cache (die Worker-Prozesse blenden die Cache-Datei beim Start ein)
+        cache = SharedCache.create(size=self._shared_cache_size) if self._shared_cache_size > 0 else None
+        try:
+            if self._worker > 1:
+                if cache is not None:
+                    pool = Pool(processes=self._worker, initializer=attach_shared_cache, initargs=(cache.path,))
+                else:
+                    pool = Pool(processes=self._worker)
+                for game_index in range(self._max_games):
+                    pool.apply_async(self._play_game, args=(game_index,), callback=self._update)
+                # processes = [pool.apply_async(self._play_game, args=(game_index,)) for game_index in range(max_games)]
+                # for p in processes:
+                #     self._update(p.get())
+                pool.close()  # verhindert, dass weitere Aufgaben an den Pool gesendet werden
+                pool.join()  # warten, bis die Worker-Prozesse beendet sind
+            else:  # worker == 1
+                if cache is not None:
+                    attach_shared_cache(cache.path)
+                for game_index in range(self._max_games):
+                    self._update(self._play_game(game_index))
+        finally:
+            if cache is not None:
+                detach_shared_cache()
+                self._cache_hits = cache.hits
+                self._cache_misses = cache.misses
+                self._cache_rejected = cache.rejected
+                cache.close(unlink=True)
 
         if self._verbose:  # pragma: no cover
             print("\r ")
@@ -205,6 +227,27 @@ class Arena:
         """
         return self._tricks
 
+    @property
+    def cache_hits(self) -> int:
+        """
+        Anzahl Treffer im prozessübergreifenden Cache (Näherungswert)
+        """
+        return self._cache_hits
+
+    @property
+    def cache_misses(self) -> int:
+        """
+        Anzahl Fehltreffer im prozessübergreifenden Cache (Näherungswert)
+        """
+        return self._cache_misses
+
+    @property
+    def cache_rejected(self) -> int:
+        """
+        Anzahl Nutzdaten, die zu groß für den prozessübergreifenden Cache waren (Näherungswert)
+        """
+        return self._cache_rejected
+
     @property
     def rating(self) -> list:
         """
@@ -92,6 +92,7 @@ logger.setLevel(config.LOG_LEVEL)
 # Erstelle einen Handler für das Schreiben in eine Datei
 #file_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "logs", "app.log"))
 file_path = os.path.join(config.DATA_PATH, "logs", "app.log")
+os.makedirs(os.path.dirname(file_path), exist_ok=True)  # das Verzeichnis wird nicht versioniert
 file_handler = TimedRotatingFileHandler(file_path, when="midnight", interval=1, backupCount=config.LOG_COUNT)
 file_handler.setLevel(config.LOG_LEVEL)
 
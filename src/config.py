@@ -104,6 +104,22 @@ ARENA_WORKER = int(os.getenv("ARENA_WORKER", 1))
 Anzahl Prozesse für die Arena.
 """
 
+ARENA_SHARED_CACHE_SIZE = int(os.getenv("ARENA_SHARED_CACHE_SIZE", 0))
+"""
+Maximale Anzahl Einträge im prozessübergreifenden Cache für Kombinationen und Partitionen (0 == kein Cache).
+"""
+
+PROB_CACHE_SIZE = int(os.getenv("PROB_CACHE_SIZE", 100000))
+"""
+Maximale Anzahl Einträge im Cache für die Wahrscheinlichkeiten p_high und p_low je Prozess (0 == kein Cache).
+"""
+
+STATISTIC_CACHE_SIZE = int(os.getenv("STATISTIC_CACHE_SIZE", 2000))
+"""
+Maximale Anzahl Kartenverteilungen im Cache für die Statistik der Kombinationen je Prozess (0 == kein Cache).
+Ein Eintrag belegt etwa 16 KiB.
+"""
+
 ARENA_WIN_RATE = 0.6
 """
 Gewünschte Gewinnquote WIN / (WIN + LOST).
@@ -125,6 +141,12 @@ PARTITIONS_MAXLEN = 2000
 Maximale Anzahl mögliche Partitionen, die pro Hand berechnet werden.
 """
 
+HEURISTIC_PARTITION_SEARCH_NODES = 10000
+"""
+Maximale Anzahl Knoten bei der Suche nach der besten Partition (None == unbegrenzt).
+Anders als ein Zeitbudget hängt das Ergebnis damit nicht von der Rechnerlast ab (reproduzierbare Spiele).
+"""
+
 HEURISTIC_TICHU_QUALITY = [0.6, 0.7]
 """
 Mindestwert für die Güte bei der Tichu-Ansage (kleines, großes).
@@ -8,7 +8,7 @@ from copy import copy
 from src import config
 from src.common.logger import logger
 from src.common.rand import Random
-from src.lib.cards import deck, is_wish_in, sum_card_points, other_cards, CARD_DRA, CARD_MAH, Cards, stringify_cards
+from src.lib.cards import deck, is_wish_in, sum_card_points, other_cards, CARD_DRA, CARD_MAH, Cards, stringify_cards, cards_to_mask
 from src.lib.combinations import CombinationType, Combination
 from src.lib.errors import ErrorCode, PlayerInterruptError
 from src.players.agent import Agent
@@ -451,10 +451,12 @@ class GameEngine:
                         # Kombination ausspielen, falls nicht gepasst wurde
                         if combination[0] != CombinationType.PASS:
                             # Handkarten aktualisieren
+                            cards_mask = cards_to_mask(cards)
+                            assert privs[pub.current_turn_index].hand_mask & cards_mask == cards_mask  # die Karten müssen auf der Hand sein
                             assert pub.count_hand_cards[pub.current_turn_index] == len(privs[pub.current_turn_index].hand_cards)
                             assert pub.count_hand_cards[pub.current_turn_index] >= combination[1]
                             pub.count_hand_cards[pub.current_turn_index] -= combination[1]
-                            privs[pub.current_turn_index].hand_cards = [card for card in privs[pub.current_turn_index].hand_cards if card not in cards]
+                            privs[pub.current_turn_index].remove_hand_cards(cards)
                             assert pub.count_hand_cards[pub.current_turn_index] == len(privs[pub.current_turn_index].hand_cards)
 
                             # Stich aktualisieren
@@ -472,8 +474,9 @@ class GameEngine:
                             assert -25 <= pub.trick_points <= 125
 
                             # Gespielte Karten merken
-                            assert not set(cards).intersection(pub.played_cards), f"cards: {stringify_cards(cards)},  played_cards: {stringify_cards(pub.played_cards)}"  # darf keine Schnittmenge bilden
+                            assert not cards_mask & pub.played_mask, f"cards: {stringify_cards(cards)},  played_cards: {stringify_cards(pub.played_cards)}"  # darf keine Schnittmenge bilden
                             pub.played_cards += cards
+                            pub.played_mask |= cards_mask
 
                             # Ist der erste Spieler fertig?
                             if pub.count_hand_cards[pub.current_turn_index] == 0:
@@ -711,7 +714,7 @@ class GameEngine:
         assert len(schupf_cards) == 3
         pub.count_hand_cards[player_index] = 11
         priv.given_schupf_cards = schupf_cards
-        priv.hand_cards = [card for card in priv.hand_cards if card not in priv.given_schupf_cards]
+        priv.remove_hand_cards(priv.given_schupf_cards)
         assert len(priv.hand_cards) == 11
 
         if clients_joined:
@@ -5,7 +5,7 @@ Replay-Simulator für die Tichu-Datenbank
 __all__ =  "replay_simulator"
 
 from src.lib.bsw.database import GameEntity
-from src.lib.cards import Cards, CARD_MAH, sum_card_points, is_wish_in
+from src.lib.cards import Cards, CARD_MAH, sum_card_points, is_wish_in, cards_to_mask
 from src.lib.combinations import Combination, CombinationType, get_trick_combination
 from src.public_state import PublicState
 from src.private_state import PrivateState
@@ -78,7 +78,7 @@ def replay_simulator(game: GameEntity) -> Generator[Tuple[PublicState, PrivateSt
             #  yield pub, priv, (schupf_cards[0], schupf_cards[1], schupf_cards[2])
             pub.count_hand_cards[player_index] = 11
             priv.given_schupf_cards = schupf_cards[0], schupf_cards[1], schupf_cards[2]
-            priv.hand_cards = [card for card in priv.hand_cards if card not in priv.given_schupf_cards]
+            priv.remove_hand_cards(priv.given_schupf_cards)
             assert len(priv.hand_cards) == 11
 
         # Tauscharten aufnehmen
@@ -139,7 +139,7 @@ def replay_simulator(game: GameEntity) -> Generator[Tuple[PublicState, PrivateSt
             if combination[0] != CombinationType.PASS:
                 # Handkarten aktualisieren
                 pub.count_hand_cards[pub.current_turn_index] -= combination[1]
-                priv.hand_cards = [card for card in priv.hand_cards if card not in cards]
+                priv.remove_hand_cards(cards)
 
                 # Stich aktualisieren
                 pub.trick_owner_index = pub.current_turn_index
@@ -154,6 +154,7 @@ def replay_simulator(game: GameEntity) -> Generator[Tuple[PublicState, PrivateSt
 
                 # Gespielte Karten merken
                 pub.played_cards += cards
+                pub.played_mask |= cards_to_mask(cards)
 
                 # Ist der erste Spieler fertig?
                 if pub.count_hand_cards[pub.current_turn_index] == 0:
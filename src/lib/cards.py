@@ -6,11 +6,15 @@ __all__ = "CardSuit", "Card", "Cards", \
     "CARD_DOG", "CARD_MAH", "CARD_DRA", "CARD_PHO", \
     "deck", \
     "validate_card", "validate_cards", "parse_card", "parse_cards", "stringify_card", "stringify_cards", \
-    "ranks_to_vector", "cards_to_vector", \
-    "is_wish_in", "sum_card_points", "other_cards",
+    "ranks_to_vector", "cards_to_vector", "ranks_to_vectors", "cards_to_vectors", \
+    "is_wish_in", "sum_card_points", "other_cards", \
+    "CardSet", "MASK_DOG", "MASK_MAH", "MASK_DRA", "MASK_PHO", "MASK_DECK", "MASK_RANKS", \
+    "card_to_mask", "cards_to_mask", "mask_to_cards", "is_card_in_mask", "count_cards_in_mask", \
+    "SuitPermutation", "canonicalize_suits", "permute_suits", "permute_cards", "invert_suit_permutation",
 
 import enum
-from typing import Tuple, List, Iterable
+import numpy as np
+from typing import Tuple, List, Iterable, Sequence, Union, Optional
 
 # ------------------------------------------------------
 # Spielkarten
@@ -107,6 +111,12 @@ _card_points = (
 )
 """Zuordnung von Kartenwert zu Punkten."""
 
+_card_index = {card: i for i, card in enumerate(deck)}
+"""Zuordnung von Karte zu Index im Kartendeck."""
+
+_label_index = {label: i for i, label in enumerate(_card_labels)}
+"""Zuordnung von Kartenlabel zu Index im Kartendeck."""
+
 
 def validate_card(label: str) -> bool:
     """
@@ -115,7 +125,7 @@ def validate_card(label: str) -> bool:
     :param label: Das Label der Karte, z.B. "R6".
     :return: True, wenn das Label bekannt ist, sonst False.
     """
-    return label in _card_labels
+    return label in _label_index
 
 
 def validate_cards(labels: str) -> bool:
@@ -125,7 +135,7 @@ def validate_cards(labels: str) -> bool:
     :param labels: Die Kartenlabels, z.B. "R6 B5 G4"
     :return: True, wenn alle Karten bekannt sind, sonst False.
     """
-    return all(label in _card_labels for label in labels.split(" ")) if labels else True
+    return all(label in _label_index for label in labels.split(" ")) if labels else True
 
 
 def parse_card(label: str) -> Card:
@@ -135,7 +145,10 @@ def parse_card(label: str) -> Card:
    :param label: Das Label der Karte, z.B. "R6".
    :return: Die geparste Karte (mit Wert und Farbe).
    """
-   return deck[_card_labels.index(label)]
+   i = _label_index.get(label)
+   if i is None:
+       raise ValueError(f"Unbekanntes Kartenlabel: {label}")
+   return deck[i]
 
 
 def parse_cards(labels: str) -> Cards:
@@ -145,7 +158,7 @@ def parse_cards(labels: str) -> Cards:
     :param labels: Die Labels der Karten mit Leerzeichen getrennt, z.B. "R6 B5 G4".
     :return: Liste der Karten.
     """
-    return [deck[_card_labels.index(label)] for label in labels.split(" ")] if labels else []
+    return [parse_card(label) for label in labels.split(" ")] if labels else []
 
 
 def stringify_card(card: Card) -> str:
@@ -155,7 +168,7 @@ def stringify_card(card: Card) -> str:
     :param card: Die Karte (Wert und Farbe), z.B. (8,3).
     :return: Das Label der Karte.
     """
-    return _card_labels[deck.index(card)]
+    return _card_labels[_card_index[card]]
 
 
 def stringify_cards(cards: Iterable[Card]) -> str:
@@ -165,7 +178,7 @@ def stringify_cards(cards: Iterable[Card]) -> str:
     :param cards: Die Karten, z.B. [[8,3], [2,4], [0,1]].
     :return: Die Labels der Karte mit Leerzeichen getrennt.
     """
-    return " ".join([_card_labels[deck.index(card)] for card in cards])
+    return " ".join([_card_labels[_card_index[card]] for card in cards])
 
 
 def ranks_to_vector(cards: Cards) -> list[int]:
@@ -199,14 +212,65 @@ def cards_to_vector(cards: Cards) -> list[int]:
     # r=Hu Ma  2  2  2  2  3  3  3  3  4  4  4  4  5  5  5  5  6  6  6  6  7  7  7  7  8  8  8  8  9  9  9  9 10 10 10 10 Bu Bu Bu Bu Da Da Da Da Kö Kö Kö Kö As As As As Dr Ph
     # i= 0  1  2  3  4  5  6  7  8  9 10 11 12 13 14 15 16 17 18 19 20 21 22 23 24 25 26 27 28 29 30 31 32 33 34 35 36 37 38 39 40 41 42 43 44 45 46 47 48 49 50 51 52 53 54 55
     h = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    for r, c in cards:
-        if c > 0:
-            h[(r - 2) * 4 + c + 1] = 1
-        else:
-            h[r if r < 2 else r + 39] = 1
+    for card in cards:
+        h[_card_index[card]] = 1
     return h
 
 
+def _hands_to_bits(hands: Union[Sequence[Cards], Sequence[int], np.ndarray]) -> np.ndarray:
+    """
+    Wandelt mehrere Hände in eine Bit-Matrix um.
+
+    :param hands: Die Hände, entweder als Listen von Karten oder als Bitmasken (Liste von int oder NumPy-Array).
+    :return: Array der Form (N, 56) mit dtype uint8.
+    """
+    n = len(hands)
+    if not isinstance(hands, np.ndarray) and n and not isinstance(hands[0], (int, np.integer)):
+        hands = [cards_to_mask(cards) for cards in hands]
+    masks = np.asarray(hands, dtype=np.uint64).reshape(n).astype("<u8")  # Little-Endian, damit Byte 0 die Bits 0 bis 7 enthält
+    return np.unpackbits(masks.view(np.uint8).reshape(n, 8), axis=1, count=56, bitorder="little")
+
+
+def ranks_to_vectors(hands: Union[Sequence[Cards], Sequence[int], np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Zählt die Anzahl der Karten je Rang für mehrere Hände (Batch-Variante von ranks_to_vector()).
+
+    Am schnellsten ist die Übergabe als Bitmasken (siehe cards_to_mask()).
+
+    :param hands: Die Hände, entweder als Listen von Karten oder als Bitmasken (Liste von int oder NumPy-Array).
+    :param out: (Optional) Vorab angelegtes Array der Form (N, 17) mit dtype int8, in das geschrieben wird.
+    :return: Array der Form (N, 17) mit dtype int8 (Index = Rang, Wert = Anzahl der Karten).
+    """
+    bits = _hands_to_bits(hands)
+    n = len(bits)
+    if out is None:
+        out = np.empty((n, 17), dtype=np.int8)
+    else:
+        assert out.shape == (n, 17) and out.dtype == np.int8
+    out[:, 0:2] = bits[:, 0:2]  # Hund, Mahjong
+    np.sum(bits[:, 2:54].reshape(n, 13, 4), axis=2, dtype=np.int8, out=out[:, 2:15])  # 2 bis As (je 4 Farben)
+    out[:, 15:17] = bits[:, 54:56]  # Drache, Phönix
+    return out
+
+
+def cards_to_vectors(hands: Union[Sequence[Cards], Sequence[int], np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Wandelt mehrere Hände in Vektoren um (Batch-Variante von cards_to_vector()).
+
+    Am schnellsten ist die Übergabe als Bitmasken (siehe cards_to_mask()).
+
+    :param hands: Die Hände, entweder als Listen von Karten oder als Bitmasken (Liste von int oder NumPy-Array).
+    :param out: (Optional) Vorab angelegtes Array der Form (N, 56) mit dtype uint8, in das geschrieben wird.
+    :return: Array der Form (N, 56) mit dtype uint8 (Index = Karte im sortierten Deck, Wert = 1, wenn die Karte vorhanden ist).
+    """
+    bits = _hands_to_bits(hands)
+    if out is None:
+        return bits
+    assert out.shape == bits.shape and out.dtype == np.uint8
+    out[:] = bits
+    return out
+
+
 def is_wish_in(wish: int, cards: Cards) -> bool:
     """
     Ermittelt, ob der gewünschte Kartenwert unter den Karten ist.
@@ -241,4 +305,188 @@ def other_cards(cards: Cards) -> List[Card]:
     :param cards: Die Karten, aus denen die fehlenden Karten ermittelt werden.
     :return: Die Karten, die nicht in der übergebenen Liste vorkommen.
     """
-    return [card for card in deck if card not in cards]
+    return mask_to_cards(MASK_DECK & ~cards_to_mask(cards))
+
+
+# ------------------------------------------------------
+# Kartenmenge als Bitmaske
+# ------------------------------------------------------
+
+CardSet = int
+"""
+Type-Alias für eine Kartenmenge als 56-Bit-Maske.
+
+Bit i ist gesetzt, wenn die Karte deck[i] in der Menge enthalten ist. Vereinigung (|), Differenz (& ~),
+Schnittmenge (&) und Enthaltensein sind damit Bitoperationen, die Anzahl der Karten ist der Popcount.
+"""
+
+MASK_DOG: CardSet = 1 << 0
+"""Bitmaske für den Hund"""
+
+MASK_MAH: CardSet = 1 << 1
+"""Bitmaske für den Mahjong"""
+
+MASK_DRA: CardSet = 1 << 54
+"""Bitmaske für den Drachen"""
+
+MASK_PHO: CardSet = 1 << 55
+"""Bitmaske für den Phönix"""
+
+MASK_DECK: CardSet = (1 << 56) - 1
+"""Bitmaske für das gesamte Kartendeck"""
+
+MASK_RANKS = tuple(sum(1 << i for i, card in enumerate(deck) if card[0] == r) for r in range(17))
+"""Bitmasken je Rang (Index = Rang, 0 = Hund bis 16 = Phönix)."""
+
+_card_masks = {card: 1 << i for i, card in enumerate(deck)}
+"""Zuordnung von Karte zu Bitmaske."""
+
+
+def card_to_mask(card: Card) -> CardSet:
+    """
+    Ermittelt die Bitmaske einer Karte.
+
+    :param card: Die Karte, z.B. (8,3).
+    :return: Die Bitmaske mit genau einem gesetzten Bit.
+    """
+    return _card_masks[card]
+
+
+def cards_to_mask(cards: Iterable[Card]) -> CardSet:
+    """
+    Wandelt die Karten in eine Bitmaske um.
+
+    :param cards: Die Karten.
+    :return: Die Kartenmenge als Bitmaske.
+    """
+    mask = 0
+    for card in cards:
+        mask |= _card_masks[card]
+    return mask
+
+
+def mask_to_cards(mask: CardSet, descending: bool = False) -> Cards:
+    """
+    Wandelt die Bitmaske in eine Liste von Karten um.
+
+    :param mask: Die Kartenmenge als Bitmaske.
+    :param descending: Wenn True, werden die Karten absteigend sortiert, ansonsten aufsteigend (wie im Kartendeck).
+    :return: Die Karten.
+    """
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(deck[low.bit_length() - 1])
+        mask ^= low
+    if descending:
+        cards.reverse()
+    return cards
+
+
+def is_card_in_mask(card: Card, mask: CardSet) -> bool:
+    """
+    Ermittelt, ob die Karte in der Kartenmenge enthalten ist.
+
+    :param card: Die Karte.
+    :param mask: Die Kartenmenge als Bitmaske.
+    :return: True, wenn die Karte enthalten ist.
+    """
+    return bool(mask & _card_masks[card])
+
+
+def count_cards_in_mask(mask: CardSet) -> int:
+    """
+    Zählt die Karten in der Kartenmenge.
+
+    :param mask: Die Kartenmenge als Bitmaske.
+    :return: Die Anzahl der Karten.
+    """
+    return mask.bit_count()
+
+
+# ------------------------------------------------------
+# Farbisomorphie
+# ------------------------------------------------------
+
+# Kombinationen, Partitionen und die meisten Statistiken ändern sich nicht, wenn die vier Farben vertauscht werden
+# (eine Farbbombe bleibt eine Farbbombe, nur ihre Farbe ändert sich). Bis zu 24 Hände sind daher gleichwertig.
+# Die kanonische Form ordnet die Farben absteigend nach ihrer Belegung (Hand, dann Kontext), sodass gleichwertige
+# Hände dieselbe Bitmaske erhalten und sich einen Cache-Eintrag teilen können.
+
+SuitPermutation = Tuple[int, int, int, int, int]
+"""
+Type-Alias für eine Farbpermutation.
+
+Index ist die bisherige Farbe, Wert die neue Farbe. Die Sonderkarten (Farbe 0) bleiben unverändert, z.B. (0, 3, 1, 4, 2).
+"""
+
+_MASK_SUIT: CardSet = sum(1 << i for i, card in enumerate(deck) if card[1] == CardSuit.SWORD)
+"""Bitmaske der Karten 2 bis As in der ersten Farbe (die anderen Farben liegen jeweils 1 Bit höher)"""
+
+_MASK_SPECIAL: CardSet = MASK_DOG | MASK_MAH | MASK_DRA | MASK_PHO
+"""Bitmaske der Sonderkarten"""
+
+_suits = tuple(CardSuit)
+"""Farben nach Index"""
+
+
+def canonicalize_suits(hand: CardSet, context: CardSet = 0) -> Tuple[CardSet, CardSet, SuitPermutation]:
+    """
+    Bringt die Farben der Hand in die kanonische Reihenfolge.
+
+    Die Farben werden absteigend nach den Rängen sortiert, die die Hand in der Farbe hat; bei Gleichstand entscheiden
+    die Ränge im Kontext (z.B. die ungespielten Karten).
+
+    :param hand: Die Handkarten als Bitmaske.
+    :param context: (Optional) Weitere Karten als Bitmaske, die mit derselben Permutation umgeformt werden.
+    :return: Die kanonische Hand, der kanonische Kontext und die angewendete Farbpermutation.
+    """
+    keys = sorted((((hand >> (c - 1)) & _MASK_SUIT, (context >> (c - 1)) & _MASK_SUIT, c) for c in range(1, 5)), reverse=True)
+    perm = [0, 0, 0, 0, 0]
+    canonical_hand = hand & _MASK_SPECIAL
+    canonical_context = context & _MASK_SPECIAL
+    for i, (hand_bits, context_bits, c) in enumerate(keys):
+        perm[c] = i + 1
+        canonical_hand |= hand_bits << i
+        canonical_context |= context_bits << i
+    # noinspection PyTypeChecker
+    return canonical_hand, canonical_context, tuple(perm)
+
+
+def permute_suits(mask: CardSet, perm: SuitPermutation) -> CardSet:
+    """
+    Vertauscht die Farben einer Kartenmenge.
+
+    :param mask: Die Kartenmenge als Bitmaske.
+    :param perm: Die Farbpermutation.
+    :return: Die Kartenmenge mit vertauschten Farben.
+    """
+    result = mask & _MASK_SPECIAL
+    for c in range(1, 5):
+        result |= ((mask >> (c - 1)) & _MASK_SUIT) << (perm[c] - 1)
+    return result
+
+
+def permute_cards(cards: Iterable[Card], perm: SuitPermutation) -> Cards:
+    """
+    Vertauscht die Farben der Karten.
+
+    :param cards: Die Karten.
+    :param perm: Die Farbpermutation.
+    :return: Die Karten mit vertauschten Farben (in derselben Reihenfolge).
+    """
+    return [(v, _suits[perm[c]]) for v, c in cards]
+
+
+def invert_suit_permutation(perm: SuitPermutation) -> SuitPermutation:
+    """
+    Ermittelt die Umkehrung einer Farbpermutation (um kanonische Ergebnisse zurückzuübertragen).
+
+    :param perm: Die Farbpermutation.
+    :return: Die inverse Farbpermutation.
+    """
+    inverse = [0, 0, 0, 0, 0]
+    for c in range(5):
+        inverse[perm[c]] = c
+    # noinspection PyTypeChecker
+    return tuple(inverse)
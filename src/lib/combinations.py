@@ -5,11 +5,16 @@ Dieses Modul definiert die Logik zur Erkennung und Verarbeitung von Kartenkombin
 __all__ = "CombinationType", "Combination",  \
     "validate_combination", "stringify_combination", "stringify_type", "get_trick_combination", \
     "build_combinations", "remove_combinations", \
-    "build_action_space",
+    "ActionSpaceIndex", "build_action_space_index", "build_action_space", "build_responses", \
+    "contains_bomb", "build_bombs", \
+    "CombinationId", "CombinationInfo", "get_combination_id", "get_combination_ids", "get_combination_by_id", "get_combination_info", "beats",
 
 import enum
-from src.lib.cards import CARD_DOG, CARD_PHO, is_wish_in, Cards, CardSuit
-from typing import Tuple, List
+import numpy as np
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from src.lib.cards import CARD_PHO, MASK_DECK, is_wish_in, cards_to_mask, deck, Card, Cards, CardSet, CardSuit
+from typing import Tuple, List, Dict, Optional, Any
 
 # ------------------------------------------------------
 # Kartenkombinationen
@@ -228,72 +233,204 @@ def get_trick_combination(cards: Cards, trick_rank: int, shift_phoenix: bool = F
     return t, n, v
 
 
-def build_combinations(hand: Cards) -> List[Tuple[Cards, Combination]]:
+# ------------------------------------------------------
+# Kombinations-IDs
+# ------------------------------------------------------
+
+# Es gibt nur 227 gültige Kombinationen (Typ, Länge, Rang) inklusive Passen. Jede Kombination erhält eine fortlaufende
+# ID (passt in uint8); die IDs sind nach Typ, Länge und Rang aufsteigend vergeben. Das zugehörige Tupel wird nur einmal
+# angelegt (interniert) und von build_combinations() wiederverwendet. Ob eine Kombination einen Stich überstechen kann,
+# ist in einer Tabelle vorberechnet, sodass in heißen Schleifen nur kleine Ganzzahlen verglichen werden.
+
+CombinationId = int
+"""
+Type-Alias für die ID einer Kombination (0 bis 226).
+"""
+
+
+@dataclass(frozen=True)
+class CombinationInfo:
     """
-    Ermittelt die Kombinationsmöglichkeiten der Handkarten (die besten zuerst).
+    Beschreibung einer Kombination für Anzeige und JSON (wird je Kombination nur einmal angelegt).
 
-    :param hand: Die Handkarten; werden absteigend sortiert (mutable!).
-    :return: Kombinationsmöglichkeiten [(Karten, (Typ, Länge, Rang)), ...].
+    :ivar id: Die ID der Kombination.
+    :ivar combination: Die Kombination (Typ, Länge, Rang).
+    :ivar label: Das Label der Kombination (siehe stringify_combination()).
     """
-    # Handkarten absteigend sortieren
-    hand.sort(reverse=True)
+    id: CombinationId
+    combination: Combination
+    label: str
+
+    @property
+    def type(self) -> CombinationType:
+        """Der Typ der Kombination."""
+        return self.combination[0]
+
+    @property
+    def length(self) -> int:
+        """Die Länge der Kombination."""
+        return self.combination[1]
+
+    @property
+    def rank(self) -> int:
+        """Der Rang der Kombination."""
+        return self.combination[2]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Konvertiert die Beschreibung in ein Dictionary (z.B. für JSON-Serialisierung).
+
+        :return: Ein Dictionary mit ID, Typ, Länge, Rang und Label.
+        """
+        return {
+            "id": self.id,
+            "type": int(self.type),
+            "length": self.length,
+            "rank": self.rank,
+            "label": self.label,
+        }
+
+
+def _build_combination_ids() -> Tuple[Tuple[Combination, ...], Dict[Combination, CombinationId], List[List[List[Optional[Combination]]]], np.ndarray]:
+    """
+    Listet alle gültigen Kombinationen auf und berechnet die Tabelle, welche Kombination welchen Stich überstechen kann.
 
-    has_phoenix = CARD_PHO in hand
-    arr = [[], [], [], [], [], [], [], []]  # pro Typ ein Array
-    n = len(hand)
+    :return: Kombination je ID, ID je Kombination, internierte Kombination je [Typ][Länge][Rang], Tabelle [ID der Kombination, ID des Stichs].
+    """
+    combinations = [(t, n, v) for t in CombinationType for n in range(15) for v in range(17) if validate_combination((t, n, v))]
+    ids = {combination: i for i, combination in enumerate(combinations)}
+    interned: List[List[List[Optional[Combination]]]] = [[[None] * 17 for _ in range(15)] for _ in CombinationType]
+    for t, n, v in combinations:
+        interned[t][n][v] = (t, n, v)
+
+    # Die Regeln entsprechen build_action_space() (ohne Wunsch und ohne Passen).
+    # Zeilen: die Kombination, die gespielt werden soll; Spalten: die Kombination des Stichs.
+    types, lengths, ranks = np.array(combinations, dtype=np.float64).T
+    t2, n2, v2 = types[:, None], lengths[:, None], ranks[:, None]
+    t, n, v = types[None, :], lengths[None, :], ranks[None, :]
+    phoenix = (t2 == CombinationType.SINGLE) & (v2 == 16)  # Phönix als Einzelkarte
+    v2 = np.where(phoenix, np.where(v > 0, v + 0.5, 1.5), v2)
+    table = np.where(t == CombinationType.BOMB,
+                     (t2 == CombinationType.BOMB) & ((n2 > n) | ((n2 == n) & (v2 > v))),
+                     (t2 == CombinationType.BOMB) | ((t2 == t) & (n2 == n) & (v2 > v)))
+    table &= ~(phoenix & (t == CombinationType.SINGLE) & (v == 15))  # Phönix auf Drache ist nicht erlaubt
+    table |= (t == CombinationType.PASS) | ((t == CombinationType.SINGLE) & (v == 0))  # Anspiel bzw. Hund
+    table &= t2 != CombinationType.PASS  # Passen ist keine Kombination, die sticht
+
+    return tuple(interned[t][n][v] for t, n, v in combinations), {interned[t][n][v]: i for (t, n, v), i in ids.items()}, interned, table
+
+
+_combinations_by_id, _combination_ids, _interned_combinations, _beats_table = _build_combination_ids()
+_beats_by_trick = _beats_table.T.tolist()  # je Stich eine Liste (für den schnellen Zugriff in Python-Schleifen)
+_combination_infos = tuple(CombinationInfo(id=i, combination=combination, label=stringify_combination(combination)) for i, combination in enumerate(_combinations_by_id))
+
+
+def get_combination_id(combination: Tuple[int, int, int]) -> CombinationId:
+    """
+    Ermittelt die ID einer Kombination.
+
+    :param combination: Die Kombination (Typ, Länge, Rang).
+    :return: Die ID der Kombination.
+    """
+    cid = _combination_ids.get(combination)
+    if cid is None:
+        raise ValueError(f"Ungültige Kombination: {combination}")
+    return cid
+
+
+def get_combination_ids(combis: List[Tuple[Cards, Combination]]) -> np.ndarray:
+    """
+    Ermittelt die IDs der Kombinationen.
+
+    :param combis: Kombinationen [(Karten, (Typ, Länge, Rang)), ...].
+    :return: Die IDs als NumPy-Array (dtype uint8).
+    """
+    return np.fromiter((_combination_ids[combi[1]] for combi in combis), dtype=np.uint8, count=len(combis))
+
+
+def get_combination_by_id(cid: CombinationId) -> Combination:
+    """
+    Ermittelt die Kombination zu einer ID.
+
+    :param cid: Die ID der Kombination.
+    :return: Die Kombination (Typ, Länge, Rang); das Tupel ist interniert, darf also nicht verändert werden.
+    """
+    return _combinations_by_id[cid]
+
+
+def get_combination_info(cid: CombinationId) -> CombinationInfo:
+    """
+    Ermittelt die Beschreibung einer Kombination.
+
+    :param cid: Die ID der Kombination.
+    :return: Die Beschreibung der Kombination (wird je Kombination nur einmal angelegt).
+    """
+    return _combination_infos[cid]
+
+
+def beats(cid: CombinationId, trick_cid: CombinationId) -> bool:
+    """
+    Ermittelt, ob eine Kombination auf den Stich gespielt werden darf (ohne Berücksichtigung des Wunsches).
+
+    :param cid: Die ID der Kombination.
+    :param trick_cid: Die ID der Kombination des Stichs (Passen == kein Stich liegt).
+    :return: True, wenn die Kombination den Stich überstechen kann.
+    """
+    return bool(_beats_table[cid, trick_cid])
+
+
+# ------------------------------------------------------
+# Kombinationsuniversum
+# ------------------------------------------------------
+
+# Einzelkarten, Paare, Drillinge, 4er-Bomben und Fullhouses lassen sich für das gesamte Kartendeck vorab auflisten
+# (16.5 Tsd. Zeilen). Die Kombinationsmöglichkeiten einer Hand sind dann genau die Zeilen, deren Bitmaske eine
+# Teilmenge der Hand ist. Die Zeilen werden in derselben Reihenfolge aufgelistet, in der sie für eine beliebige
+# (absteigend sortierte) Hand generiert würden, daher bleibt die Reihenfolge beim Filtern erhalten.
+# Treppen, Straßen und Farbbomben sind zu zahlreich (Millionen), um sie vorab aufzulisten; sie werden weiterhin
+# pro Hand aus den Paaren bzw. den Handkarten gebildet.
 
-    # Einzelkarten, Paare, Drillinge, 4er-Bomben
+_COMBI_BOMB = CombinationType.BOMB
+_COMBI_STREET = CombinationType.STREET
+_COMBI_FULLHOUSE = CombinationType.FULLHOUSE
+_COMBI_STAIR = CombinationType.STAIR
+_COMBI_TRIPLE = CombinationType.TRIPLE
+_COMBI_PAIR = CombinationType.PAIR
+_COMBI_SINGLE = CombinationType.SINGLE
+
+
+def _build_universe() -> Tuple[List[Tuple[Card, ...]], List[Combination], np.ndarray, Tuple[int, int, int, int, int, int]]:
+    """
+    Listet alle Einzelkarten, Paare, Drillinge, 4er-Bomben und Fullhouses des Kartendecks auf.
+
+    :return: Karten je Zeile, Kombination je Zeile, Bitmaske je Zeile, Startindex je Typ (4er-Bombe, Fullhouse, Drilling, Paar, Einzelkarte, Ende).
+    """
+    cards = sorted(deck, reverse=True)
+    n = len(cards)
+    singles, pairs, triples, bombs = [], [], [], []
     for i1 in range(0, n):
-        card1 = hand[i1]
-        arr[CombinationType.SINGLE].append([card1])
+        card1 = cards[i1]
+        singles.append((card1,))
         if card1[1] == CardSuit.SPECIAL:
             continue
-        if has_phoenix:
-            arr[CombinationType.PAIR].append([card1, CARD_PHO])
-        # Paare suchen...
+        pairs.append((card1, CARD_PHO))
         for i2 in range(i1 + 1, n):
-            card2 = hand[i2]
+            card2 = cards[i2]
             if card1[0] != card2[0]:
                 break
-            arr[CombinationType.PAIR].append([card1, card2])
-            if has_phoenix:
-                arr[CombinationType.TRIPLE].append([card1, card2, CARD_PHO])
-            # Drillinge suchen...
+            pairs.append((card1, card2))
+            triples.append((card1, card2, CARD_PHO))
             for i3 in range(i2 + 1, n):
-                card3 = hand[i3]
+                card3 = cards[i3]
                 if card1[0] != card3[0]:
                     break
-                arr[CombinationType.TRIPLE].append([card1, card2, card3])
-                # 4er-Bomben suchen...
-                #for i4 in range(i3 + 1, n):
-                #    card4 = hand[i4]
-                #    if card1[0] == card4[0]:
-                #        arr[CombinationType.BOMB].append([card1, card2, card3, card4])
-                #    break
-                if i3 + 1 < n:
-                    card4 = hand[i3 + 1]
-                    if card1[0] == card4[0]:
-                        arr[CombinationType.BOMB].append([card1, card2, card3, card4])
+                triples.append((card1, card2, card3))
+                if i3 + 1 < n and card1[0] == cards[i3 + 1][0]:
+                    bombs.append((card1, card2, card3, cards[i3 + 1]))
 
-    # Treppen
-    temp = arr[CombinationType.PAIR].copy()
-    m = len(temp)
-    i = 0
-    while i < m:
-        v = temp[i][-2][0]  # Rang der vorletzten Karte in der Treppe
-        for pair in arr[CombinationType.PAIR]:
-            if pair[1] == CARD_PHO and CARD_PHO in temp[i]:
-                continue
-            if v - 1 == pair[0][0]:
-                new_stair = temp[i] + pair
-                arr[CombinationType.STAIR].append(new_stair)
-                temp.append(new_stair)
-                m += 1
-        i += 1
-
-    # Fullhouse
-    for triple in arr[CombinationType.TRIPLE]:
-        for pair in arr[CombinationType.PAIR]:
+    fullhouses = []
+    for triple in triples:
+        for pair in pairs:
             if triple[0][0] == pair[0][0]:
                 # Ausnahmeregel: Der Drilling darf nicht vom gleichen Rang sein wie das Paar (wäre mit Phönix möglich).
                 continue
@@ -301,81 +438,207 @@ def build_combinations(hand: Cards) -> List[Tuple[Cards, Combination]]:
                 # Man würde immer den Phönix zum höherwertigen Pärchen sortieren.
                 continue
             if not set(triple).intersection(pair):
-                # Schnittmenge ist leer
-                arr[CombinationType.FULLHOUSE].append(triple + pair)
-
-    # Straßen
-    for i1 in range(0, n - 1):
-        if hand[i1][1] == CardSuit.SPECIAL or (i1 > 0 and hand[i1 - 1][0] == hand[i1][0]):
-            continue  # Sonderkarte oder vorherige Karte gleichwertig
-        v1 = hand[i1][0]
-        if v1 < (4 if has_phoenix else 5):
-            break  # eine Straße hat mindestens den Rang 5
-        temp = [[hand[i1]]]
-        for i2 in range(i1 + 1, n):
-            if hand[i2] == CARD_DOG:
-                break  # Hund
-            v2 = hand[i2][0]
-            if v1 == v2:
-                # gleicher Kartenwert; die letzte Karte in der Straße kann ausgetauscht werden
-                temp2 = []
-                for cards in temp:
-                    cards2 = cards[0:-1] + [hand[i2]]
-                    if cards2 not in temp2:
-                        temp2.append(cards2)
-                temp += temp2
-            elif v1 == v2 + 1:
-                # keine Lücke zwischen den Karten
-                for cards in temp:
-                    cards.append(hand[i2])
-                v1 = v2
-            elif v1 == v2 + 2 and has_phoenix and CARD_PHO not in temp[0]:
-                # ein Phönix kann die Lücke schließen
-                for cards in temp:
-                    cards.append(CARD_PHO)
-                    cards.append(hand[i2])
-                v1 = v2
+                fullhouses.append(triple + pair)
+
+    rows = []
+    combis = []
+    offsets = []
+    for t, arr in ((_COMBI_BOMB, bombs), (_COMBI_FULLHOUSE, fullhouses), (_COMBI_TRIPLE, triples), (_COMBI_PAIR, pairs), (_COMBI_SINGLE, singles)):
+        offsets.append(len(rows))
+        for row in arr:
+            rows.append(row)
+            combis.append(_interned_combinations[t][len(row)][row[0][0]])
+    offsets.append(len(rows))
+    masks = np.array([cards_to_mask(row) for row in rows], dtype=np.uint64)
+    # noinspection PyTypeChecker
+    return rows, combis, masks, tuple(offsets)
+
+
+_universe_cards, _universe_combis, _universe_masks, _universe_offsets = _build_universe()
+
+
+def _select_from_universe(hand: Cards) -> List[List[int]]:
+    """
+    Ermittelt die Zeilen des Kombinationsuniversums, die aus den Handkarten gebildet werden können.
+
+    :param hand: Die Handkarten.
+    :return: Je Typ (4er-Bombe, Fullhouse, Drilling, Paar, Einzelkarte) die Indizes der Zeilen (in Universumsreihenfolge).
+    """
+    missing = np.uint64(MASK_DECK & ~cards_to_mask(hand))
+    indices = np.flatnonzero((_universe_masks & missing) == 0)
+    bounds = np.searchsorted(indices, _universe_offsets).tolist()
+    indices = indices.tolist()
+    return [indices[bounds[i]:bounds[i + 1]] for i in range(5)]
+
+
+def _build_stairs(pairs: List[Tuple[Card, ...]]) -> List[Cards]:
+    """
+    Bildet die Treppen aus den Paaren.
+
+    :param pairs: Die Paare der Hand (in der Reihenfolge von build_combinations).
+    :return: Die Treppen (zuerst die kürzesten).
+    """
+    pairs_by_rank = {}
+    for pair in pairs:
+        pairs_by_rank.setdefault(pair[0][0], []).append(pair)
+    stairs = []
+    temp = [list(pair) for pair in pairs]
+    m = len(temp)
+    i = 0
+    while i < m:
+        stair = temp[i]
+        for pair in pairs_by_rank.get(stair[-2][0] - 1, ()):  # Rang der vorletzten Karte in der Treppe - 1
+            if pair[1] == CARD_PHO and CARD_PHO in stair:
+                continue
+            new_stair = stair + list(pair)
+            stairs.append(new_stair)
+            temp.append(new_stair)
+            m += 1
+        i += 1
+    return stairs
+
+
+def _build_streets(hand: Cards, has_phoenix: bool) -> Tuple[List[Cards], List[Cards]]:
+    """
+    Bildet die Straßen und Farbbomben aus den Handkarten.
+
+    Für jeden Startrang wird über das Rang-Histogramm die längste Kette aufeinanderfolgender Ränge ermittelt
+    (der Phönix darf eine Lücke schließen). Jede Position der Kette hat so viele Belegungen, wie Karten des Rangs auf
+    der Hand sind. Die Belegungen werden wie ein Zähler durchlaufen (die erste Position zählt am schnellsten).
+    Eine Straße der Länge k wird nur bei der ersten Belegung ausgegeben, die sie bildet, d.h. wenn alle Positionen
+    ab k die erste Karte ihres Rangs tragen (bei Ersetzung einer Karte durch den Phönix zusätzlich die ersetzte Position).
+    So wird jede Straße genau einmal gebildet, der Aufwand ist linear zur Anzahl der Straßen.
+
+    :param hand: Die Handkarten (absteigend sortiert).
+    :param has_phoenix: True, wenn der Phönix auf der Hand ist.
+    :return: Die Farbbomben und die Straßen.
+    """
+    bombs = []
+    streets = []
+
+    # Rang-Histogramm (der Mahjong zählt als Rang 1; Hund, Drache und Phönix gehören nicht dazu)
+    ranks = [[] for _ in range(15)]
+    for card in hand:
+        if 1 <= card[0] <= 14:
+            ranks[card[0]].append(card)
+
+    for r1 in range(14, 3 if has_phoenix else 4, -1):  # eine Straße hat mindestens den Rang 5
+        if not ranks[r1]:
+            continue
+
+        # Kette aufeinanderfolgender Ränge ab r1 ermitteln
+        positions = [ranks[r1]]
+        gap = -1  # Position des Phönix, der eine Lücke schließt (-1 == keine Lücke)
+        r = r1
+        while r > 1:
+            if ranks[r - 1]:
+                positions.append(ranks[r - 1])
+                r -= 1
+            elif has_phoenix and gap == -1 and r > 2 and ranks[r - 2]:
+                gap = len(positions)
+                positions.append([CARD_PHO])
+                positions.append(ranks[r - 2])
+                r -= 2
             else:
-                # zu große Lücke zwischen den Karten, um daraus eine Straße zu machen
                 break
-
-        m = len(temp[0])
-        for cards in temp:
-            for k in range(4, m + 1):
-                if cards[k - 1] == CARD_PHO:
-                    continue
-                available_phoenix = has_phoenix and CARD_PHO not in cards[0:k]
+        m = len(positions)
+        if m < 4 or (m == 4 and (not has_phoenix or gap != -1)):
+            continue  # zu kurz
+
+        # Belegungen durchlaufen
+        sizes = [len(cards) for cards in positions]
+        digits = [0] * m
+        cards = [cards[0] for cards in positions]  # aktuelle Belegung
+        top = -1  # höchste Position, die nicht die erste Karte ihres Rangs trägt (-1 == keine)
+        k_phoenix = m if gap == -1 else gap  # bis zu dieser Länge ist der Phönix noch frei
+        while True:
+            same_suit = 1  # Anzahl der Karten ab Position 0 in derselben Farbe
+            free = []  # Positionen, die der Phönix ersetzen darf
+            if m >= 5:
+                suit = cards[0][1]
+                while same_suit < m and cards[same_suit][1] == suit:
+                    same_suit += 1
+                if has_phoenix:
+                    free = [i for i in range(1, m - 1) if digits[i] == 0]
+            for k in range(max(4, top + 1), m + 1):
+                if k - 1 == gap:
+                    continue  # die Straße darf nicht mit dem Phönix in der Lücke enden
+                available_phoenix = has_phoenix and k <= k_phoenix
                 # Straße bzw. Bombe übernehmen
                 if k >= 5:
-                    is_bomb = True
-                    for card in cards[1:k]:
-                        if card[1] != cards[0][1]:
-                            is_bomb = False
-                            break
-                    arr[CombinationType.BOMB if is_bomb else CombinationType.STREET].append(cards[0:k])
+                    (bombs if k <= same_suit else streets).append(cards[0:k])
                     # jede Karte ab der 2. bis zur vorletzten mit dem Phönix ersetzen
                     if available_phoenix:
-                        for i in range(1, k - 1):
-                            arr[CombinationType.STREET].append(cards[0:i] + [CARD_PHO] + cards[i + 1:k])
+                        for i in free:
+                            if i >= k - 1:
+                                break
+                            streets.append(cards[0:i] + [CARD_PHO] + cards[i + 1:k])
                 # Straße mit Phönix verlängern
-                if k >= 4 and available_phoenix:
-                    if cards[0][0] < 14:
-                        arr[CombinationType.STREET].append([CARD_PHO] + cards[0:k])
+                if available_phoenix:
+                    if r1 < 14:
+                        streets.append([CARD_PHO] + cards[0:k])
                     elif cards[k - 1][0] > 2:
-                        arr[CombinationType.STREET].append(cards[0:k] + [CARD_PHO])
+                        streets.append(cards[0:k] + [CARD_PHO])
+
+            # nächste Belegung
+            j = 0
+            while j < m:
+                digits[j] += 1
+                if digits[j] < sizes[j]:
+                    cards[j] = positions[j][digits[j]]
+                    break
+                digits[j] = 0
+                cards[j] = positions[j][0]
+                j += 1
+            if j == m:
+                break
+            if j > top:
+                top = j  # die Positionen unterhalb von j tragen wieder die erste Karte ihres Rangs
 
-    # Kombinationen auflisten (zuerst die besten)
-    result = []
-    for t in range(7, 0, -1):  # Typ t = 7 (BOMB) .. 1 (SINGLE)
-        for cards in arr[t]:
-            # Rang ermitteln
-            if t == CombinationType.STREET and cards[0] == CARD_PHO:
-                v = cards[1][0] + 1  # Phönix == Rang der zweiten Karte + 1
-            else:
-                v = cards[0][0]  # Rang der Kombination = Wert der ersten Karte
-            # Kombination speichern
-            result.append((cards, (CombinationType(t), len(cards), v)))
+    return bombs, streets
+
+
+def _get_street_rank(cards: Cards) -> int:
+    """
+    Ermittelt den Rang einer Straße, die von _build_streets() gebildet wurde.
+
+    :param cards: Die Karten der Straße.
+    :return: Wert der ersten Karte bzw. Rang der zweiten Karte + 1, wenn der Phönix vorn steht.
+    """
+    return cards[1][0] + 1 if cards[0] == CARD_PHO else cards[0][0]
+
+
+def build_combinations(hand: Cards) -> List[Tuple[Cards, Combination]]:
+    """
+    Ermittelt die Kombinationsmöglichkeiten der Handkarten (die besten zuerst).
+
+    Einzelkarten, Paare, Drillinge, 4er-Bomben und Fullhouses werden aus dem vorab berechneten Kombinationsuniversum
+    übernommen (alle Zeilen, deren Bitmaske eine Teilmenge der Hand ist).
+
+    :param hand: Die Handkarten; werden absteigend sortiert (mutable!).
+    :return: Kombinationsmöglichkeiten [(Karten, (Typ, Länge, Rang)), ...].
+    """
+    # Handkarten absteigend sortieren
+    hand.sort(reverse=True)
+
+    has_phoenix = CARD_PHO in hand
+    bomb4_indices, fullhouse_indices, triple_indices, pair_indices, single_indices = _select_from_universe(hand)
+
+    # Treppen
+    stairs = _build_stairs([_universe_cards[i] for i in pair_indices])
+
+    # Straßen und Farbbomben
+    color_bombs, streets = _build_streets(hand, has_phoenix)
 
+    # Kombinationen auflisten (zuerst die besten)
+    result = [(list(_universe_cards[i]), _universe_combis[i]) for i in bomb4_indices]
+    result += [(cards, _interned_combinations[_COMBI_BOMB][len(cards)][cards[0][0]]) for cards in color_bombs]
+    result += [(cards, _interned_combinations[_COMBI_STREET][len(cards)][_get_street_rank(cards)]) for cards in streets]
+    result += [(list(_universe_cards[i]), _universe_combis[i]) for i in fullhouse_indices]
+    result += [(cards, _interned_combinations[_COMBI_STAIR][len(cards)][cards[0][0]]) for cards in stairs]
+    result += [(list(_universe_cards[i]), _universe_combis[i]) for i in triple_indices]
+    result += [(list(_universe_cards[i]), _universe_combis[i]) for i in pair_indices]
+    result += [(list(_universe_cards[i]), _universe_combis[i]) for i in single_indices]
     return result
 
 
@@ -387,35 +650,155 @@ def remove_combinations(combis: List[Tuple[Cards, Combination]], cards: Cards):
     :param cards: Karten, die entfernt werden sollen.
     :return: Kombinationsmöglichkeiten ohne die gegebenen Karten.
     """
-    return [combi for combi in combis if not set(cards).intersection(combi[0])]
+    removed = set(cards)
+    return [combi for combi in combis if removed.isdisjoint(combi[0])]
+
+
+@dataclass
+class ActionSpaceIndex:
+    """
+    Index über die Kombinationsmöglichkeiten einer Hand für die schnelle Ermittlung der spielbaren Kombinationen.
+
+    Die Kombinationen (außer Bomben und dem Phönix als Einzelkarte) werden nach Typ und Länge in Buckets
+    einsortiert, innerhalb eines Buckets aufsteigend nach Rang. Die Kombinationen, die einen Stich überstechen,
+    liegen damit am Ende des Buckets und werden per Bisektion gefunden.
+
+    :ivar combis: Die indizierten Kombinationsmöglichkeiten [(Karten, (Typ, Länge, Rang)), ...].
+    :ivar buckets: Je (Typ, Länge) die aufsteigend sortierten Ränge und die zugehörigen Indizes in combis.
+    :ivar bomb_keys: Länge und Rang der Bomben, aufsteigend sortiert.
+    :ivar bomb_indices: Die zugehörigen Indizes der Bomben in combis.
+    :ivar phoenix_index: Index des Phönix als Einzelkarte in combis (-1 == kein Phönix).
+    :ivar wish_indices: Je Kartenwert (2 bis 14) die Indizes der Kombinationen, die den Kartenwert enthalten (wird bei Bedarf befüllt, siehe get_wish_indices()).
+    """
+    combis: List[Tuple[Cards, Combination]]
+    buckets: Dict[Tuple[int, int], Tuple[List[int], List[int]]]
+    bomb_keys: List[Tuple[int, int]]
+    bomb_indices: List[int]
+    phoenix_index: int
+    wish_indices: Dict[int, List[int]] = field(default_factory=dict)
+
+    def get_wish_indices(self, wish_value: int) -> List[int]:
+        """
+        Listet die Indizes der Kombinationen auf, die den gewünschten Kartenwert enthalten (invertierter Index).
+
+        :param wish_value: Der gewünschte Kartenwert (2 bis 14).
+        :return: Die Indizes in combis (aufsteigend).
+        """
+        indices = self.wish_indices.get(wish_value)
+        if indices is None:
+            indices = [i for i, (cards, _) in enumerate(self.combis) if is_wish_in(wish_value, cards)]
+            self.wish_indices[wish_value] = indices
+        return indices
+
+
+def build_action_space_index(combis: List[Tuple[Cards, Combination]]) -> ActionSpaceIndex:
+    """
+    Erstellt den Index über die Kombinationsmöglichkeiten einer Hand.
 
+    :param combis: Kombinationsmöglichkeiten der Hand, ([(Karten, (Typ, Länge, Rang)), ...]).
+    :return: Der Index.
+    """
+    rows = {}
+    bombs = []
+    phoenix_index = -1
+    for i, (_, (t, n, v)) in enumerate(combis):
+        if t == 7:  # Bombe
+            bombs.append((n, v, i))
+        elif t == 1 and v == 16:  # Phönix als Einzelkarte
+            phoenix_index = i
+        else:
+            key = (t, n)
+            if key in rows:
+                rows[key].append((v, i))
+            else:
+                rows[key] = [(v, i)]
+    buckets = {}
+    for key, items in rows.items():
+        items.sort()  # nach Rang, bei gleichem Rang nach Index
+        buckets[key] = [v for v, _ in items], [i for _, i in items]
+    bombs.sort()
+    return ActionSpaceIndex(
+        combis=combis,
+        buckets=buckets,
+        bomb_keys=[(n, v) for n, v, _ in bombs],
+        bomb_indices=[i for _, _, i in bombs],
+        phoenix_index=phoenix_index,
+    )
+
+
+def _build_action_space_by_index(index: ActionSpaceIndex, trick_combination: tuple, wish_value: int) -> List[Tuple[Cards, Combination]]:
+    """
+    Ermittelt spielbare Kartenkombinationen mithilfe des Index (siehe build_action_space()).
 
-def build_action_space(combis: List[Tuple[Cards, Combination]], trick_combination: tuple, wish_value: int) -> List[Tuple[Cards, Combination]]:
+    :param index: Der Index über die Kombinationsmöglichkeiten der Hand.
+    :param trick_combination: Typ, Länge, Rang des aktuellen Stichs ((0,0,0) falls kein Stich liegt).
+    :param wish_value: Wunsch (2 bis 14, -1 == noch kein Mahjong gespielt, 0 == ohne Wunsch oder bereits erfüllt).
+    :return: ([], (0,0,0)) für Passen sofern möglich + spielbare Kombinationsmöglichkeiten.
+    """
+    combis = index.combis
+    if trick_combination not in ((CombinationType.PASS, 0, 0), (CombinationType.SINGLE, 1, 0)):
+        # Stich liegt und es ist kein Hund
+        t, n, v = trick_combination
+        if t == CombinationType.BOMB:
+            # nur höhere Bomben (länger oder bei gleicher Länge ranghöher)
+            indices = index.bomb_indices[bisect_right(index.bomb_keys, (n, v)):]
+        else:
+            indices = list(index.bomb_indices)
+            bucket = index.buckets.get((t, n))
+            if bucket:
+                ranks, bucket_indices = bucket
+                indices += bucket_indices[bisect_right(ranks, v):]
+            if t == CombinationType.SINGLE and v != 15 and index.phoenix_index != -1:
+                indices.append(index.phoenix_index)  # Phönix sticht jede Einzelkarte außer dem Drachen
+        if wish_value > 0:
+            assert 2 <= wish_value <= 14
+            wish_indices = index.get_wish_indices(wish_value)
+            if wish_indices:
+                wish_indices = set(wish_indices)
+                if not wish_indices.isdisjoint(indices):
+                    # Der Spieler kann und muss den Wunsch erfüllen (oder Bombe werfen), Passen ist keine Option.
+                    bomb_indices = set(index.bomb_indices)
+                    return [combis[i] for i in sorted(indices) if i in wish_indices or i in bomb_indices]
+        indices.sort()
+        return [([], (CombinationType.PASS, 0, 0))] + [combis[i] for i in indices]
+
+    # Anspiel! Freie Auswahl (bis auf passen).
+    if wish_value > 0:
+        assert 2 <= wish_value <= 14
+        wish_indices = index.get_wish_indices(wish_value)
+        if wish_indices:
+            # Der Spieler kann und muss den Wunsch erfüllen (oder Bombe werfen).
+            return [combis[i] for i in sorted(set(wish_indices).union(index.bomb_indices))]
+    return combis
+
+
+def build_action_space(combis: List[Tuple[Cards, Combination]], trick_combination: tuple, wish_value: int, index: Optional[ActionSpaceIndex] = None) -> List[Tuple[Cards, Combination]]:
     """
     Ermittelt spielbare Kartenkombinationen.
+
+    Wird ein Index übergeben (siehe build_action_space_index()), werden die spielbaren Kombinationen per Bisektion
+    ermittelt, ansonsten werden alle Kombinationsmöglichkeiten durchlaufen. Das Ergebnis ist in beiden Fällen gleich.
     
     :param combis: Kombinationsmöglichkeiten der Hand, ([(Karten, (Typ, Länge, Rang)), ...]).
     :param trick_combination: Typ, Länge, Rang des aktuellen Stichs ((0,0,0) falls kein Stich liegt).
     :param wish_value: Wunsch (2 bis 14, -1 == noch kein Mahjong gespielt, 0 == ohne Wunsch oder bereits erfüllt).
+    :param index: (Optional) Index über die Kombinationsmöglichkeiten (muss zu combis gehören).
     :return: ([], (0,0,0)) für Passen sofern möglich + spielbare Kombinationsmöglichkeiten.
     """
+    trick_combination = tuple(trick_combination)  # auch eine Liste ist erlaubt (z.B. aus JSON)
     assert 0 <= trick_combination[0] <= 7
     assert 0 <= trick_combination[1] <= 14
     assert 0 <= trick_combination[2] <= 15
+    if index is not None:
+        assert index.combis is combis
+        return _build_action_space_by_index(index, trick_combination, wish_value)
     result = []
     if trick_combination not in ((CombinationType.PASS, 0, 0), (CombinationType.SINGLE, 1, 0)):  # trickCombination[2] > 0  # Rang > 0?
         # Stich liegt und es ist kein Hund
         result.append(([], (CombinationType.PASS, 0, 0)))  # Passen ist eine Option
-        t, n, v = trick_combination
-        for combi in combis:
-            t2, n2, v2 = combi[1]
-            if combi[1] == (CombinationType.SINGLE, 1, 16):  # Phönix als Einzelkarte
-                if trick_combination == (CombinationType.SINGLE, 1, 15):
-                    continue  # Phönix auf Drache ist nicht erlaubt
-                v2 = v + 0.5 if v > 0 else 1.5
-            if (t == CombinationType.BOMB and t2 == t and (n2 > n or (n2 == n and v2 > v))) or \
-               (t != CombinationType.BOMB and (t2 == CombinationType.BOMB or (t2 == t and n2 == n and v2 > v))):
-                result.append(combi)
+        beaten = _beats_by_trick[get_combination_id(trick_combination)]  # je Kombinations-ID: sticht den Stich?
+        ids = _combination_ids
+        result += [combi for combi in combis if beaten[ids[combi[1]]]]
     else:
         # Anspiel! Freie Auswahl (bis auf passen).
         # result = combis.copy()  so, wenn combis eine Liste wäre
@@ -439,6 +822,120 @@ def build_action_space(combis: List[Tuple[Cards, Combination]], trick_combinatio
     return result
 
 
+# ------------------------------------------------------
+# Bomben
+# ------------------------------------------------------
+
+# Die Karten 2 bis As liegen in der Bitmaske ab Bit 2 in Vierergruppen (eine Gruppe je Rang, darin ein Bit je Farbe).
+# Nach dem Verschieben um 2 Bit steht Rang r, Farbe c auf Bit (r - 2) * 4 + c - 1.
+# - 4er-Bombe: vier benachbarte Bits einer Gruppe sind gesetzt (Rang-Histogramm == 4).
+# - Farbbombe: fünf Bits im Abstand von 4 sind gesetzt (fünf aufeinanderfolgende Ränge in derselben Farbe).
+
+_MASK_VALUES = (1 << 52) - 1
+"""Bitmaske der Karten 2 bis As (nach dem Verschieben um 2 Bit)"""
+
+_MASK_GROUPS = sum(1 << (4 * i) for i in range(13))
+"""Bitmaske mit dem ersten Bit jeder Vierergruppe (nach dem Verschieben um 2 Bit)"""
+
+
+def _find_bombs(mask: CardSet) -> Tuple[int, int]:
+    """
+    Sucht die Bomben in der Bitmaske.
+
+    :param mask: Die Karten als Bitmaske.
+    :return: Je Bombenart eine Bitmaske (nach dem Verschieben um 2 Bit): 4er-Bomben (erstes Bit der Vierergruppe des
+             Rangs) und Farbbomben (niedrigste Karte jeder Folge von fünf Karten derselben Farbe); 0, wenn keine enthalten ist.
+    """
+    m = (mask >> 2) & _MASK_VALUES
+    return m & (m >> 1) & (m >> 2) & (m >> 3) & _MASK_GROUPS, m & (m >> 4) & (m >> 8) & (m >> 12) & (m >> 16)
+
+
+def contains_bomb(mask: CardSet) -> bool:
+    """
+    Ermittelt, ob die Karten eine Bombe enthalten, ohne Kombinationen zu bilden.
+
+    :param mask: Die Karten als Bitmaske (siehe cards_to_mask()).
+    :return: True, wenn eine 4er-Bombe oder eine Farbbombe enthalten ist.
+    """
+    quads, runs = _find_bombs(mask)
+    return bool(quads or runs)
+
+
+def build_bombs(hand: Cards) -> List[Tuple[Cards, Combination]]:
+    """
+    Ermittelt die Bomben der Handkarten, ohne die anderen Kombinationsmöglichkeiten zu bilden.
+
+    Die Reihenfolge ist dieselbe wie bei build_combinations().
+
+    :param hand: Die Handkarten; werden absteigend sortiert (mutable!).
+    :return: Die Bomben [(Karten, (Typ, Länge, Rang)), ...].
+    """
+    quads, runs = _find_bombs(cards_to_mask(hand))
+    result = []
+    if quads:
+        for i in range(12, -1, -1):  # absteigend nach Rang
+            if quads & (1 << (4 * i)):
+                result.append(([(i + 2, CardSuit.STAR), (i + 2, CardSuit.JADE), (i + 2, CardSuit.PAGODA), (i + 2, CardSuit.SWORD)], (_COMBI_BOMB, 4, i + 2)))
+    if runs:
+        hand.sort(reverse=True)
+        color_bombs, _ = _build_streets(hand, CARD_PHO in hand)
+        result += [(cards, _interned_combinations[_COMBI_BOMB][len(cards)][cards[0][0]]) for cards in color_bombs]
+    return result
+
+
+def build_responses(hand: Cards, trick_combination: tuple, wish_value: int, bombs_only: bool = False) -> List[Tuple[Cards, Combination]]:
+    """
+    Ermittelt die spielbaren Kartenkombinationen, ohne alle Kombinationsmöglichkeiten der Hand zu bilden.
+
+    Liegt ein Stich, werden nur die Bomben und die Kombinationen vom Typ und der Länge des Stichs gebildet.
+    Das Ergebnis ist dasselbe wie bei ``build_action_space(build_combinations(hand), trick_combination, wish_value)``
+    (beim Anspiel werden alle Kombinationsmöglichkeiten benötigt, dann wird genau das berechnet).
+
+    :param hand: Die Handkarten; werden absteigend sortiert (mutable!).
+    :param trick_combination: Typ, Länge, Rang des aktuellen Stichs ((0,0,0) falls kein Stich liegt).
+    :param wish_value: Wunsch (2 bis 14, -1 == noch kein Mahjong gespielt, 0 == ohne Wunsch oder bereits erfüllt).
+    :param bombs_only: Wenn True, werden nur Bomben gebildet (der Spieler ist nicht am Zug, kann aber eine Bombe werfen).
+    :return: ([], (0,0,0)) für Passen sofern möglich + spielbare Kombinationsmöglichkeiten.
+    """
+    trick_combination = tuple(trick_combination)  # auch eine Liste ist erlaubt (z.B. aus JSON)
+    if trick_combination in ((CombinationType.PASS, 0, 0), (CombinationType.SINGLE, 1, 0)):
+        # Anspiel bzw. Hund
+        combis = build_bombs(hand) if bombs_only else build_combinations(hand)
+        return build_action_space(combis, trick_combination, wish_value)
+
+    # Handkarten absteigend sortieren
+    hand.sort(reverse=True)
+
+    has_phoenix = CARD_PHO in hand
+    t, n, v = trick_combination
+    bomb4_indices, fullhouse_indices, triple_indices, pair_indices, single_indices = _select_from_universe(hand)
+
+    # Bomben (in derselben Reihenfolge wie bei build_combinations())
+    candidates = [(list(_universe_cards[i]), _universe_combis[i]) for i in bomb4_indices]
+    streets = []
+    if (not bombs_only and t == CombinationType.STREET) or _find_bombs(cards_to_mask(hand))[1]:
+        color_bombs, streets = _build_streets(hand, has_phoenix)
+        candidates += [(cards, _interned_combinations[_COMBI_BOMB][len(cards)][cards[0][0]]) for cards in color_bombs]
+
+    # Kombinationen vom Typ und der Länge des Stichs
+    if not bombs_only:
+        if t == CombinationType.STREET:
+            candidates += [(cards, _interned_combinations[_COMBI_STREET][n][_get_street_rank(cards)]) for cards in streets if len(cards) == n]
+        elif t == CombinationType.FULLHOUSE:
+            candidates += [(list(_universe_cards[i]), _universe_combis[i]) for i in fullhouse_indices]
+        elif t == CombinationType.STAIR:
+            stairs = _build_stairs([_universe_cards[i] for i in pair_indices])
+            candidates += [(cards, _interned_combinations[_COMBI_STAIR][n][cards[0][0]]) for cards in stairs if len(cards) == n]
+        elif t == CombinationType.TRIPLE:
+            candidates += [(list(_universe_cards[i]), _universe_combis[i]) for i in triple_indices]
+        elif t == CombinationType.PAIR:
+            candidates += [(list(_universe_cards[i]), _universe_combis[i]) for i in pair_indices]
+        elif t == CombinationType.SINGLE:
+            candidates += [(list(_universe_cards[i]), _universe_combis[i]) for i in single_indices]
+
+    return build_action_space(candidates, trick_combination, wish_value)
+
+
 # ------------------------------------------------------
 # Test
 # ------------------------------------------------------
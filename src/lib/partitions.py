@@ -3,14 +3,20 @@ Dieses Modul definiert Funktionen zur Erstellung und Verwaltung einer Kartenpart
 """
 
 __all__ = "Partition", \
-    "build_partitions", "remove_partitions", \
-    "filter_playable_partitions", "filter_playable_combinations", \
+    "build_partitions", "iter_partitions", "take_partitions", "build_shortest_partitions", "remove_partitions", \
+    "filter_playable_partitions", "filter_playable_combinations", "build_shortest_playable_partitions", "build_best_partition", \
+    "PartitionStore", \
     "stringify_partition",
 
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
 from src import config
-from src.lib.cards import Cards
-from src.lib.combinations import stringify_combination, remove_combinations, Combination
-from typing import List, Tuple, Optional
+from src.lib.cards import Cards, CardSet, cards_to_mask
+from src.lib.combinations import stringify_combination, remove_combinations, get_combination_id, Combination, CombinationId
+from typing import List, Tuple, Optional, Dict, Iterator, Set
 
 # ------------------------------------------------------
 # Partitionen
@@ -60,6 +66,213 @@ def build_partitions(partitions: List[Partition], combis: List[Tuple[Cards, Comb
     return completed
 
 
+# ------------------------------------------------------
+# Partitionen über Bitmasken
+# ------------------------------------------------------
+
+# Eine Partition überdeckt die Handkarten genau einmal. Damit jede Partition nur einmal gebildet wird, wird in jedem
+# Schritt eine feste Karte der Restmaske (die Pivot-Karte) durch eine Kombination überdeckt. Als Pivot-Karte dient die
+# noch freie Karte, die in den wenigsten Kombinationen vorkommt (bei Gleichstand die höhere Karte); das hält die
+# Verzweigung klein. Die minimale Anzahl Kombinationen, die eine Restmaske noch benötigt, wird je Restmaske nur einmal
+# berechnet (Memoisierung).
+
+_INFINITY = 99
+"""Minimale Länge für Restmasken, die nicht überdeckt werden können"""
+
+
+@dataclass
+class _CoverIndex:
+    """
+    Index über die Kombinationsmöglichkeiten für die Suche nach Partitionen.
+
+    :ivar combis: Die Kombinationsmöglichkeiten [(Karten, (Typ, Länge, Rang)), ...] (die besten zuerst).
+    :ivar masks: Die Karten je Kombination als Bitmaske.
+    :ivar by_card: Je Kartenindex (Bit) die Indizes der Kombinationen, die die Karte enthalten (aufsteigend).
+    :ivar pivots: Die Kartenindizes (Bits) in der Reihenfolge, in der sie als Pivot-Karte gewählt werden.
+    :ivar hand: Alle Karten der Kombinationsmöglichkeiten als Bitmaske.
+    :ivar min_lengths: Memo: minimale Anzahl Kombinationen je Restmaske.
+    :ivar lengths: Memo: mögliche Anzahl Kombinationen je Restmaske (Bit m gesetzt, wenn genau m Kombinationen passen).
+    """
+    combis: List[Tuple[Cards, Combination]]
+    masks: List[CardSet]
+    by_card: List[List[int]]
+    pivots: List[int]
+    hand: CardSet
+    min_lengths: Dict[CardSet, int]
+    lengths: Dict[CardSet, int] = field(default_factory=lambda: {0: 1})
+
+
+def _build_cover_index(combis: List[Tuple[Cards, Combination]]) -> _CoverIndex:
+    """
+    Erstellt den Index über die Kombinationsmöglichkeiten.
+
+    :param combis: Die Kombinationsmöglichkeiten der Handkarten (die besten zuerst).
+    :return: Der Index.
+    """
+    masks = [cards_to_mask(cards) for cards, _ in combis]
+    by_card = [[] for _ in range(56)]
+    hand = 0
+    for i, mask in enumerate(masks):
+        hand |= mask
+        while mask:
+            low = mask & -mask
+            by_card[low.bit_length() - 1].append(i)
+            mask ^= low
+    pivots = sorted((b for b in range(56) if by_card[b]), key=lambda b: (len(by_card[b]), -b))
+    return _CoverIndex(combis=combis, masks=masks, by_card=by_card, pivots=pivots, hand=hand, min_lengths={0: 0})
+
+
+def _get_pivot(index: _CoverIndex, rest: CardSet) -> int:
+    """
+    Ermittelt die Pivot-Karte der Restmaske.
+
+    :param index: Der Index über die Kombinationsmöglichkeiten.
+    :param rest: Die restlichen Karten als Bitmaske (nicht leer).
+    :return: Der Kartenindex (Bit) der Pivot-Karte.
+    """
+    for b in index.pivots:
+        if rest >> b & 1:
+            return b
+    assert False, "Die Restmaske enthält Karten, die in keiner Kombination vorkommen."
+
+
+def _min_length(index: _CoverIndex, rest: CardSet) -> int:
+    """
+    Ermittelt die minimale Anzahl Kombinationen, mit denen die restlichen Karten überdeckt werden können.
+
+    :param index: Der Index über die Kombinationsmöglichkeiten.
+    :param rest: Die restlichen Karten als Bitmaske.
+    :return: Die minimale Anzahl Kombinationen (_INFINITY, wenn die Karten nicht überdeckt werden können).
+    """
+    length = index.min_lengths.get(rest)
+    if length is None:
+        length = _INFINITY
+        masks = index.masks
+        for i in index.by_card[_get_pivot(index, rest)]:  # Kombinationen mit der Pivot-Karte
+            mask = masks[i]
+            if mask & rest == mask:
+                length = min(length, 1 + _min_length(index, rest ^ mask))
+        index.min_lengths[rest] = length
+    return length
+
+
+def _cover_lengths(index: _CoverIndex, rest: CardSet) -> int:
+    """
+    Ermittelt, mit wie vielen Kombinationen die restlichen Karten genau überdeckt werden können.
+
+    :param index: Der Index über die Kombinationsmöglichkeiten.
+    :param rest: Die restlichen Karten als Bitmaske.
+    :return: Bitmaske der möglichen Anzahlen (Bit m ist gesetzt, wenn genau m Kombinationen die Karten überdecken).
+    """
+    lengths = index.lengths.get(rest)
+    if lengths is None:
+        lengths = 0
+        masks = index.masks
+        for i in index.by_card[_get_pivot(index, rest)]:  # Kombinationen mit der Pivot-Karte
+            mask = masks[i]
+            if mask & rest == mask:
+                lengths |= _cover_lengths(index, rest ^ mask) << 1
+        index.lengths[rest] = lengths
+    return lengths
+
+
+def iter_partitions(combis: List[Tuple[Cards, Combination]]) -> Iterator[Partition]:
+    """
+    Listet die Partitionen der Handkarten auf, die kürzesten zuerst.
+
+    Die Partitionen werden erst bei Bedarf gebildet (Best-First-Suche über eine Prioritätswarteschlange). Partitionen
+    gleicher Länge sind danach sortiert, mit welcher Kombination die erste Pivot-Karte überdeckt wird, dann die nächste
+    usw. (da die besten Kombinationen zuerst aufgelistet sind, kommen die besseren Partitionen zuerst).
+    Es gibt keine Obergrenze; der Aufrufer entnimmt so viele Partitionen, wie er benötigt (z.B. mit itertools.islice).
+
+    :param combis: Die Kombinationsmöglichkeiten der Handkarten (sortiert, die besten zuerst!).
+    :return: Die Partitionen; die Kombinationen einer Partition sind wie in combis sortiert.
+    """
+    index = _build_cover_index(combis)
+    if not index.hand:
+        return
+    masks = index.masks
+    by_card = index.by_card
+
+    # Einträge: (Mindestlänge der vollständigen Partition, gewählte Kombinationen, restliche Karten)
+    queue: List[Tuple[int, Tuple[int, ...], CardSet]] = [(_min_length(index, index.hand), (), index.hand)]
+    while queue:
+        bound, path, rest = heapq.heappop(queue)
+        if bound >= _INFINITY:
+            return
+        if not rest:
+            yield [combis[i] for i in sorted(path)]
+            continue
+        n = len(path) + 1
+        for i in by_card[_get_pivot(index, rest)]:  # Kombinationen mit der Pivot-Karte
+            mask = masks[i]
+            if mask & rest == mask:
+                rest2 = rest ^ mask
+                heapq.heappush(queue, (n + _min_length(index, rest2), path + (i,), rest2))
+
+
+def take_partitions(partitions: List[Partition], combis: List[Tuple[Cards, Combination]], maxlen=config.PARTITIONS_MAXLEN) -> bool:
+    """
+    Entnimmt die ersten Partitionen aus iter_partitions() (die kürzesten zuerst).
+
+    Im Gegensatz zu build_partitions() liefert der Abbruch bei zu vielen Möglichkeiten die kürzesten Partitionen und
+    nicht die, die mit den ersten Kombinationen beginnen.
+
+    :param partitions: Diese Liste wird mit den Partitionen gefüllt.
+    :param combis: Die Kombinationsmöglichkeiten der Handkarten (sortiert, die besten zuerst!).
+    :param maxlen: Die maximale Anzahl von Partitionen, die berechnet werden.
+    :return: True, wenn alle möglichen Partitionen berechnet wurden. False, wenn es mehr als maxlen Partitionen gibt.
+    """
+    it = iter_partitions(combis)
+    partitions.extend(itertools.islice(it, maxlen))
+    return next(it, None) is None
+
+
+def build_shortest_partitions(combis: List[Tuple[Cards, Combination]], all_partitions: bool = True) -> List[Partition]:
+    """
+    Ermittelt die kürzesten Partitionen der Handkarten, ohne die anderen Partitionen zu bilden.
+
+    Es werden nur Zweige verfolgt, die mit der minimalen Anzahl Kombinationen aufgehen (siehe _min_length()).
+    Die Reihenfolge ist dieselbe wie bei iter_partitions().
+
+    :param combis: Die Kombinationsmöglichkeiten der Handkarten (sortiert, die besten zuerst!).
+    :param all_partitions: Wenn False, wird nur die erste kürzeste Partition ermittelt.
+    :return: Die kürzesten Partitionen (leer, wenn es keine Handkarten gibt).
+    """
+    index = _build_cover_index(combis)
+    if not index.hand:
+        return []
+    masks = index.masks
+    partitions = []
+
+    def search(rest: CardSet, path: List[int]) -> bool:
+        if not rest:
+            partitions.append([combis[i] for i in sorted(path)])
+            return all_partitions
+        length = _min_length(index, rest)
+        for i in index.by_card[_get_pivot(index, rest)]:  # Kombinationen mit der Pivot-Karte
+            mask = masks[i]
+            if mask & rest == mask and _min_length(index, rest ^ mask) == length - 1:
+                if not search(rest ^ mask, path + [i]):
+                    return False
+        return True
+
+    search(index.hand, [])
+    return partitions
+
+
+def _get_combi_key(combi: Tuple[Cards, Combination]) -> Tuple[CardSet, CombinationId]:
+    """
+    Ermittelt einen hashbaren Schlüssel für eine Kombination der Handkarten.
+
+    Die Karten allein reichen nicht, da der Phönix in einer Straße unterschiedliche Ränge ergeben kann.
+
+    :param combi: Die Kombination (Karten, (Typ, Länge, Rang)).
+    :return: Die Karten als Bitmaske und die ID der Kombination.
+    """
+    return cards_to_mask(combi[0]), get_combination_id(combi[1])
+
+
 def remove_partitions(partitions: List[Partition], cards: Cards) -> List[Partition]:
     """
     Entfernt Karten aus den Partitionen.
@@ -68,21 +281,26 @@ def remove_partitions(partitions: List[Partition], cards: Cards) -> List[Partiti
     :param cards: Karten, die entfernt werden sollen.
     :return: Die neue Liste der Partitionen.
     """
+    removed = set(cards)
     new_partitions = []
+    seen = set()  # sortierte Schlüssel der übernommenen Partitionen (Duplikate erkennen)
     for partition in partitions:
         new_partition = []
         skip = False
         for combi in partition:
-            found = set(cards).intersection(combi[0])
+            found = removed.intersection(combi[0])
             if not found:
                 new_partition.append(combi)  # die Kombination ist nicht betroffen
-            elif list(found) == combi[0]:
+            elif len(found) == len(combi[0]):
                 pass  # die Kombination wird nicht übernommen, da alle Karten der Kombination betroffen sind
             else:
                 skip = True  # die gesamte Partition wird verworfen, weil die Kombi auseinandergerissen ist
                 break
-        if not skip and new_partition and new_partition not in new_partitions:
-            new_partitions.append(new_partition)
+        if not skip and new_partition:
+            key = tuple(sorted(map(_get_combi_key, new_partition)))
+            if key not in seen:
+                seen.add(key)
+                new_partitions.append(new_partition)
     return new_partitions
 
 
@@ -94,13 +312,8 @@ def filter_playable_partitions(partitions: List[Partition], action_space: List[T
     :param action_space: Die spielbaren Kombinationen.
     :return: Die Partitionen mit mindestens einer spielbaren Kombination.
     """
-    new_partitions = []
-    for partition in partitions:
-        for combi in partition:
-            if combi in action_space:
-                new_partitions.append(partition)
-                break
-    return new_partitions
+    playable = set(map(_get_combi_key, action_space))
+    return [partition for partition in partitions if any(_get_combi_key(combi) in playable for combi in partition)]
 
 
 def filter_playable_combinations(partition: Partition, action_space: List[Tuple[Cards, Combination]]) -> List[Tuple[Cards, Combination]]:
@@ -111,11 +324,311 @@ def filter_playable_combinations(partition: Partition, action_space: List[Tuple[
     :param action_space: Alle spielbaren Kombinationen der Handkarten.
     :return: Die spielbaren Kombinationen der Partition.
     """
-    combis = []
-    for combi in partition:
-        if combi in action_space:
-            combis.append(combi)
-    return combis
+    playable = set(map(_get_combi_key, action_space))
+    return [combi for combi in partition if _get_combi_key(combi) in playable]
+
+
+def build_shortest_playable_partitions(combis: List[Tuple[Cards, Combination]], action_space: List[Tuple[Cards, Combination]], max_count: Optional[int] = None) -> List[Partition]:
+    """
+    Ermittelt die kürzesten Partitionen mit mindestens einer spielbaren Kombination, ohne die anderen Partitionen zu bilden.
+
+    Das Ergebnis entspricht der Auswahl per filter_playable_partitions() und Beschränkung auf die kürzesten Partitionen.
+    Mit max_count = 2 lässt sich z.B. billig feststellen, ob die kürzeste spielbare Partition eindeutig ist.
+
+    :param combis: Die Kombinationsmöglichkeiten der Handkarten (sortiert, die besten zuerst!).
+    :param action_space: Die spielbaren Aktionen.
+    :param max_count: (Optional) Maximale Anzahl Partitionen; ist sie erreicht, wird die Suche beendet.
+    :return: Die kürzesten spielbaren Partitionen (leer, wenn keine Kombination der Handkarten spielbar ist).
+    """
+    index = _build_cover_index(combis)
+    hand = index.hand
+    masks = index.masks
+    playable_keys = set(map(_get_combi_key, action_space))
+    playable = [_get_combi_key(combi) in playable_keys for combi in combis]
+
+    # Länge der kürzesten Partition mit einer spielbaren Kombination
+    length = _INFINITY
+    for i in range(len(combis)):
+        if playable[i]:
+            length = min(length, 1 + _min_length(index, hand ^ masks[i]))
+    if length >= _INFINITY:
+        return []
+    partitions = []
+
+    def search(rest: CardSet, path: List[int], has_playable: bool) -> bool:
+        if not rest:
+            if has_playable:
+                partitions.append([combis[i] for i in sorted(path)])
+            return max_count is None or len(partitions) < max_count
+        m = length - len(path)  # Anzahl Kombinationen, die noch benötigt werden
+        if not _cover_lengths(index, rest) >> m & 1:
+            return True  # die Karten lassen sich nicht mit genau m Kombinationen überdecken
+        for i in index.by_card[_get_pivot(index, rest)]:  # Kombinationen mit der Pivot-Karte
+            mask = masks[i]
+            if mask & rest == mask:
+                if not search(rest ^ mask, path + [i], has_playable or playable[i]):
+                    return False
+        return True
+
+    search(hand, [], False)
+    return partitions
+
+
+def build_best_partition(combis: List[Tuple[Cards, Combination]], action_space: List[Tuple[Cards, Combination]], statistic: dict, time_budget: Optional[float] = None, max_nodes: Optional[int] = None) -> Optional[Partition]:
+    """
+    Sucht unter den kürzesten Partitionen mit mindestens einer spielbaren Kombination die Partition mit der besten Güte.
+
+    Das Ergebnis entspricht der Auswahl per filter_playable_partitions(), Beschränkung auf die kürzesten Partitionen und
+    Maximierung von src.lib.prob.statistic.partition_quality(), ohne dass die Partitionen zuvor aufgelistet werden
+    (bei gleicher Güte kann eine andere Partition gewählt werden).
+
+    Die Suche ist ein Branch-and-Bound: Bei fester Länge n ist die Güte (Σ(lo - hi) - lo_playing_now + hi_last_combi) / (n - 1).
+    Für eine unvollständige Partition wird eine optimistische Obergrenze dieses Zählers berechnet (die n - k größten
+    Werte lo - hi der noch passenden Kombinationen, das kleinste lo einer spielbaren und das größte hi einer passenden
+    Kombination). Zweige, deren Obergrenze die bisher beste Partition nicht übertrifft, werden verworfen.
+
+    :param combis: Die Kombinationsmöglichkeiten der Handkarten (sortiert, die besten zuerst!).
+    :param action_space: Die spielbaren Aktionen.
+    :param statistic: Ergebnis von src.lib.prob.statistic.calc_statistic() für die Kombinationsmöglichkeiten.
+    :param time_budget: (Optional) Zeitbudget in Sekunden. Ist es erschöpft, wird die bis dahin beste Partition geliefert.
+                        Das Ergebnis hängt dann von der Rechnerlast ab; für reproduzierbare Ergebnisse max_nodes verwenden.
+    :param max_nodes: (Optional) Maximale Anzahl besuchter Knoten. Ist sie erreicht, wird die bis dahin beste Partition geliefert.
+    :return: Die beste Partition oder None, wenn keine Kombination der Handkarten spielbar ist.
+    """
+    index = _build_cover_index(combis)
+    hand = index.hand
+    masks = index.masks
+    count = len(combis)
+
+    playable_keys = {(tuple(cards), combination) for cards, combination in action_space}
+    playable = [(tuple(cards), combination) in playable_keys for cards, combination in combis]
+    lo = []
+    hi = []
+    for cards, _ in combis:
+        lo_opp, lo_par, hi_opp, hi_par, _eq_opp, _eq_par = statistic[tuple(cards)]
+        lo.append(lo_opp + lo_par)
+        hi.append(hi_opp + hi_par)
+    value = [lo[i] - hi[i] for i in range(count)]
+
+    # Länge der kürzesten Partition mit einer spielbaren Kombination
+    length = _INFINITY
+    for i in range(count):
+        if playable[i]:
+            length = min(length, 1 + _min_length(index, hand ^ masks[i]))
+    if length >= _INFINITY:
+        return None
+    if length == 1:
+        return [next(combis[i] for i in range(count) if playable[i] and masks[i] == hand)]  # Güte ist 1
+
+    # Kombinationen mit der Pivot-Karte, die mit dem größten Wert zuerst (damit früh eine gute Partition gefunden wird)
+    children = [sorted(by_card, key=lambda i: -value[i]) for by_card in index.by_card]
+    deadline = time.perf_counter() + time_budget if time_budget is not None else math.inf
+    nodes_left = max_nodes if max_nodes is not None else math.inf
+    best_path = None
+    best_value = -math.inf
+
+    def search(rest: int, path: List[int], total: float, lo_playing_now: float, hi_last_combi: float) -> bool:
+        nonlocal best_path, best_value, nodes_left
+        if not rest:
+            if lo_playing_now < math.inf and best_value < total - lo_playing_now + hi_last_combi:
+                best_value = total - lo_playing_now + hi_last_combi
+                best_path = path
+            return True
+        m = length - len(path)  # Anzahl Kombinationen, die noch benötigt werden
+        if not _cover_lengths(index, rest) >> m & 1:
+            return True  # die Karten lassen sich nicht mit genau m Kombinationen überdecken
+        nodes_left -= 1
+        if best_path is not None and (nodes_left < 0 or time.perf_counter() > deadline):
+            return False  # Knoten- bzw. Zeitbudget erschöpft
+
+        # optimistische Obergrenze
+        values = []
+        lo_min = lo_playing_now
+        hi_max = hi_last_combi
+        for i in range(count):
+            mask = masks[i]
+            if mask & rest == mask:
+                values.append(value[i])
+                if playable[i] and lo_min > lo[i]:
+                    lo_min = lo[i]
+                if hi_max < hi[i]:
+                    hi_max = hi[i]
+        if lo_min == math.inf:
+            return True  # es kann keine spielbare Kombination mehr hinzukommen
+        if total + sum(heapq.nlargest(m, values)) - lo_min + hi_max <= best_value:
+            return True
+
+        for i in children[_get_pivot(index, rest)]:
+            mask = masks[i]
+            if mask & rest == mask:
+                if not search(rest ^ mask, path + [i], total + value[i],
+                              min(lo_playing_now, lo[i]) if playable[i] else lo_playing_now, max(hi_last_combi, hi[i])):
+                    return False
+        return True
+
+    search(hand, [], 0., math.inf, -math.inf)
+    return [combis[i] for i in sorted(best_path)] if best_path is not None else None
+
+
+# ------------------------------------------------------
+# Partitionsspeicher
+# ------------------------------------------------------
+
+class PartitionStore:
+    """
+    Speichert Partitionen mit einem invertierten Index von der Kombination zu den Partitionen.
+
+    Jede Kombination der Handkarten erhält eine fortlaufende ID (Schlüssel sind die Karten als Bitmaske und die
+    Kombinations-ID, siehe get_combination_id()). Eine Partition wird über die sortierten IDs ihrer Kombinationen
+    identifiziert, so dass Duplikate per Hash erkannt werden. Das Entfernen von Karten und das Filtern nach spielbaren
+    Kombinationen betrifft nur die Partitionen, die der Index liefert.
+
+    Die Reihenfolge der Partitionen bleibt erhalten (wie bei remove_partitions() und filter_playable_partitions()).
+
+    :ivar partitions: Die Partitionen (zuerst die besten). Die Liste wird bei jeder Änderung neu angelegt.
+    """
+
+    def __init__(self, partitions: Optional[List[Partition]] = None):
+        """
+        Initialisiert den Speicher.
+
+        :param partitions: (Optional) Die Partitionen, die übernommen werden.
+        """
+        self._combi_ids: Dict[Tuple[CardSet, CombinationId], int] = {}  # Schlüssel der Kombination -> ID
+        self._combi_masks: List[CardSet] = []  # ID der Kombination -> Karten als Bitmaske
+        self._by_combi: List[Set[int]] = []  # ID der Kombination -> IDs der Partitionen (invertierter Index)
+        self._entries: Dict[int, Tuple[Tuple[int, ...], Partition]] = {}  # ID der Partition -> (IDs der Kombinationen, Partition)
+        self._keys: Dict[Tuple[int, ...], int] = {}  # sortierte IDs der Kombinationen -> ID der Partition
+        self._next_id = 0
+        self.partitions: List[Partition] = []
+        if partitions:
+            for partition in partitions:
+                self._add(partition)
+            self.partitions = [partition for _, partition in self._entries.values()]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_combi_id(self, combi: Tuple[Cards, Combination]) -> int:
+        """
+        Ermittelt die ID einer Kombination der Handkarten und vergibt eine neue ID, falls nötig.
+
+        :param combi: Die Kombination (Karten, (Typ, Länge, Rang)).
+        :return: Die ID der Kombination.
+        """
+        key = _get_combi_key(combi)
+        i = self._combi_ids.get(key)
+        if i is None:
+            i = len(self._combi_masks)
+            self._combi_ids[key] = i
+            self._combi_masks.append(key[0])
+            self._by_combi.append(set())
+        return i
+
+    def _add(self, partition: Partition) -> bool:
+        """
+        Fügt eine Partition hinzu, sofern sie noch nicht vorhanden ist (aktualisiert nicht die Liste `partitions`).
+
+        :param partition: Die Partition.
+        :return: True, wenn die Partition hinzugefügt wurde, False, wenn sie bereits vorhanden ist.
+        """
+        ids = tuple(self._get_combi_id(combi) for combi in partition)
+        key = tuple(sorted(ids))
+        if key in self._keys:
+            return False
+        pid = self._next_id
+        self._next_id += 1
+        self._keys[key] = pid
+        self._entries[pid] = ids, partition
+        for i in ids:
+            self._by_combi[i].add(pid)
+        return True
+
+    def add(self, partition: Partition) -> bool:
+        """
+        Fügt eine Partition am Ende hinzu, sofern sie noch nicht vorhanden ist.
+
+        :param partition: Die Partition.
+        :return: True, wenn die Partition hinzugefügt wurde, False, wenn sie bereits vorhanden ist.
+        """
+        if not self._add(partition):
+            return False
+        self.partitions = self.partitions + [partition]
+        return True
+
+    def _discard(self, pid: int):
+        """
+        Entfernt eine Partition aus dem invertierten Index und dem Speicher.
+
+        :param pid: Die ID der Partition.
+        """
+        ids, _ = self._entries.pop(pid)
+        for i in ids:
+            self._by_combi[i].discard(pid)
+
+    def remove_cards(self, cards: Cards):
+        """
+        Entfernt Karten aus den Partitionen (wie remove_partitions()).
+
+        Partitionen, in denen eine Kombination auseinandergerissen wird, werden verworfen. Kombinationen, deren Karten
+        vollständig entfernt werden, fallen aus den Partitionen heraus. Partitionen, die dadurch leer oder gleich einer
+        vorherigen Partition werden, werden ebenfalls verworfen.
+
+        :param cards: Die Karten, die entfernt werden sollen.
+        """
+        mask = cards_to_mask(cards)
+        broken = set()  # Partitionen mit einer auseinandergerissenen Kombination
+        shrunk = set()  # Partitionen mit einer vollständig entfernten Kombination
+        dropped_combis = set()
+        for i, combi_mask in enumerate(self._combi_masks):
+            if combi_mask & mask and self._by_combi[i]:
+                if combi_mask & mask == combi_mask:
+                    shrunk.update(self._by_combi[i])
+                    dropped_combis.add(i)
+                else:
+                    broken.update(self._by_combi[i])
+        if not broken and not shrunk:
+            return
+
+        for pid in broken:
+            self._keys.pop(tuple(sorted(self._entries[pid][0])))
+            self._discard(pid)
+        shrunk -= broken
+        for pid in shrunk:
+            self._keys.pop(tuple(sorted(self._entries[pid][0])))
+
+        # verkürzte Partitionen in der ursprünglichen Reihenfolge neu einordnen (bei Duplikaten gewinnt die vorherige)
+        for pid in sorted(shrunk):
+            ids, partition = self._entries[pid]
+            new_ids = tuple(i for i in ids if i not in dropped_combis)
+            key = tuple(sorted(new_ids))
+            other = self._keys.get(key)
+            if not new_ids or (other is not None and other < pid):
+                self._discard(pid)
+                continue
+            if other is not None:
+                self._discard(other)
+            for i in ids:
+                if i in dropped_combis:
+                    self._by_combi[i].discard(pid)
+            self._keys[key] = pid
+            self._entries[pid] = new_ids, [combi for i, combi in zip(ids, partition) if i not in dropped_combis]
+
+        self.partitions = [partition for _, partition in self._entries.values()]
+
+    def filter_playable(self, action_space: List[Tuple[Cards, Combination]]) -> List[Partition]:
+        """
+        Ermittelt die Partitionen, die mindestens eine spielbare Kombination haben (wie filter_playable_partitions()).
+
+        :param action_space: Die spielbaren Kombinationen.
+        :return: Die Partitionen mit mindestens einer spielbaren Kombination (in der gespeicherten Reihenfolge).
+        """
+        pids = set()
+        for combi in action_space:
+            i = self._combi_ids.get(_get_combi_key(combi))
+            if i is not None:
+                pids.update(self._by_combi[i])
+        return [self._entries[pid][1] for pid in sorted(pids)]
 
 
 def stringify_partition(partition: Partition) -> str:
@@ -0,0 +1,164 @@
+"""
+Dieses Modul stellt die Automaten und Polynome bereit, mit denen Hände über erzeugende Funktionen gezählt werden.
+
+Die verfügbaren Karten einer Position (z.B. eines Rangs) werden als Polynom dargestellt: Der Koeffizient von x^j ist die
+Anzahl Möglichkeiten, j dieser Karten auf die Hand zu bekommen. Ein kleiner Automat verarbeitet die Positionen der Reihe
+nach; Hände, die die gesuchte Kombination sicher enthalten, landen im absorbierenden Zustand `FOUND`.
+
+Genutzt von prob_gf (exakte Einzelwerte) und statistic (alle Kombinationen einer Hand in einem Durchgang).
+"""
+
+__all__ = "FOUND", "run_automaton", "mul_poly", "free_poly", \
+    "tuple_step", "stair_step", "street_step", "fullhouse_step", "fullhouse_accept", \
+    "count_color_without_higher_color_bomb",
+
+import math
+import numpy as np
+from src.lib.cards import Cards
+from typing import Callable, Dict, Hashable
+
+# ------------------------------------------------------
+# Polynome
+# ------------------------------------------------------
+
+FOUND = "found"
+"""Absorbierender Zustand: Die Hand enthält die gesuchte Kombination"""
+
+
+# Multipliziert die Polynome aller Ränge und führt dabei je Zustand des Automaten ein eigenes Produkt
+#
+# Die Polynome werden beim Grad k abgeschnitten (höhere Grade werden nicht benötigt).
+#
+# h: Anzahl verfügbarer Karten je Position (z.B. je Rang)
+# positions: Die Positionen in der Reihenfolge, in der der Automat sie verarbeitet
+# k: Höchster benötigter Grad
+# init: Startzustand
+# step: Übergangsfunktion (Zustand, Position, Anzahl Karten j) -> neuer Zustand
+# return: Je Zustand das Polynom (Koeffizient i = Anzahl Möglichkeiten mit i Karten)
+def run_automaton(h, positions, k: int, init: Hashable, step: Callable) -> Dict[Hashable, np.ndarray]:
+    polys = {init: np.eye(1, k + 1, dtype=np.int64)[0]}
+    for x in positions:
+        c = int(h[x])
+        result = {}
+        for state, poly in polys.items():
+            for j in range(min(c, k) + 1):
+                next_state = FOUND if state == FOUND else step(state, x, j)
+                term = np.zeros(k + 1, dtype=np.int64)
+                term[j:] = poly[:k + 1 - j] * math.comb(c, j)
+                if next_state in result:
+                    result[next_state] += term
+                else:
+                    result[next_state] = term
+        polys = result
+    return polys
+
+
+# Multipliziert zwei Polynome (abgeschnitten beim Grad der Polynome)
+def mul_poly(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.convolve(a, b)[:len(a)]
+
+
+# Gibt das Polynom (1 + x)^f zurück (f Karten, die für die Kombination keine Rolle spielen)
+def free_poly(f: int, k: int) -> np.ndarray:
+    return np.array([math.comb(f, i) for i in range(k + 1)], dtype=np.int64)
+
+
+# ------------------------------------------------------
+# Automaten
+# ------------------------------------------------------
+
+# Pärchen, Drilling oder 4er-Bombe (m gleiche Karten eines Rangs aus ranks; mit Phönix genügen m - 1)
+def tuple_step(m: int, ranks: set, pho: int) -> Callable:
+    def step(state, x, j):
+        return FOUND if x in ranks and j + pho >= m else state
+    return step
+
+
+# Treppe mit `steps` Pärchen; der höchste Rang liegt in ranks
+#
+# Zustand: (Anzahl aufeinanderfolgender Ränge mit mindestens 2 Karten, dito mit genau einem Rang mit nur 1 Karte)
+def stair_step(steps: int, ranks: set, pho: int) -> Callable:
+    def step(state, x, j):
+        a, b = state
+        if j >= 2:
+            a, b = min(a + 1, steps), (min(b + 1, steps) if b else 0)
+        elif j == 1:
+            a, b = 0, min(a + 1, steps)
+        else:
+            a, b = 0, 0
+        if x in ranks and (a >= steps or (pho and b >= steps)):
+            return FOUND
+        return a, b
+    return step
+
+
+# Straße der Länge m; der höchste Rang liegt in ranks
+#
+# Zustand: (Anzahl aufeinanderfolgender Ränge mit Karte, Länge der Folge mit einer Lücke, Anzahl Ränge über der Lücke)
+#
+# lo: Wenn True, darf der Phönix die unterste Karte nur ersetzen, wenn die Straße bis zum Ass reicht (wie in p_low)
+def street_step(m: int, ranks: set, pho: int, lo: bool) -> Callable:
+    def step(state, x, j):
+        a, length, d = state
+        if j > 0:
+            a = min(a + 1, m)
+            if length:
+                length, d = min(length + 1, m), min(d + 1, m)
+        else:
+            length, d, a = min(a + 1, m), 0, 0
+        if x in ranks:
+            if a >= m:
+                return FOUND
+            if pho and length >= m and (not lo or d != m - 1 or x == 14):
+                return FOUND
+        return a, length, d
+    return step
+
+
+# Fullhouse; der Drilling hat einen Rang aus ranks, das Pärchen einen beliebigen anderen Rang (2 bis Ass)
+#
+# Zustand: (Drilling in ranks, Pärchen in ranks, Anzahl Ränge mit mindestens 2 Karten, dito mit mindestens 1 Karte)
+# Entschieden wird erst am Ende (siehe fullhouse_accept()), da das Pärchen auch über dem Drilling liegen kann.
+def fullhouse_step(ranks: set) -> Callable:
+    def step(state, x, j):
+        t3, t2, c2, c1 = state
+        if x in ranks:
+            t3, t2 = t3 or j >= 3, t2 or j >= 2
+        return t3, t2, min(c2 + (j >= 2), 2), min(c1 + (j >= 1), 2)
+    return step
+
+
+def fullhouse_accept(state, pho: int) -> bool:
+    if state == FOUND:
+        return True
+    t3, t2, c2, c1 = state
+    if pho:
+        return (t3 and c1 >= 2) or (t2 and c2 >= 2)
+    return t3 and c2 >= 2
+
+
+# ------------------------------------------------------
+# Farbbomben
+# ------------------------------------------------------
+
+# Zählt die Möglichkeiten, Karten der gegebenen Farbe ohne höhere Farbbombe zu erhalten (Polynom bis zum Grad k)
+#
+# cards: Verfügbare Karten
+# color: Die Farbe
+# k: Höchste Anzahl der Handkarten
+# m: Länge der gegebenen Farbbombe
+# r: Rang der gegebenen Farbbombe (mit m = r = 5 irgendeine Farbbombe)
+def count_color_without_higher_color_bomb(cards: Cards, color: int, k: int, m: int = 5, r: int = 5) -> np.ndarray:
+    # Zustand: Länge der Folge; gleiche Länge mit höherem Rang oder längere Bombe mit niedrigerem Rang
+    def step(run, x, j):
+        run = run + 1 if j else 0
+        if (run >= m and x >= max(r + 1, 6)) or (m < 14 and r > 5 and run >= m + 1 and m + 2 <= x <= r):
+            return FOUND
+        return min(run, m + 1)
+
+    h = [0] * 17
+    for v, c in cards:
+        if 2 <= v <= 14 and c == color:
+            h[v] = 1
+    polys = run_automaton(h, range(2, 15), k, 0, step)
+    return sum((poly for state, poly in polys.items() if state != FOUND), np.zeros(k + 1, dtype=np.int64))
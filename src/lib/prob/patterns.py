@@ -0,0 +1,272 @@
+"""
+Dieses Modul stellt die Hilfstabellen für die Wahrscheinlichkeitsberechnung (`p_high` und `p_low`) als NumPy-Arrays
+bereit und zählt die passenden Hände vektorisiert.
+
+Ein Muster der Hilfstabelle gibt für aufeinanderfolgende Ränge an, wie viele Karten des Rangs auf der Hand sein müssen.
+Die Muster einer Tabelle werden auf eine gemeinsame Breite aufgefüllt (0 Karten, Rang gehört nicht zum Muster), so dass
+alle Muster mit einer Array-Operation gegen die verfügbaren Karten geprüft werden können.
+
+Da die großen Tabellen über eine Million Muster haben, wird zusätzlich je Rang und verfügbarer Kartenanzahl ein
+Bitset der Muster vorberechnet, die mehr Karten verlangen (ebenso je Anzahl Handkarten ein Bitset der Muster mit zu
+vielen Karten). Die passenden Muster ergeben sich so durch ein Oder über wenige Bitsets; nur für diese wird gerechnet.
+
+Die Arrays werden in einem versionierten Binärformat gespeichert und schreibgeschützt per mmap eingeblendet, so dass
+sich alle Prozesse (Arena-Worker, Server) dieselben Speicherseiten teilen und nichts entpackt werden muss:
+
+    Magic "TPAT" | Version (uint32) | Länge des Headers (uint32) | Header (JSON) | Arrays (je an 64 Byte ausgerichtet)
+
+Der Header listet je Phönix-Variante offset, bounds und zu jedem Array Name, Datentyp, Shape und Position in der Datei.
+"""
+
+__all__ = "BINOMIAL", "PatternTable", "build_pattern_table", "match_rows", "count_hands", \
+    "PATTERN_FORMAT_VERSION", "save_pattern_tables", "map_pattern_tables", "verify_pattern_table",
+
+import json
+import math
+import mmap
+import numpy as np
+import os
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# ------------------------------------------------------
+# Binomialkoeffizienten
+# ------------------------------------------------------
+
+BINOMIAL = np.array([[math.comb(n, k) for k in range(15)] for n in range(57)], dtype=np.int64)
+"""
+Binomialkoeffizienten n über k für n = 0..56 (verfügbare Karten) und k = 0..14 (Handkarten).
+"""
+
+# ------------------------------------------------------
+# Mustertabellen
+# ------------------------------------------------------
+
+_SMALL = 1024
+"""Bis zu dieser Anzahl Muster werden die Muster direkt verglichen (ohne Bitsets)"""
+
+@dataclass
+class PatternTable:
+    """
+    Die Muster einer Hilfstabelle als aufgefüllte NumPy-Arrays (für eine Phönix-Variante).
+
+    :ivar ranks: Rang der Kombination je Muster (aufsteigend sortiert), Shape (N,).
+    :ivar cases: Kartenanzahl je Rang, Shape (N, W). Spalte i entspricht dem Rang offset + i.
+    :ivar covered: True, wenn der Rang zum Muster gehört, Shape (N, W).
+    :ivar sizes: Anzahl Karten im Muster, Shape (N,).
+    :ivar offset: Rang der ersten Spalte.
+    :ivar bounds: Je Rang r (0 bis 17) die erste Zeile mit einem Rang größer oder gleich r.
+    :ivar too_many: Bitsets (np.packbits) der Muster, die mehr als x Karten in Spalte i verlangen, Shape (W, 5, ceil(N/8)).
+    :ivar too_large: Bitsets (np.packbits) der Muster mit mehr als k Karten, Shape (15, ceil(N/8)).
+    """
+    ranks: np.ndarray
+    cases: np.ndarray
+    covered: np.ndarray
+    sizes: np.ndarray
+    offset: int
+    bounds: Tuple[int, ...]
+    too_many: np.ndarray
+    too_large: np.ndarray
+
+    def select(self, r_from: int, r_to: int) -> slice:
+        """
+        Ermittelt die Zeilen der Muster, deren Rang im gegebenen Bereich liegt.
+
+        :param r_from: Kleinster Rang (inklusiv).
+        :param r_to: Größter Rang (exklusiv).
+        :return: Die Zeilen als Slice.
+        """
+        return slice(self.bounds[min(max(r_from, 0), 17)], self.bounds[min(max(r_to, 0), 17)])
+
+
+def _derive(ranks: np.ndarray, cases: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Tuple[int, ...]]:
+    # Berechnet die aus den Mustern abgeleiteten Arrays (sizes, too_many, too_large, bounds)
+    sizes = cases.sum(axis=1, dtype=np.int16)
+    too_many = np.packbits(cases.T[:, None, :] > np.arange(5, dtype=np.int8)[None, :, None], axis=2)
+    too_large = np.packbits(sizes[None, :] > np.arange(15, dtype=np.int16)[:, None], axis=1)
+    bounds = tuple(int(b) for b in np.searchsorted(ranks, np.arange(18), "left"))
+    return sizes, too_many, too_large, bounds
+
+
+def build_pattern_table(table: Dict[int, List[tuple]], offset: int, width: int, align_right: bool) -> PatternTable:
+    """
+    Wandelt eine Hilfstabelle (Muster je Rang) in eine PatternTable um.
+
+    :param table: Die Muster je Rang der Kombination (eine Phönix-Variante der Hilfstabelle).
+    :param offset: Rang der ersten Spalte.
+    :param width: Anzahl Spalten.
+    :param align_right: Wenn True, endet jedes Muster in der letzten Spalte (p_high), sonst beginnt es in der ersten Spalte (p_low).
+    :return: Die PatternTable.
+    """
+    rows = [(r, case) for r in sorted(table) for case in table[r]]
+    ranks = np.array([r for r, _ in rows], dtype=np.int16)
+    cases = np.zeros((len(rows), width), dtype=np.int8)
+    covered = np.zeros((len(rows), width), dtype=bool)
+    for i, (_, case) in enumerate(rows):
+        assert len(case) <= width
+        start = width - len(case) if align_right else 0
+        cases[i, start:start + len(case)] = case
+        covered[i, start:start + len(case)] = True
+    sizes, too_many, too_large, bounds = _derive(ranks, cases)
+    return PatternTable(ranks=ranks, cases=cases, covered=covered, sizes=sizes, offset=offset, bounds=bounds, too_many=too_many, too_large=too_large)
+
+
+def match_rows(table: PatternTable, rows: slice, h: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ermittelt die Muster, die mit den verfügbaren Karten gebildet werden können.
+
+    :param table: Die Mustertabelle.
+    :param rows: Die zu prüfenden Zeilen (siehe PatternTable.select()).
+    :param h: Anzahl verfügbarer Karten je Rang (Index ist der Rang).
+    :param k: Anzahl Handkarten, die für das Muster höchstens zur Verfügung stehen.
+    :return: Je passendem Muster die Anzahl Möglichkeiten für die Karten im Muster, die Anzahl verfügbarer Karten der
+             Ränge im Muster und die Anzahl Karten im Muster.
+    """
+    width = table.cases.shape[1]
+    hw = h[table.offset:table.offset + width]
+    if rows.start >= rows.stop:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int16)
+
+    # Muster verwerfen, die mehr Karten verlangen als verfügbar sind
+    if rows.stop - rows.start <= _SMALL:
+        # wenige Muster direkt vergleichen
+        ok = (table.sizes[rows] <= k) & (table.cases[rows] <= hw).all(axis=1)
+        ok = np.flatnonzero(ok) + rows.start
+    else:
+        # Oder über die Bitsets der betroffenen Bytes
+        b_start, b_stop = rows.start // 8, (rows.stop + 7) // 8
+        failed = table.too_many[np.arange(width), np.minimum(hw, 4), b_start:b_stop]
+        failed = np.bitwise_or.reduce(failed, axis=0) | table.too_large[min(k, 14), b_start:b_stop]
+        free = ~failed
+        free_bytes = np.flatnonzero(free)
+        row, bit = np.nonzero(np.unpackbits(free[free_bytes]).reshape(-1, 8))
+        ok = (free_bytes[row] + b_start) * 8 + bit
+        ok = ok[(ok >= rows.start) & (ok < rows.stop)]
+
+    ways = BINOMIAL[hw, table.cases[ok]].prod(axis=1)
+    used = table.covered[ok] @ hw
+    return ways, used, table.sizes[ok]
+
+
+def count_hands(table: PatternTable, rows: slice, h: np.ndarray, n: int, k: int) -> int:
+    """
+    Zählt die Hände, die eines der Muster enthalten.
+
+    Je Muster werden die Binomialkoeffizienten der Ränge im Muster mit dem Binomialkoeffizienten für die restlichen
+    Handkarten aus den restlichen Karten multipliziert; die Produkte werden summiert.
+
+    :param table: Die Mustertabelle.
+    :param rows: Die zu prüfenden Zeilen (siehe PatternTable.select()).
+    :param h: Anzahl verfügbarer Karten je Rang (Index ist der Rang).
+    :param n: Anzahl der verfügbaren Karten, aus denen die Hand gebildet wird.
+    :param k: Anzahl der Handkarten, die mit dem Muster und den restlichen Karten gebildet werden.
+    :return: Anzahl Hände.
+    """
+    ways, used, sizes = match_rows(table, rows, h, k)
+    return int((ways * BINOMIAL[n - used, k - sizes]).sum())
+
+
+# ------------------------------------------------------
+# Binärformat
+# ------------------------------------------------------
+
+PATTERN_FORMAT_VERSION = 1
+"""Version des Binärformats (wird beim Einblenden geprüft)"""
+
+_MAGIC = b"TPAT"
+_PREAMBLE = struct.Struct("<4sII")  # Magic, Version, Länge des Headers
+_ALIGN = 64
+_ARRAYS = "ranks", "cases", "covered", "sizes", "too_many", "too_large"
+
+
+def save_pattern_tables(file: str, tables: Tuple[PatternTable, ...]):
+    """
+    Speichert die Mustertabellen (je Phönix-Variante eine) im Binärformat.
+
+    Die Datei wird zunächst unter einem temporären Namen geschrieben und dann umbenannt, damit parallel laufende
+    Prozesse nie eine halb geschriebene Datei einblenden.
+
+    :param file: Der Dateiname.
+    :param tables: Die Mustertabellen.
+    """
+    header = {"tables": []}
+    blobs = []
+    pos = 0
+    for table in tables:
+        entry = {"offset": table.offset, "bounds": list(table.bounds), "arrays": {}}
+        for name in _ARRAYS:
+            a = np.ascontiguousarray(getattr(table, name))
+            pos = (pos + _ALIGN - 1) // _ALIGN * _ALIGN
+            entry["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "pos": pos}
+            blobs.append((pos, a))
+            pos += a.nbytes
+        header["tables"].append(entry)
+    data = json.dumps(header).encode("utf-8")
+    start = (_PREAMBLE.size + len(data) + _ALIGN - 1) // _ALIGN * _ALIGN  # Beginn der Arrays
+    end = start + pos
+    tmp = f"{file}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(_PREAMBLE.pack(_MAGIC, PATTERN_FORMAT_VERSION, len(data)))
+        fp.write(data)
+        for pos, a in blobs:
+            fp.seek(start + pos)
+            fp.write(a.tobytes())
+        fp.truncate(end)
+    os.replace(tmp, file)
+
+
+def map_pattern_tables(file: str) -> Tuple[PatternTable, ...]:
+    """
+    Blendet die Mustertabellen schreibgeschützt aus der Datei ein.
+
+    Die Arrays sind Sichten auf die eingeblendete Datei; es wird nichts kopiert.
+
+    :param file: Der Dateiname.
+    :return: Die Mustertabellen (je Phönix-Variante eine).
+    :raises ValueError: Wenn die Datei kein gültiges Format oder eine andere Version hat.
+    """
+    with open(file, "rb") as fp:
+        buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError(f"{file}: Datei ist zu kurz")
+    magic, version, length = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != _MAGIC:
+        raise ValueError(f"{file}: Keine Mustertabelle")
+    if version != PATTERN_FORMAT_VERSION:
+        raise ValueError(f"{file}: Version {version} wird nicht unterstützt (erwartet {PATTERN_FORMAT_VERSION})")
+    header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + length]).decode("utf-8"))
+    start = (_PREAMBLE.size + length + _ALIGN - 1) // _ALIGN * _ALIGN
+    tables = []
+    for entry in header["tables"]:
+        arrays = {}
+        for name in _ARRAYS:
+            spec = entry["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            count = math.prod(shape)
+            if start + spec["pos"] + count * dtype.itemsize > len(buffer):
+                raise ValueError(f"{file}: Array {name} liegt außerhalb der Datei")
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start + spec["pos"]).reshape(shape)
+        tables.append(PatternTable(offset=entry["offset"], bounds=tuple(entry["bounds"]), **arrays))
+    return tuple(tables)
+
+
+def verify_pattern_table(table: PatternTable) -> bool:
+    """
+    Prüft, ob die abgeleiteten Arrays (Bitsets, Anzahl Karten, Grenzen) zu den Mustern passen.
+
+    Dabei werden alle Seiten der Tabelle gelesen, d.h. die Funktion lädt eine eingeblendete Tabelle vollständig in den
+    Speicher (Page-Cache).
+
+    :param table: Die Mustertabelle.
+    :return: True, wenn die Tabelle konsistent ist.
+    """
+    n, width = table.cases.shape
+    if table.ranks.shape != (n,) or table.sizes.shape != (n,) or table.covered.shape != (n, width):
+        return False
+    if np.any(np.diff(table.ranks) < 0) or np.any(table.cases[~table.covered] != 0):
+        return False
+    sizes, too_many, too_large, bounds = _derive(table.ranks, table.cases)
+    return (np.array_equal(sizes, table.sizes) and np.array_equal(too_many, table.too_many)
+            and np.array_equal(too_large, table.too_large) and bounds == table.bounds)
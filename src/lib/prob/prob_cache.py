@@ -0,0 +1,143 @@
+"""
+Dieses Modul definiert einen Cache für die Wahrscheinlichkeiten `p_high` und `p_low`.
+
+Innerhalb eines Stichs ändern sich die ungespielten Karten und die Anzahl Handkarten der Gegner kaum, so dass dieselben
+Wahrscheinlichkeiten bei aufeinanderfolgenden Entscheidungen (auch verschiedener Spieler) mehrfach benötigt werden.
+Die Funktionen prob_of_higher_combi_or_bomb() und prob_of_lower_combi() sowie deren Batch-Varianten lesen und füllen
+daher den Cache des Prozesses (siehe get_prob_cache()), der über die Runden hinweg erhalten bleibt.
+
+Der Schlüssel ist (Art, Bitmaske der verfügbaren Karten, Anzahl Handkarten, Kombination). Das Ergebnis hängt nur
+davon ab; insbesondere sind die Sonderfälle Phönix und Hund allein durch die Kombination bestimmt (der Phönix als
+Anspielkarte hat den Rang 16, sonst wird die vom Phönix gestochene Karte angegeben; der Hund hat den Rang 0).
+
+Der Cache ist auf eine maximale Anzahl Einträge begrenzt; ist er voll, wird der am längsten nicht verwendete Eintrag
+verdrängt (LRU).
+"""
+
+__all__ = "ProbCache", "get_prob_cache",
+
+import numpy as np
+from collections import OrderedDict
+from src import config
+from typing import Callable, Optional, Sequence
+
+
+class ProbCache:
+    """
+    LRU-Cache für die Wahrscheinlichkeiten `p_high` und `p_low` (siehe Moduldokumentation).
+    """
+
+    def __init__(self, size: int = config.PROB_CACHE_SIZE):
+        """
+        :param size: Maximale Anzahl Einträge (0 == kein Cache, jede Anfrage wird berechnet).
+        """
+        self._size = size
+        self._data: OrderedDict = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size(self) -> int:
+        """Maximale Anzahl Einträge"""
+        return self._size
+
+    @property
+    def hits(self) -> int:
+        """Anzahl Treffer"""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Anzahl Fehltreffer"""
+        return self._misses
+
+    @property
+    def hit_rate(self) -> float:
+        """Trefferquote (0, wenn noch nicht gelesen wurde)"""
+        return self._hits / (self._hits + self._misses) if self._hits + self._misses else 0.
+
+    def clear(self):
+        """Leert den Cache und setzt die Zähler zurück."""
+        self._data.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple):
+        """
+        Liest einen Eintrag und markiert ihn als zuletzt verwendet.
+
+        :param key: Der Schlüssel (Art, Bitmaske der verfügbaren Karten, Anzahl Handkarten, Kombination).
+        :return: Der Wert oder None, wenn der Eintrag nicht vorhanden ist.
+        """
+        value = self._data.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value):
+        """
+        Schreibt einen Eintrag und verdrängt ggf. den am längsten nicht verwendeten.
+
+        :param key: Der Schlüssel (Art, Bitmaske der verfügbaren Karten, Anzahl Handkarten, Kombination).
+        :param value: Der Wert.
+        """
+        if self._size <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._size:
+            self._data.popitem(last=False)
+
+    def fill_batch(self, prefix: tuple, combinations: Sequence, func: Callable[[list], Sequence], result: np.ndarray):
+        """
+        Füllt das Ergebnis einer Batch-Anfrage aus dem Cache und berechnet die fehlenden Einträge in einem Durchgang.
+
+        :param prefix: Der Schlüssel ohne die Kombination (Art, Bitmaske der verfügbaren Karten, Anzahl Handkarten).
+        :param combinations: Die gegebenen Kombinationen (Typ, Länge und Rang).
+        :param func: Berechnet die Werte für eine Liste von Kombinationen (in derselben Reihenfolge).
+        :param result: Das Ergebnis-Array (wird befüllt; je Kombination eine Zeile).
+        """
+        missing = {}  # Kombination -> Indizes im Ergebnis
+        for i, combination in enumerate(combinations):
+            combination = tuple(combination)
+            if combination in missing:
+                missing[combination].append(i)  # in dieser Anfrage bereits als Fehltreffer gezählt
+                continue
+            value = self.get(prefix + (combination,))
+            if value is None:
+                missing[combination] = [i]
+            else:
+                result[i] = value
+        if not missing:
+            return
+        values = func(list(missing))
+        for value, (combination, indices) in zip(values, missing.items()):
+            value = tuple(float(v) for v in value) if np.ndim(value) else float(value)
+            self.put(prefix + (combination,), value)
+            result[indices] = value
+
+
+# ------------------------------------------------------
+# Cache des Prozesses
+# ------------------------------------------------------
+
+_cache: Optional[ProbCache] = None
+
+
+def get_prob_cache() -> ProbCache:
+    """
+    Gibt den Cache des aktuellen Prozesses zurück (wird beim ersten Aufruf angelegt und bleibt über die Runden hinweg
+    erhalten).
+
+    :return: Der Cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ProbCache()
+    return _cache
@@ -0,0 +1,181 @@
+"""
+Dieses Modul berechnet die Wahrscheinlichkeiten `p_high` und `p_low` exakt über erzeugende Funktionen.
+
+Die verfügbaren Karten eines Rangs werden als Polynom dargestellt: Der Koeffizient von x^j ist die Anzahl Möglichkeiten,
+j dieser Karten auf die Hand zu bekommen (also C(h, j)). Das Produkt der Polynome aller Ränge zählt die Hände je
+Anzahl Handkarten. Damit nur die Hände gezählt werden, die die gesuchte Kombination enthalten, wird das Produkt Rang für
+Rang gebildet und je Zustand eines kleinen Automaten getrennt geführt (z.B. Länge der bisherigen Folge bei einer
+Straße). Hände, die die Kombination sicher enthalten, landen im absorbierenden Zustand `FOUND`.
+
+Der Phönix wird getrennt behandelt: Es wird einmal ohne und einmal mit Phönix auf der Hand gerechnet (dann ist eine
+Handkarte weniger zu verteilen und der Automat darf eine fehlende Karte ersetzen). Farbbomben werden je Farbe gezählt;
+die Hände ohne Farbbombe ergeben sich aus dem Produkt der Polynome der vier Farben.
+
+Es werden keine Hilfstabellen benötigt, und der Aufwand ist vorhersehbar (höchstens 15 Ränge mal wenige Zustände mal
+Polynome vom Grad k). Die Funktionen dienen daher auch zur Kontrolle der Hilfstabellen von prob_hi und prob_lo; die
+Regeln entsprechen `possible_hands_hi` (ohne Bomben) und `possible_hands_lo`.
+"""
+
+__all__ = "count_hands_gf", "prob_of_higher_combi_gf", "prob_of_lower_combi_gf", \
+    "prob_of_any_4_bomb_gf", "prob_of_higher_color_bomb_gf",
+
+import math
+import numpy as np
+from src.lib.cards import ranks_to_vector, Cards
+from src.lib.combinations import validate_combination, CombinationType, Combination
+from src.lib.prob.automata import FOUND, run_automaton, mul_poly, free_poly, tuple_step, stair_step, street_step, fullhouse_step, \
+    fullhouse_accept, count_color_without_higher_color_bomb
+
+# ------------------------------------------------------
+# Zählen
+# ------------------------------------------------------
+
+# Zählt die Hände mit k Karten, die eine Kombination vom Typ t und der Länge m enthalten, deren Rang in ranks liegt
+#
+# Einzelkarten werden nicht unterstützt (siehe prob_of_higher_combi_gf()).
+# Bei einer Bombe der Länge 4 zählt der Phönix nicht; Farbbomben werden mit prob_of_higher_color_bomb_gf() gezählt.
+#
+# h: Anzahl verfügbarer Karten je Rang (Index ist der Rang, siehe ranks_to_vector())
+# k: Anzahl der Handkarten
+# t: Typ der Kombination
+# m: Länge der Kombination
+# ranks: Mögliche Ränge der Kombination (bei Treppe und Straße der höchste Rang)
+# lo: Wenn True, gilt die Regel von p_low für den Phönix am unteren Ende einer Straße
+# return: Anzahl Hände
+def count_hands_gf(h, k: int, t: CombinationType, m: int, ranks, lo: bool = False) -> int:
+    ranks = set(ranks)
+    if not ranks:
+        return 0
+    n = sum(h)
+    pho_avail = h[16] if t != CombinationType.BOMB else 0
+    positions = range(1, 15) if t == CombinationType.STREET else range(2, 15)  # die Straße kann mit dem Mahjong beginnen
+    free = n - sum(h[x] for x in positions) - pho_avail
+    matches = 0
+    for pho in range(pho_avail + 1):
+        k2 = k - pho
+        if k2 < 0:
+            continue
+        if t in (CombinationType.PAIR, CombinationType.TRIPLE, CombinationType.BOMB):
+            polys = run_automaton(h, positions, k2, None, tuple_step(m, ranks, pho))
+            accept = lambda state: state == FOUND
+        elif t == CombinationType.STAIR:
+            polys = run_automaton(h, positions, k2, (0, 0), stair_step(m // 2, ranks, pho))
+            accept = lambda state: state == FOUND
+        elif t == CombinationType.STREET:
+            polys = run_automaton(h, positions, k2, (0, 0, 0), street_step(m, ranks, pho, lo))
+            accept = lambda state: state == FOUND
+        elif t == CombinationType.FULLHOUSE:
+            polys = run_automaton(h, positions, k2, (False, False, 0, 0), fullhouse_step(ranks))
+            accept = lambda state, _pho=pho: fullhouse_accept(state, _pho)
+        else:
+            assert False
+        found = sum((poly for state, poly in polys.items() if accept(state)), np.zeros(k2 + 1, dtype=np.int64))
+        matches += int(mul_poly(found, free_poly(free, k2))[k2])
+    return matches
+
+
+# ------------------------------------------------------
+# Wahrscheinlichkeiten
+# ------------------------------------------------------
+
+# Zählt die Hände ohne höhere Farbbombe je Anzahl Handkarten (Polynom bis zum Grad k)
+#
+# cards: Verfügbare Karten
+# k: Höchste Anzahl der Handkarten
+# m: Länge der gegebenen Farbbombe
+# r: Rang der gegebenen Farbbombe (mit m = r = 5 irgendeine Farbbombe)
+def _count_without_higher_color_bomb(cards: Cards, k: int, m: int = 5, r: int = 5) -> np.ndarray:
+    # je Farbe die Hände ohne höhere Farbbombe zählen und die Polynome der Farben multiplizieren
+    avoid = free_poly(len(cards) - sum(1 for v, _ in cards if 2 <= v <= 14), k)
+    for color in range(1, 5):
+        avoid = mul_poly(avoid, count_color_without_higher_color_bomb(cards, color, k, m, r))
+    return avoid
+
+
+# Berechnet die Wahrscheinlichkeit, dass die Hand eine höhere Farbbombe hat (siehe prob_hi.prob_of_higher_color_bomb())
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# m: Länge der gegebenen Farbbombe
+# r: Rang der gegebenen Farbbombe (mit m = r = 5 irgendeine Farbbombe)
+def prob_of_higher_color_bomb_gf(cards: Cards, k: int, m: int = 5, r: int = 5) -> float:
+    n = len(cards)
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    assert 5 <= m <= 14
+    assert m == r == 5 or m + 1 <= r <= 14
+    avoid = _count_without_higher_color_bomb(cards, k, m, r)
+    return (math.comb(n, k) - int(avoid[k])) / math.comb(n, k)
+
+
+# Berechnet die Wahrscheinlichkeit, dass die Hand eine 4er-Bombe hat (siehe prob_hi.prob_of_any_4_bomb())
+def prob_of_any_4_bomb_gf(cards: Cards, k: int) -> float:
+    n = len(cards)
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    return count_hands_gf(ranks_to_vector(cards), k, CombinationType.BOMB, 4, range(2, 15)) / math.comb(n, k)
+
+
+# Berechnet die Wahrscheinlichkeit, dass die Hand die gegebene Kombination überstechen kann, ohne sie zu bomben
+# (siehe prob_hi.prob_of_higher_combi(); die Sonderfälle Phönix und Hund werden genauso behandelt)
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# combination: Die Kombination (Typ, Länge und Rang)
+def prob_of_higher_combi_gf(cards: Cards, k: int, combination: Combination) -> float:
+    if k == 0:
+        return 0.0
+    n = len(cards)
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    if combination == (1, 1, 0):  # Hund
+        return 1.0
+    assert combination != (0, 0, 0) and validate_combination(combination)
+    t, m, r = combination
+    h = ranks_to_vector(cards)
+    total = math.comb(n, k)
+
+    if t == CombinationType.SINGLE:
+        if r == 16:  # Phönix im Anspiel (Rang 1.5): jede Karte von der 2 bis zum Drachen
+            higher = sum(h[2:16])
+        else:  # höherer Rang, Drache oder Phönix (der Drache kann nicht überstochen werden)
+            higher = sum(h[r + 1:17]) if r < 15 else 0
+        return (total - math.comb(n - higher, k)) / total
+    if t == CombinationType.BOMB and m >= 5:
+        return prob_of_higher_color_bomb_gf(cards, k, m, r)
+    return count_hands_gf(h, k, t, m, range(r + 1, 15)) / total
+
+
+# Berechnet die Wahrscheinlichkeit, dass die Hand die gegebene Kombination anspielen kann
+# (siehe prob_lo.prob_of_lower_combi(); die Sonderfälle Phönix und Hund werden genauso behandelt)
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# combination: Die Kombination (Typ, Länge und Rang)
+def prob_of_lower_combi_gf(cards: Cards, k: int, combination: Combination) -> float:
+    if k == 0:
+        return 0.0
+    n = len(cards)
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    if combination == (1, 1, 0):  # Hund
+        return 0.0
+    assert combination != (0, 0, 0) and validate_combination(combination)
+    t, m, r = combination
+    if t == CombinationType.BOMB:
+        return 1.0
+    h = ranks_to_vector(cards)
+    total = math.comb(n, k)
+
+    if t == CombinationType.SINGLE:
+        if r <= 1:  # Mahjong
+            lower = 0
+        elif r == 15:  # Drache: jede Karte außer Hund und Drache
+            lower = sum(h[1:15]) + h[16]
+        elif r == 16:  # Phönix: jede Karte außer Hund, Drache und Phönix
+            lower = sum(h[1:15])
+        else:  # niedrigerer Rang (ab Mahjong) oder Phönix
+            lower = sum(h[1:r]) + h[16]
+        return (total - math.comb(n - lower, k)) / total
+    r_min = m // 2 + 1 if t == CombinationType.STAIR else m if t == CombinationType.STREET else 2
+    return count_hands_gf(h, k, t, m, range(r_min, r), lo=True) / total
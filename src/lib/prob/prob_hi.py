@@ -3,20 +3,27 @@ Dieses Modul bietet Funktionen zur Berechnung der Wahrscheinlichkeit, dass höhe
 gespielt werden können.
 """
 
-__all__ = "prob_of_higher_combi", "prob_of_higher_combi_or_bomb",
+__all__ = "prob_of_higher_combi", "prob_of_higher_combi_or_bomb", "prob_of_higher_combi_batch",
 
 import itertools
 import math
-from src.lib.cards import parse_cards, stringify_cards, ranks_to_vector, cards_to_vector, Cards
+import numpy as np
+from src.lib.cards import parse_cards, stringify_cards, ranks_to_vector, cards_to_vector, cards_to_mask, Cards
 from src.lib.combinations import stringify_combination, validate_combination, CombinationType, Combination
-from src.lib.prob.tables_hi import load_table_hi
+from src.lib.prob.patterns import BINOMIAL, PatternTable, count_hands
+from src.lib.prob.prob_cache import get_prob_cache
+from src.lib.prob.tables_hi import load_table_hi, load_pattern_table_hi
 from time import time
 from timeit import timeit
+from typing import Sequence, Tuple
 
 # ------------------------------------------------------
 # Wahrscheinlichkeitsberechnung p_high
 # ------------------------------------------------------
 
+_KIND = "high"  # Art der Einträge im Cache (siehe prob_cache)
+
+
 # Berechnet die Wahrscheinlichkeit, dass die Hand die gegebene Farbbombe überstechen kann
 # (entweder durch einen höheren Rang, oder durch eine längere Bombe).
 #
@@ -30,70 +37,71 @@ def prob_of_higher_color_bomb(cards: Cards, k: int, m: int = 5, r: int = 5) -> f
     n = len(cards)  # Gesamtanzahl der verfügbaren Karten
     assert k <= n <= 56
     assert 0 <= k <= 14
-    assert 5 <= m <= 14
-    assert m == r == 5 or m + 1 <= r <= 14
+    return _prob_of_higher_color_bomb(_count_colors(cards), n, k, m, r)
+
 
-    debug = False
+# Zählt die Karten je Farbe und Rang (die Werte sind 0 oder 1; der Index ist der Rang)
+#
+# cards: Verfügbare Karten
+# return: Array mit Shape (4, 17)
+def _count_colors(cards: Cards) -> np.ndarray:
+    h = np.zeros((4, 17), dtype=np.int64)
+    h[:, 2:15] = np.array(cards_to_vector(cards)[2:54], dtype=np.int64).reshape(13, 4).T
+    return h
 
-    # Karten in einem Vektor umwandeln (die Werte in h sind 0 oder 1)
-    h = cards_to_vector(cards)
 
-    # Hilfstabellen laden
-    table = load_table_hi(CombinationType.BOMB, m)
-    table_longer = load_table_hi(CombinationType.BOMB, m + 1) if m < 14 and r > 5 else [{}, {}]
+# Wie prob_of_higher_color_bomb(), aber mit bereits gezählten Karten
+#
+# h: Anzahl der verfügbaren Karten je Farbe und Rang (siehe _count_colors())
+# n: Gesamtanzahl der verfügbaren Karten
+def _prob_of_higher_color_bomb(h: np.ndarray, n: int, k: int, m: int, r: int) -> float:
+    assert 5 <= m <= 14
+    assert m == r == 5 or m + 1 <= r <= 14
 
-    # für jede der vier Farben alle Muster der Hilfstabelle durchlaufen und mögliche Kombinationen zählen
+    # Muster auswählen: höherer Rang bei gleicher Länge oder längere Bombe (mindestens Rang 6)
+    table = load_pattern_table_hi(CombinationType.BOMB, m)[0]
+    parts = [(table, table.select(max(r + 1, 6), 15))]
+    if m < 14 and r > 5:
+        table_longer = load_pattern_table_hi(CombinationType.BOMB, m + 1)[0]
+        parts.append((table_longer, table_longer.select(m + 2, r + 1)))
+
+    # für jede der vier Farben die passenden Muster ermitteln (der Binomialkoeffizient je Rang ist hier immer 1)
+    used = []  # je Farbe: Anzahl verfügbarer Karten der Ränge im Muster
+    sizes = []  # je Farbe: Anzahl Karten im Muster
+    signs = []  # je Farbe: Vorzeichen des Musters
+    for color in range(4):
+        matches = [_match_patterns(t, rows, h[color], k) for t, rows in parts]
+        cases = np.concatenate([match[0] for match in matches])
+        covered = np.concatenate([match[1] for match in matches])
+        sign = np.ones(len(cases), dtype=np.int64)
+        if len(matches) == 2:
+            # Die Muster einer Tabelle schließen sich gegenseitig aus, die der beiden Tabellen aber nicht (eine Hand kann
+            # eine höhere Bombe gleicher Länge und zugleich eine längere Bombe derselben Farbe haben). Solche Hände
+            # werden über die Vereinigung je Musterpaar wieder abgezogen (Prinzip von Inklusion und Exklusion).
+            (cases1, covered1), (cases2, covered2) = matches
+            both = covered1[:, None, :] & covered2[None, :, :]
+            i, j = np.nonzero(~(both & (cases1[:, None, :] != cases2[None, :, :])).any(axis=2))
+            cases12 = np.where(covered1[i], cases1[i], cases2[j])
+            covered12 = covered1[i] | covered2[j]
+            valid = cases12.sum(axis=1) <= k
+            cases = np.concatenate([cases, cases12[valid]])
+            covered = np.concatenate([covered, covered12[valid]])
+            sign = np.concatenate([sign, -np.ones(int(valid.sum()), dtype=np.int64)])
+        used.append(covered @ h[color])
+        sizes.append(cases.sum(axis=1))
+        signs.append(sign)
+
+    # mögliche Kombinationen zählen
     matches = 0
     for color in range(4):
-        for r_curr in range(6, 15):
-            if r_curr <= r and r_curr < m + 2:
-                continue
-            cases = table[0][r_curr] if r_curr > r else table_longer[0][r_curr]
-            for case in cases:
-                if sum(case) > k:
-                    continue
-                r_start = 15 - len(case)
-                # jeweils den Binomialkoeffizienten von allen Rängen im Muster berechnen und multiplizieren
-                matches_part = 1
-                n_remain = n
-                k_remain = k
-                for i in range(len(case)):
-                    if h[(r_start + i - 2) * 4 + color + 2] < case[i]:
-                        matches_part = 0
-                        break
-                    #matches_part *= math.comb(h[(r_start + i - 2) * 4 + color + 2], case[i])  # der Binomialkoeffizienten ist hier immer 1
-                    n_remain -= h[(r_start + i - 2) * 4 + color + 2]
-                    k_remain -= case[i]
-                if matches_part == 1:
-                    matches_part = math.comb(n_remain, k_remain)
-                    if debug:
-                        print(f"r={r_curr}, color={color}, case={case}, matches_part={matches_part}")
-                    # Anzahl Möglichkeiten, die sich aus den übrigen Karten ergeben, berechnen und zum Gesamtergebnis addieren
-                    matches += matches_part
-                    # die Anzahl Möglichkeiten, zwei Bomben gleichzeitig zu haben, müssen wieder abgezogen werden (Prinzip von Inklusion und Exklusion)
-                    for color2 in range(color + 1, 4):
-                        for r_curr2 in range(6, 15):
-                            if r_curr2 <= r and r_curr2 < m + 2:
-                                continue
-                            cases = table[0][r_curr2] if r_curr2 > r else table_longer[0][r_curr2]
-                            for case2 in cases:
-                                if sum(case2) > k_remain:
-                                    continue
-                                r_start2 = 15 - len(case2)
-                                matches_part2 = 1
-                                n_remain2 = n_remain
-                                k_remain2 = k_remain
-                                for i in range(len(case2)):
-                                    if h[(r_start2 + i - 2) * 4 + color2 + 2] < case2[i]:
-                                        matches_part2 = 0
-                                        break
-                                    n_remain2 -= h[(r_start2 + i - 2) * 4 + color2 + 2]
-                                    k_remain2 -= case2[i]
-                                if matches_part2 == 1:
-                                    matches_part2 = math.comb(n_remain2, k_remain2)
-                                    if debug:
-                                        print(f"r2={r_curr2}, color2={color2}, case2={case2}, matches_part2={matches_part2}")
-                                    matches -= matches_part2
+        matches += int((signs[color] * BINOMIAL[n - used[color], k - sizes[color]]).sum())
+        # die Anzahl Möglichkeiten, zwei Bomben gleichzeitig zu haben, müssen wieder abgezogen werden (Prinzip von Inklusion und Exklusion)
+        for color2 in range(color + 1, 4):
+            used2 = used[color][:, None] + used[color2][None, :]
+            sizes2 = sizes[color][:, None] + sizes[color2][None, :]
+            signs2 = signs[color][:, None] * signs[color2][None, :]
+            valid = sizes2 <= k
+            matches -= int((signs2[valid] * BINOMIAL[n - used2[valid], k - sizes2[valid]]).sum())
 
     # Wahrscheinlichkeit berechnen
     total = math.comb(n, k)  # Gesamtanzahl der möglichen Kombinationen
@@ -101,6 +109,26 @@ def prob_of_higher_color_bomb(cards: Cards, k: int, m: int = 5, r: int = 5) -> f
     return p
 
 
+# Ermittelt die Muster, die mit den verfügbaren Karten einer Farbe gebildet werden können (siehe patterns.match_rows())
+#
+# Die Muster werden auf alle Ränge ausgedehnt, damit Muster verschiedener Tabellen verglichen werden können.
+#
+# table: Die Mustertabelle
+# rows: Die zu prüfenden Zeilen
+# h: Anzahl der verfügbaren Karten der Farbe je Rang (0 oder 1)
+# k: Anzahl der Handkarten
+# return: Je passendem Muster die Kartenanzahl je Rang und ob der Rang zum Muster gehört, jeweils mit Shape (N, 17)
+def _match_patterns(table: PatternTable, rows: slice, h: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    width = table.cases.shape[1]
+    cases = table.cases[rows]
+    ok = (table.sizes[rows] <= k) & (cases <= h[table.offset:table.offset + width]).all(axis=1)
+    cases_all = np.zeros((int(ok.sum()), 17), dtype=np.int64)
+    covered_all = np.zeros((int(ok.sum()), 17), dtype=bool)
+    cases_all[:, table.offset:table.offset + width] = cases[ok]
+    covered_all[:, table.offset:table.offset + width] = table.covered[rows][ok]
+    return cases_all, covered_all
+
+
 # Berechnet die Wahrscheinlichkeit, dass die Hand eine 4er-Bombe hat
 #
 # cards: Verfügbare Karten
@@ -109,32 +137,17 @@ def prob_of_any_4_bomb(cards: Cards, k: int) -> float:
     n = len(cards)  # Gesamtanzahl der verfügbaren Karten
     assert k <= n <= 56
     assert 0 <= k <= 14
+    return _prob_of_any_4_bomb(np.array(ranks_to_vector(cards), dtype=np.int64), n, k)
 
-    # Anzahl der Karten je Rang zählen.
-    h = ranks_to_vector(cards)
 
-    # Hilfstabelle laden
-    table = load_table_hi(CombinationType.BOMB, 4)
-
-    # alle Muster der Hilfstabelle durchlaufen und mögliche Kombinationen zählen
-    matches = 0
-    for r in range(2, 15):
-        for case in table[0][r]:
-            if sum(case) > k:
-                continue
-            r_start = 15 - len(case)
-            matches_part = 1
-            n_remain = n
-            k_remain = k
-            for i in range(len(case)):
-                if h[r_start + i] < case[i]:
-                    matches_part = 0
-                    break
-                matches_part *= math.comb(h[r_start + i], case[i])
-                n_remain -= h[r_start + i]
-                k_remain -= case[i]
-            if matches_part > 0:
-                matches += matches_part * math.comb(n_remain, k_remain)
+# Wie prob_of_any_4_bomb(), aber mit bereits gezählten Karten
+#
+# h: Anzahl der verfügbaren Karten je Rang
+# n: Gesamtanzahl der verfügbaren Karten
+def _prob_of_any_4_bomb(h: np.ndarray, n: int, k: int) -> float:
+    # alle Muster der Hilfstabelle prüfen und mögliche Kombinationen zählen
+    table = load_pattern_table_hi(CombinationType.BOMB, 4)[0]
+    matches = count_hands(table, table.select(2, 15), h, n, k)
 
     # Wahrscheinlichkeit berechnen
     total = math.comb(n, k)  # Gesamtanzahl der möglichen Kombinationen
@@ -161,24 +174,24 @@ def prob_of_higher_combi(cards: Cards, k: int, combination: Combination) -> floa
     n = len(cards)  # Gesamtanzahl der verfügbaren Karten
     assert k <= n <= 56
     assert 0 <= k <= 14
-
     if combination == (1, 1, 0):  # Hund
         return 1.0  # wenn der Hund gespielt wird, verliert man das Anspielrecht (also als ob man überstochen wird)
-
     assert combination != (0, 0, 0) and validate_combination(combination)
-    t, m, r = combination  # Typ, Länge und Rang der gegebenen Kombination
-
-    #debug = True
+    if combination[0] == CombinationType.BOMB and combination[1] >= 5:  # Farbbombe
+        return _prob_of_higher_color_bomb(_count_colors(cards), n, k, combination[1], combination[2])
+    return _prob_of_higher_combi(np.array(ranks_to_vector(cards), dtype=np.int64), n, k, combination)
 
-    # Farbbombe ausrangieren
-    if t == CombinationType.BOMB and m >= 5:
-        return prob_of_higher_color_bomb(cards, k, m, r)
 
-    # Anzahl der Karten je Rang zählen.
-    h = ranks_to_vector(cards)
+# Wie prob_of_higher_combi(), aber mit bereits gezählten Karten (keine Farbbombe, kein Hund, k > 0)
+#
+# h: Anzahl der verfügbaren Karten je Rang (wird nicht verändert)
+# n: Gesamtanzahl der verfügbaren Karten
+def _prob_of_higher_combi(h: np.ndarray, n: int, k: int, combination: Combination) -> float:
+    t, m, r = combination  # Typ, Länge und Rang der gegebenen Kombination
 
     # Sonderbehandlung für Phönix als Einzelkarte
     if t == CombinationType.SINGLE and r == 16:
+        h = h.copy()
         # Rang des Phönix anpassen (der Phönix im Anspiel wird von der 2 geschlagen, aber nicht vom Mahjong)
         r = 1  # 1.5 abgerundet
         # Der verfügbare Phönix hat den Rang 15 (14.5 aufgerundet); er würde sich selbst schlagen.
@@ -186,35 +199,15 @@ def prob_of_higher_combi(cards: Cards, k: int, combination: Combination) -> floa
         h[16] = 0
 
     # Hilfstabellen laden
-    table = load_table_hi(t, m)
+    tables = load_pattern_table_hi(t, m)
 
-    # alle Muster der Hilfstabelle durchlaufen und mögliche Kombinationen zählen
+    # alle Muster der Hilfstabelle mit höherem Rang prüfen und mögliche Kombinationen zählen
     matches = 0
     r_end = 16 if t == CombinationType.SINGLE else 15  # exklusiv (Drache + 1 bzw. Ass + 1)
+    n_remain = (n - int(h[16])) if t != CombinationType.BOMB else n
     for pho in range(2 if h[16] and t != CombinationType.BOMB else 1):
-        for r_higher in range(r + 1, r_end):
-            for case in table[pho][r_higher]:
-                if sum(case) + pho > k:
-                    continue
-                r_start = r_end - len(case)
-                # jeweils den Binomialkoeffizienten von allen Rängen im Muster berechnen und multiplizieren
-                matches_part = 1
-                n_remain = (n - h[16]) if t != CombinationType.BOMB else n
-                k_remain = k - pho
-                for i in range(len(case)):
-                    if h[r_start + i] < case[i]:
-                        matches_part = 0
-                        break
-                    matches_part *= math.comb(h[r_start + i], case[i])
-                    n_remain -= h[r_start + i]
-                    k_remain -= case[i]
-                if matches_part > 0:
-                    # Binomialkoeffizient vom Rest berechnen und mit dem Zwischenergebnis multiplizieren
-                    matches_part *= math.comb(n_remain, k_remain)
-                    # Zwischenergebnis zum Gesamtergebnis addieren
-                    #if debug:
-                    #    print(f"r={r_higher}, php={pho}, case={case}, matches={matches_part}")
-                    matches += matches_part
+        table = tables[pho]
+        matches += count_hands(table, table.select(r + 1, r_end), h, n_remain, k - pho)
 
     # Wahrscheinlichkeit berechnen
     total = math.comb(n, k)  # Gesamtanzahl der möglichen Kombinationen
@@ -231,11 +224,24 @@ def prob_of_higher_combi(cards: Cards, k: int, combination: Combination) -> floa
 # Sonderkarte Hund:
 # Mit dem Hund als gegebene Kombination wird 1.0 zurückgegeben (man wird "überstochen"; man verliert das Anspielrecht).
 #
+# Das Ergebnis wird im Cache des Prozesses gespeichert (siehe prob_cache).
+#
 # cards: Verfügbare Karten
 # k: Anzahl der Handkarten
 # combination: Die gegebenen Kombination (Typ, Länge und Rang).
 # return: Wahrscheinlichkeit `p_high`
 def prob_of_higher_combi_or_bomb(cards: Cards, k: int, combination: Combination) -> tuple[float, float]:
+    cache = get_prob_cache()
+    key = (_KIND, cards_to_mask(cards), k, tuple(combination))
+    p = cache.get(key)
+    if p is None:
+        p = _prob_of_higher_combi_or_bomb(cards, k, combination)
+        cache.put(key, p)
+    return p
+
+
+# Wie prob_of_higher_combi_or_bomb(), aber ohne Cache
+def _prob_of_higher_combi_or_bomb(cards: Cards, k: int, combination: Combination) -> tuple[float, float]:
     p_combi = prob_of_higher_combi(cards, k, combination)  # Wahrscheinlichkeit einer höheren Kombination als die gegebene
     t, m, r = combination
     if t == CombinationType.BOMB:
@@ -254,6 +260,65 @@ def prob_of_higher_combi_or_bomb(cards: Cards, k: int, combination: Combination)
         return p_min, p_max
 
 
+# Berechnet `p_high` für mehrere Kombinationen in einem Durchgang (siehe prob_of_higher_combi_or_bomb())
+#
+# Die Karten werden nur einmal gezählt, die Wahrscheinlichkeiten für eine 4er-Bombe bzw. irgendeine Farbbombe nur einmal
+# berechnet, und gleiche Kombinationen (Typ, Länge, Rang) nur einmal ausgewertet. Kombinationen, die bereits im Cache
+# des Prozesses gespeichert sind, werden nicht neu berechnet (siehe prob_cache).
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# combinations: Die gegebenen Kombinationen (Typ, Länge und Rang).
+# return: Array mit Shape (N, 2); je Kombination die untere und obere Schranke von `p_high`
+def prob_of_higher_combi_batch(cards: Cards, k: int, combinations: Sequence[Combination]) -> np.ndarray:
+    n = len(cards)  # Gesamtanzahl der verfügbaren Karten
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    result = np.zeros((len(combinations), 2), dtype=np.float64)
+    if k == 0 or not combinations:
+        return result
+    get_prob_cache().fill_batch((_KIND, cards_to_mask(cards), k), combinations, lambda missing: _prob_of_higher_combi_batch(cards, k, missing), result)
+    return result
+
+
+# Wie prob_of_higher_combi_batch(), aber ohne Cache (k > 0)
+def _prob_of_higher_combi_batch(cards: Cards, k: int, combinations: Sequence[Combination]) -> np.ndarray:
+    n = len(cards)  # Gesamtanzahl der verfügbaren Karten
+    result = np.zeros((len(combinations), 2), dtype=np.float64)
+
+    # gemeinsame Terme nur einmal berechnen (die Bombenterme erst, wenn sie gebraucht werden)
+    h = np.array(ranks_to_vector(cards), dtype=np.int64)
+    h_colors = _count_colors(cards)
+    p_4 = None  # Wahrscheinlichkeit einer 4er-Bombe
+    p_color = None  # Wahrscheinlichkeit irgendeiner Farbbombe
+    known = {}  # Kombination -> (p_min, p_max)
+
+    for i, combination in enumerate(combinations):
+        combination = tuple(combination)
+        if combination not in known:
+            t, m, r = combination
+            if combination == (1, 1, 0):  # Hund
+                p_combi = 1.0
+            elif t == CombinationType.BOMB and m >= 5:  # Farbbombe
+                p_combi = _prob_of_higher_color_bomb(h_colors, n, k, m, r)
+            else:
+                assert combination != (0, 0, 0) and validate_combination(combination)
+                p_combi = _prob_of_higher_combi(h, n, k, combination)
+            if t == CombinationType.BOMB and m >= 5:  # Farbbombe
+                known[combination] = p_combi, p_combi
+            else:
+                if p_color is None:
+                    p_color = _prob_of_higher_color_bomb(h_colors, n, k, 5, 5)
+                if t == CombinationType.BOMB:  # 4er-Bombe
+                    known[combination] = max(p_combi, p_color), min(p_combi + p_color, 1)
+                else:  # keine Bombe
+                    if p_4 is None:
+                        p_4 = _prob_of_any_4_bomb(h, n, k)
+                    known[combination] = max(p_combi, p_4, p_color), min(p_combi + p_4 + p_color, 1)
+        result[i] = known[combination]
+    return result
+
+
 # ------------------------------------------------------
 # Test
 # ------------------------------------------------------
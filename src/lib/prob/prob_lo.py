@@ -5,6 +5,7 @@ gespielt werden können.
 
 Hauptfunktionen:
 - `prob_of_lower_combi`: Wahrscheinlichkeit für eine niedrigere Kombination.
+- `prob_of_lower_combi_batch`: Wahrscheinlichkeiten für mehrere Kombinationen in einem Durchgang.
 - `possible_hands_lo`: Listet mögliche Hände mit niedrigeren Kombinationen auf.
 - `inspect`: Analyse spezifischer Kartenkombinationen und deren Wahrscheinlichkeiten.
 
@@ -12,19 +13,26 @@ Verwendung:
 Dieses Modul dient der probabilistischen Analyse und der Entwicklung von Strategien im Spiel.
 """
 
-__all__ = "prob_of_lower_combi",
+__all__ = "prob_of_lower_combi", "prob_of_lower_combi_batch",
 
 import itertools
 import math
-from src.lib.cards import parse_cards, stringify_cards, ranks_to_vector, Cards
+import numpy as np
+from src.lib.cards import parse_cards, stringify_cards, ranks_to_vector, cards_to_mask, Cards
 from src.lib.combinations import stringify_combination, validate_combination, CombinationType, Combination
-from src.lib.prob.tables_lo import load_table_lo
+from src.lib.prob.patterns import count_hands
+from src.lib.prob.prob_cache import get_prob_cache
+from src.lib.prob.tables_lo import load_pattern_table_lo
 from time import time
+from typing import Sequence
 
 # ------------------------------------------------------
 # Wahrscheinlichkeitsberechnung p_low
 # ------------------------------------------------------
 
+_KIND = "low"  # Art der Einträge im Cache (siehe prob_cache)
+
+
 # Berechnet die Wahrscheinlichkeit, dass die Hand die gegebene Kombination anspielen kann
 #
 # Sonderkarte Phönix:
@@ -42,11 +50,24 @@ from time import time
 #
 # todo Hat der Partner allerdings den Hund, so erhält man das Anspielrecht, was gesondert bewertet werden muss (aber nicht hier).
 #
+# Das Ergebnis wird im Cache des Prozesses gespeichert (siehe prob_cache).
+#
 # cards: Verfügbare Karten
 # k: Anzahl der Handkarten
 # combination: Die gegebenen Kombination (Typ, Länge und Rang).
 # return: Wahrscheinlichkeit `p_low`
 def prob_of_lower_combi(cards: Cards, k: int, combination: Combination) -> float:
+    cache = get_prob_cache()
+    key = (_KIND, cards_to_mask(cards), k, tuple(combination))
+    p = cache.get(key)
+    if p is None:
+        p = _prob_of_lower_combi_uncached(cards, k, combination)
+        cache.put(key, p)
+    return p
+
+
+# Wie prob_of_lower_combi(), aber ohne Cache
+def _prob_of_lower_combi_uncached(cards: Cards, k: int, combination: Combination) -> float:
     if k == 0:
         return 0.0
     n = len(cards)  # Gesamtanzahl der verfügbaren Karten
@@ -63,13 +84,19 @@ def prob_of_lower_combi(cards: Cards, k: int, combination: Combination) -> float
     if t == CombinationType.BOMB:
         return 1.0
 
-    #debug = False
+    return _prob_of_lower_combi(np.array(ranks_to_vector(cards), dtype=np.int64), n, k, combination)
 
-    # Anzahl der Karten je Rang zählen.
-    h = ranks_to_vector(cards)
+
+# Wie prob_of_lower_combi(), aber mit bereits gezählten Karten (keine Bombe, kein Hund, k > 0)
+#
+# h: Anzahl der verfügbaren Karten je Rang (wird nicht verändert)
+# n: Gesamtanzahl der verfügbaren Karten
+def _prob_of_lower_combi(h: np.ndarray, n: int, k: int, combination: Combination) -> float:
+    t, m, r = combination  # Typ, Länge und Rang der gegebenen Kombination
 
     # Sonderbehandlung für Phönix als Einzelkarte
     if t == CombinationType.SINGLE and r == 16:
+        h = h.copy()
         # Rang des Phönix anpassen (der Phönix schlägt das Ass, aber nicht den Drachen)
         r = 15  # 14.5 aufgerundet
         # Der verfügbare Phönix hat den Rang 1 (1.5 abgerundet); er würde von sich selbst geschlagen werden.
@@ -77,35 +104,15 @@ def prob_of_lower_combi(cards: Cards, k: int, combination: Combination) -> float
         h[16] = 0
 
     # Hilfstabellen laden
-    table = load_table_lo(t, m)
+    tables = load_pattern_table_lo(t, m)
 
-    # alle Muster der Hilfstabelle durchlaufen und mögliche Kombinationen zählen
+    # alle Muster der Hilfstabelle mit niedrigerem Rang prüfen und mögliche Kombinationen zählen
     matches = 0
-    r_min = 1 if t == CombinationType.SINGLE else int(m / 2) + 1 if t == CombinationType.STAIR else m if t == CombinationType.STREET else m + 1 if t == CombinationType.BOMB and m >= 5 else 2
-    r_start = 1 if t in [CombinationType.SINGLE, CombinationType.STREET] else 2
-    for pho in range(2 if h[16] and t != CombinationType.BOMB else 1):
-        for r_lower in range(r_min, r):
-            for case in table[pho][r_lower]:
-                if sum(case) + pho > k:
-                    continue
-                # jeweils den Binomialkoeffizienten von allen Rängen im Muster berechnen und multiplizieren
-                matches_part = 1
-                n_remain = (n - h[16]) if t != CombinationType.BOMB else n
-                k_remain = k - pho
-                for i in range(len(case)):
-                    if h[r_start + i] < case[i]:
-                        matches_part = 0
-                        break
-                    matches_part *= math.comb(h[r_start + i], case[i])
-                    n_remain -= h[r_start + i]
-                    k_remain -= case[i]
-                if matches_part > 0:
-                    # Binomialkoeffizient vom Rest berechnen und mit dem Zwischenergebnis multiplizieren
-                    matches_part *= math.comb(n_remain, k_remain)
-                    # Zwischenergebnis zum Gesamtergebnis addieren
-                    #if debug:
-                    #    print(f"r={r_lower}, php={pho}, case={case}, matches={matches_part}")
-                    matches += matches_part
+    r_min = 1 if t == CombinationType.SINGLE else int(m / 2) + 1 if t == CombinationType.STAIR else m if t == CombinationType.STREET else 2
+    n_remain = n - int(h[16])
+    for pho in range(2 if h[16] else 1):
+        table = tables[pho]
+        matches += count_hands(table, table.select(r_min, r), h, n_remain, k - pho)
 
     # Wahrscheinlichkeit berechnen
     total = math.comb(n, k)  # Gesamtanzahl der möglichen Kombinationen
@@ -113,6 +120,46 @@ def prob_of_lower_combi(cards: Cards, k: int, combination: Combination) -> float
     return p
 
 
+# Berechnet `p_low` für mehrere Kombinationen in einem Durchgang (siehe prob_of_lower_combi())
+#
+# Die Karten werden nur einmal gezählt und gleiche Kombinationen (Typ, Länge, Rang) nur einmal ausgewertet. Kombinationen,
+# die bereits im Cache des Prozesses gespeichert sind, werden nicht neu berechnet (siehe prob_cache).
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# combinations: Die gegebenen Kombinationen (Typ, Länge und Rang).
+# return: Array mit Shape (N,); je Kombination die Wahrscheinlichkeit `p_low`
+def prob_of_lower_combi_batch(cards: Cards, k: int, combinations: Sequence[Combination]) -> np.ndarray:
+    n = len(cards)  # Gesamtanzahl der verfügbaren Karten
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    result = np.zeros(len(combinations), dtype=np.float64)
+    if k == 0 or not combinations:
+        return result
+    get_prob_cache().fill_batch((_KIND, cards_to_mask(cards), k), combinations, lambda missing: _prob_of_lower_combi_batch(cards, k, missing), result)
+    return result
+
+
+# Wie prob_of_lower_combi_batch(), aber ohne Cache (k > 0)
+def _prob_of_lower_combi_batch(cards: Cards, k: int, combinations: Sequence[Combination]) -> np.ndarray:
+    n = len(cards)  # Gesamtanzahl der verfügbaren Karten
+    result = np.zeros(len(combinations), dtype=np.float64)
+    h = np.array(ranks_to_vector(cards), dtype=np.int64)
+    known = {}  # Kombination -> p_low
+    for i, combination in enumerate(combinations):
+        combination = tuple(combination)
+        if combination not in known:
+            if combination == (1, 1, 0):  # Hund
+                known[combination] = 0.0
+            elif combination[0] == CombinationType.BOMB:
+                known[combination] = 1.0
+            else:
+                assert combination != (0, 0, 0) and validate_combination(combination)
+                known[combination] = _prob_of_lower_combi(h, n, k, combination)
+        result[i] = known[combination]
+    return result
+
+
 # ------------------------------------------------------
 # Test
 # ------------------------------------------------------
@@ -0,0 +1,290 @@
+"""
+Dieses Modul schätzt die Wahrscheinlichkeiten `p_high` und `p_low` per Monte-Carlo-Simulation.
+
+Statt alle möglichen Hände zu zählen (siehe prob_hi und prob_lo), werden zufällige Hände aus den verfügbaren Karten
+gezogen (vektorisiert mit NumPy, jeweils ein ganzer Block von Händen auf einmal). Gezogen wird so lange, bis das
+Konfidenzintervall (Wilson-Score-Intervall) schmal genug ist, die maximale Anzahl Stichproben erreicht ist oder das
+Zeitbudget aufgebraucht ist. Ein Agent kann so je Entscheidung Genauigkeit gegen Rechenzeit tauschen.
+
+Welche Hand die gegebene Kombination überstechen bzw. anspielen kann, wird genauso entschieden wie in
+`possible_hands_hi` bzw. `possible_hands_lo`. Mit `with_bombs` wird für `p_high` die Wahrscheinlichkeit geschätzt,
+dass die Hand die Kombination überstechen oder bomben kann (die exakte Berechnung liefert hierfür nur Schranken).
+"""
+
+__all__ = "ProbEstimate", "estimate_prob_of_higher_combi", "estimate_prob_of_lower_combi", \
+    "has_higher_combi", "has_lower_combi",
+
+import math
+import numpy as np
+from dataclasses import dataclass
+from src.lib.cards import Cards
+from src.lib.combinations import validate_combination, CombinationType, Combination
+from statistics import NormalDist
+from time import time
+from typing import Optional
+
+# ------------------------------------------------------
+# Ergebnis
+# ------------------------------------------------------
+
+@dataclass
+class ProbEstimate:
+    """
+    Eine geschätzte Wahrscheinlichkeit mit Konfidenzintervall.
+
+    :ivar p: Die geschätzte Wahrscheinlichkeit (Anteil der Treffer).
+    :ivar low: Untere Grenze des Konfidenzintervalls.
+    :ivar high: Obere Grenze des Konfidenzintervalls.
+    :ivar samples: Anzahl gezogener Hände (0, wenn das Ergebnis ohne Simulation feststeht).
+    """
+    p: float
+    low: float
+    high: float
+    samples: int
+
+
+# Berechnet das Wilson-Score-Intervall
+#
+# hits: Anzahl Treffer
+# samples: Anzahl Stichproben (größer 0)
+# z: Quantil der Standardnormalverteilung (z.B. 1.96 für 95 %)
+# return: Untere und obere Grenze
+def _wilson(hits: int, samples: int, z: float) -> tuple[float, float]:
+    p = hits / samples
+    denominator = 1 + z * z / samples
+    center = (p + z * z / (2 * samples)) / denominator
+    half = z * math.sqrt(p * (1 - p) / samples + z * z / (4 * samples * samples)) / denominator
+    low = 0.0 if hits == 0 else max(0.0, center - half)  # Rundungsfehler an den Rändern vermeiden
+    high = 1.0 if hits == samples else min(1.0, center + half)
+    return low, high
+
+
+# ------------------------------------------------------
+# Hände ziehen
+# ------------------------------------------------------
+
+# Zieht zufällige Hände aus den verfügbaren Karten
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# size: Anzahl der Hände
+# rng: Zufallsgenerator
+# return: Anzahl Karten je Rang, Shape (size, 17), und Karten je Farbe und Rang, Shape (size, 4, 17)
+def _deal(cards: Cards, k: int, size: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    n = len(cards)
+    ranks = np.array([v for v, _ in cards], dtype=np.int64)
+    slots = np.array([(c - 1) * 17 + v if 2 <= v <= 14 else 4 * 17 for v, c in cards], dtype=np.int64)  # Farbe und Rang (sonst Überlauf)
+    chosen = rng.random((size, n)).argpartition(k - 1, axis=1)[:, :k] if k < n else np.broadcast_to(np.arange(n), (size, n))
+    offsets = np.arange(size, dtype=np.int64)[:, None]
+    h = np.bincount((ranks[chosen] + offsets * 17).ravel(), minlength=size * 17).reshape(size, 17)
+    colors = np.bincount((slots[chosen] + offsets * 69).ravel(), minlength=size * 69).reshape(size, 69)[:, :68]
+    return h, colors.reshape(size, 4, 17) > 0
+
+
+# Ermittelt je Hand, ob eine Folge von m aufeinanderfolgenden Rängen mit dem höchsten Rang in r_range vorhanden ist
+#
+# present: True, wenn der Rang vorhanden ist; Shape (..., 17)
+# m: Länge der Folge
+# r_range: Mögliche höchste Ränge der Folge
+# return: Anzahl fehlender Ränge je Hand und höchstem Rang; Shape (..., len(r_range))
+def _missing_in_run(present: np.ndarray, m: int, r_range: range) -> np.ndarray:
+    cs = np.concatenate([np.zeros(present.shape[:-1] + (1,), dtype=np.int64), np.cumsum(present, axis=-1)], axis=-1)
+    r = np.array(r_range, dtype=np.int64)
+    return m - (cs[..., r + 1] - cs[..., r + 1 - m])
+
+
+# Ermittelt je Hand, ob sie eine Farbbombe der Länge m mit dem höchsten Rang in r_range hat
+def _has_color_bomb(colors: np.ndarray, m: int, r_range: range) -> np.ndarray:
+    if len(r_range) == 0:
+        return np.zeros(colors.shape[0], dtype=bool)
+    return (_missing_in_run(colors, m, r_range) == 0).any(axis=(1, 2))
+
+
+# Ermittelt je Hand, ob sie eine Kombination vom Typ t und der Länge m mit dem höchsten Rang in r_range hat
+# (Pärchen, Drilling, Treppe, Fullhouse oder Straße; der Phönix darf eine Karte ersetzen)
+#
+# h: Anzahl Karten je Rang, Shape (B, 17)
+# lo: Wenn True, gilt die Regel für `p_low`, nach der der Phönix die unterste Karte einer Straße nur ersetzen darf,
+#     wenn die Straße bis zum Ass reicht
+def _has_combination(h: np.ndarray, t: CombinationType, m: int, r_range: range, lo: bool = False) -> np.ndarray:
+    b = np.zeros(h.shape[0], dtype=bool)
+    if len(r_range) == 0:
+        return b
+    pho = (h[:, 16] > 0).astype(np.int64)
+    r = np.array(r_range, dtype=np.int64)
+    if t in (CombinationType.PAIR, CombinationType.TRIPLE):
+        b = ((h[:, r] + pho[:, None]) >= m).any(axis=1)
+    elif t == CombinationType.STAIR:
+        steps = m // 2
+        deficit = np.cumsum(np.concatenate([np.zeros((h.shape[0], 1), dtype=np.int64), np.maximum(0, 2 - h)], axis=1), axis=1)
+        b = ((deficit[:, r + 1] - deficit[:, r + 1 - steps]) <= pho[:, None]).any(axis=1)
+    elif t == CombinationType.FULLHOUSE:
+        normal = h[:, 2:15]
+        count2 = (normal >= 2).sum(axis=1)[:, None] - (h[:, r] >= 2)  # Pärchen mit anderem Rang
+        count1 = (normal >= 1).sum(axis=1)[:, None] - (h[:, r] >= 1)  # Einzelkarten mit anderem Rang
+        trip = h[:, r]
+        b = (trip >= 3) & (count2 > 0)
+        b |= (pho[:, None] > 0) & (((trip >= 3) & (count1 > 0)) | ((trip >= 2) & (count2 > 0)))
+        b = b.any(axis=1)
+    elif t == CombinationType.STREET:
+        missing = _missing_in_run(h > 0, m, r_range)
+        if lo:
+            # der Phönix darf das untere Ende nur ersetzen, wenn die Straße bis zum Ass reicht
+            lowest = h[:, r + 1 - m] > 0
+            b = ((missing == 0) | ((pho[:, None] > 0) & (missing == 1) & (lowest | (r == 14)))).any(axis=1)
+        else:
+            b = (missing <= pho[:, None]).any(axis=1)
+    else:
+        assert False
+    return b
+
+
+# Ermittelt je Hand, ob sie die gegebene Kombination überstechen kann (wie possible_hands_hi())
+#
+# Die Farben werden nur für Farbbomben benötigt (als gegebene Kombination oder mit with_bombs); sonst kann colors None sein.
+#
+# h: Anzahl Karten je Rang, Shape (B, 17)
+# colors: Karten je Farbe und Rang, Shape (B, 4, 17), oder None
+# combination: Die gegebene Kombination (Typ, Länge und Rang; nicht Passen)
+# with_bombs: Wenn True, zählt auch eine Bombe, die die Kombination schlägt
+# return: Je Hand True oder False, Shape (B,)
+def has_higher_combi(h: np.ndarray, colors: Optional[np.ndarray], combination: Combination, with_bombs: bool) -> np.ndarray:
+    t, m, r = combination
+    if combination == (1, 1, 0):  # Hund
+        return np.ones(h.shape[0], dtype=bool)
+    if t == CombinationType.SINGLE:
+        if r == 15:  # Drache
+            b = np.zeros(h.shape[0], dtype=bool)
+        elif r == 16:  # Phönix im Anspiel (Rang 1.5)
+            b = h[:, 2:16].sum(axis=1) > 0
+        else:
+            b = h[:, r + 1:17].sum(axis=1) > 0  # höherer Rang, Drache oder Phönix
+    elif t == CombinationType.BOMB and m == 4:
+        b = (h[:, r + 1:15] >= 4).any(axis=1)
+    elif t == CombinationType.BOMB:
+        b = _has_color_bomb(colors, m, range(r + 1, 15))
+        if m < 14:
+            b |= _has_color_bomb(colors, m + 1, range(m + 2, r + 1))  # längere Bombe
+    else:
+        b = _has_combination(h, t, m, range(r + 1, 15))
+    if with_bombs:
+        if t != CombinationType.BOMB:
+            b |= (h[:, 2:15] >= 4).any(axis=1)
+        if not (t == CombinationType.BOMB and m >= 5):
+            b |= _has_color_bomb(colors, 5, range(6, 15))
+    return b
+
+
+# Ermittelt je Hand, ob sie die gegebene Kombination anspielen kann (wie possible_hands_lo(); eine Bombe kann jede
+# Einzelkarte übernehmen)
+#
+# h: Anzahl Karten je Rang, Shape (B, 17)
+# combination: Die gegebene Kombination (Typ, Länge und Rang; nicht Passen)
+# return: Je Hand True oder False, Shape (B,)
+def has_lower_combi(h: np.ndarray, combination: Combination) -> np.ndarray:
+    t, m, r = combination
+    if t == CombinationType.BOMB:
+        return np.ones(h.shape[0], dtype=bool)
+    if t == CombinationType.SINGLE:
+        if r == 15:  # Drache
+            return h[:, 1:15].sum(axis=1) + h[:, 16] > 0  # jede Karte außer Hund und Drache
+        elif r == 16:  # Phönix
+            return h[:, 1:15].sum(axis=1) > 0  # jede Karte außer Hund, Drache und Phönix
+        elif r <= 1:  # Hund oder Mahjong
+            return np.zeros(h.shape[0], dtype=bool)
+        else:
+            return h[:, 1:r].sum(axis=1) + h[:, 16] > 0  # niedrigerer Rang oder Phönix
+    r_min = m // 2 + 1 if t == CombinationType.STAIR else m if t == CombinationType.STREET else 2
+    return _has_combination(h, t, m, range(r_min, r), lo=True)
+
+
+# ------------------------------------------------------
+# Schätzung
+# ------------------------------------------------------
+
+# Zieht Hände, bis die Genauigkeit erreicht ist
+#
+# test: Funktion, die für einen Block von Händen (h, colors) je Hand True oder False liefert
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# tolerance: Gewünschte halbe Breite des Konfidenzintervalls
+# confidence: Konfidenzniveau (z.B. 0.95)
+# max_samples: Maximale Anzahl Hände
+# time_budget: Maximale Rechenzeit in Sekunden (None == unbegrenzt)
+# rng: Zufallsgenerator (None == neuer Generator)
+def _estimate(test, cards: Cards, k: int, tolerance: float, confidence: float, max_samples: int,
+              time_budget: Optional[float], rng: Optional[np.random.Generator]) -> ProbEstimate:
+    if rng is None:
+        rng = np.random.default_rng()
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    deadline = time() + time_budget if time_budget is not None else None
+    hits = 0
+    samples = 0
+    block = 1024
+    while True:
+        size = min(block, max_samples - samples)
+        h, colors = _deal(cards, k, size, rng)
+        hits += int(test(h, colors).sum())
+        samples += size
+        low, high = _wilson(hits, samples, z)
+        if (high - low) / 2 <= tolerance or samples >= max_samples or (deadline is not None and time() >= deadline):
+            return ProbEstimate(p=hits / samples, low=low, high=high, samples=samples)
+        block = min(block * 2, 65536)
+
+
+# Schätzt die Wahrscheinlichkeit, dass die Hand die gegebene Kombination überstechen kann
+#
+# Die Sonderfälle Phönix und Hund werden wie in prob_of_higher_combi() behandelt.
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten
+# combination: Die gegebene Kombination (Typ, Länge und Rang)
+# with_bombs: Wenn True, zählt auch eine Bombe, die die Kombination schlägt
+# tolerance: Gewünschte halbe Breite des Konfidenzintervalls
+# confidence: Konfidenzniveau
+# max_samples: Maximale Anzahl gezogener Hände
+# time_budget: Maximale Rechenzeit in Sekunden (None == unbegrenzt; es wird mindestens ein Block gezogen)
+# rng: Zufallsgenerator (None == neuer Generator)
+# return: Die geschätzte Wahrscheinlichkeit `p_high` mit Konfidenzintervall
+def estimate_prob_of_higher_combi(cards: Cards, k: int, combination: Combination, with_bombs: bool = True,
+                                  tolerance: float = 0.01, confidence: float = 0.95, max_samples: int = 100000,
+                                  time_budget: Optional[float] = None, rng: Optional[np.random.Generator] = None) -> ProbEstimate:
+    n = len(cards)  # Gesamtanzahl der verfügbaren Karten
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    if k == 0:
+        return ProbEstimate(p=0.0, low=0.0, high=0.0, samples=0)
+    if combination == (1, 1, 0):  # Hund
+        return ProbEstimate(p=1.0, low=1.0, high=1.0, samples=0)  # man verliert das Anspielrecht (also als ob man überstochen wird)
+    assert combination != (0, 0, 0) and validate_combination(combination)
+    t, m, r = combination
+
+    def test(h: np.ndarray, colors: np.ndarray) -> np.ndarray:
+        return has_higher_combi(h, colors, combination, with_bombs)
+
+    return _estimate(test, cards, k, tolerance, confidence, max_samples, time_budget, rng)
+
+
+# Schätzt die Wahrscheinlichkeit, dass die Hand die gegebene Kombination anspielen kann
+#
+# Die Sonderfälle Phönix und Hund werden wie in prob_of_lower_combi() behandelt.
+#
+# Parameter wie estimate_prob_of_higher_combi() (ohne with_bombs)
+# return: Die geschätzte Wahrscheinlichkeit `p_low` mit Konfidenzintervall
+def estimate_prob_of_lower_combi(cards: Cards, k: int, combination: Combination,
+                                 tolerance: float = 0.01, confidence: float = 0.95, max_samples: int = 100000,
+                                 time_budget: Optional[float] = None, rng: Optional[np.random.Generator] = None) -> ProbEstimate:
+    n = len(cards)  # Gesamtanzahl der verfügbaren Karten
+    assert k <= n <= 56
+    assert 0 <= k <= 14
+    if k == 0 or combination == (1, 1, 0):  # der Hund kann keine Karte stechen
+        return ProbEstimate(p=0.0, low=0.0, high=0.0, samples=0)
+    assert combination != (0, 0, 0) and validate_combination(combination)
+    t, m, r = combination
+    if t == CombinationType.BOMB:  # eine Bombe kann jede Einzelkarte aus der Hand übernehmen
+        return ProbEstimate(p=1.0, low=1.0, high=1.0, samples=0)
+
+    def test(h: np.ndarray, _colors: np.ndarray) -> np.ndarray:
+        return has_lower_combi(h, combination)
+
+    return _estimate(test, cards, k, tolerance, confidence, max_samples, time_budget, rng)
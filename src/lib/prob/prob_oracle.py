@@ -0,0 +1,159 @@
+"""
+Dieses Modul berechnet die Wahrscheinlichkeiten `p_high` und `p_low` exakt durch vollständige Aufzählung im Rangraum.
+
+`possible_hands_hi` und `possible_hands_lo` zählen jede einzelne Hand auf und sind daher nur bis etwa 20 verfügbare
+Karten brauchbar. Hier werden stattdessen nur die Rang-Vektoren j aufgezählt (Anzahl Handkarten je Rang, j <= h,
+Summe k). Jeder Vektor steht für Π C(h[i], j[i]) Hände, die sich nur in den Farben unterscheiden. Die Vektoren werden
+Rang für Rang vektorisiert mit NumPy erzeugt, und die Arbeit wird nach den Anzahlen der ersten Ränge aufgeteilt und
+auf einen Prozess-Pool verteilt. Damit lassen sich auch 30 bis 40 verfügbare Karten vollständig auszählen.
+
+Ob eine Hand die Kombination überstechen bzw. anspielen kann, wird mit `has_higher_combi` bzw. `has_lower_combi` aus
+prob_mc entschieden (also nach denselben Regeln wie in `possible_hands_hi` und `possible_hands_lo`). Farbbomben sind
+im Rangraum nicht zu erkennen; `p_high` wird daher ohne Farbbomben berechnet (für eine Farbbombe als gegebene
+Kombination gibt es kein Ergebnis).
+
+Das Orakel dient zur Kontrolle der schnellen Berechnung (prob_hi und prob_lo) in realistischen Spielständen, siehe
+bin/prob_oracle.py.
+"""
+
+__all__ = "OracleResult", "oracle_probs",
+
+import math
+import numpy as np
+from dataclasses import dataclass
+from multiprocessing import Pool
+from src.lib.cards import ranks_to_vector, Cards
+from src.lib.combinations import validate_combination, CombinationType, Combination
+from src.lib.prob.prob_mc import has_higher_combi, has_lower_combi
+from time import time
+from typing import Optional, Sequence
+
+
+@dataclass
+class OracleResult:
+    """
+    Exakte Wahrscheinlichkeiten je Kombination.
+
+    :ivar p_high: Je Kombination die Wahrscheinlichkeit, die Kombination zu überstechen (ohne Bomben; NaN für Farbbomben).
+    :ivar p_high_4: Je Kombination die Wahrscheinlichkeit, die Kombination zu überstechen oder mit einer 4er-Bombe zu schlagen (NaN für Farbbomben).
+    :ivar p_4: Wahrscheinlichkeit für eine 4er-Bombe.
+    :ivar p_low: Je Kombination die Wahrscheinlichkeit, die Kombination anspielen zu können.
+    :ivar vectors: Anzahl der ausgewerteten Rang-Vektoren.
+    :ivar hands: Anzahl der dadurch abgedeckten Hände (C(n, k)).
+    :ivar seconds: Rechenzeit in Sekunden.
+    """
+    p_high: np.ndarray
+    p_high_4: np.ndarray
+    p_4: float
+    p_low: np.ndarray
+    vectors: int
+    hands: int
+    seconds: float
+
+
+# ------------------------------------------------------
+# Aufzählung
+# ------------------------------------------------------
+
+# Zählt alle Rang-Vektoren mit gegebenem Präfix auf
+#
+# h: Anzahl verfügbarer Karten je Rang, Shape (17,)
+# k: Anzahl der Handkarten
+# positions: Die Ränge mit verfügbaren Karten in der Reihenfolge der Aufzählung
+# prefix: Anzahl Handkarten für die ersten len(prefix) Ränge aus positions
+# return: Rang-Vektoren, Shape (B, 17), und die Anzahl Hände je Vektor, Shape (B,)
+def _enumerate(h: np.ndarray, k: int, positions: Sequence[int], prefix: Sequence[int]) -> tuple[np.ndarray, np.ndarray]:
+    j = np.zeros((1, 17), dtype=np.int8)
+    w = np.ones(1, dtype=np.int64)
+    for x, c in zip(positions, prefix):
+        j[0, x] = c
+        w *= math.comb(int(h[x]), c)
+    s = j.sum(axis=1)
+    for i in range(len(prefix), len(positions)):
+        x = positions[i]
+        rest = int(h[list(positions[i + 1:])].sum())  # Kapazität der restlichen Ränge
+        parts_j, parts_w = [], []
+        for c in range(min(int(h[x]), k) + 1):
+            keep = (s + c <= k) & (s + c + rest >= k)
+            if keep.any():
+                jc = j[keep].copy()
+                jc[:, x] = c
+                parts_j.append(jc)
+                parts_w.append(w[keep] * math.comb(int(h[x]), c))
+        if not parts_j:
+            return np.zeros((0, 17), dtype=np.int8), np.zeros(0, dtype=np.int64)
+        j = np.concatenate(parts_j)
+        w = np.concatenate(parts_w)
+        s = j.sum(axis=1)
+    keep = s == k
+    return j[keep], w[keep]
+
+
+# Zählt die Hände mit gegebenem Präfix aus (Aufgabe für einen Prozess des Pools)
+#
+# task: (h, k, positions, prefix, combinations)
+# return: Anzahl Rang-Vektoren und je Kombination die Anzahl Hände (p_high, p_high mit 4er-Bombe, p_low), Shape (N, 3);
+#         zusätzlich in der letzten Zeile die Anzahl Hände mit 4er-Bombe
+def _count_task(task) -> tuple[int, np.ndarray]:
+    h, k, positions, prefix, combinations = task
+    j, w = _enumerate(h, k, positions, prefix)
+    counts = np.zeros((len(combinations) + 1, 3), dtype=np.int64)
+    if len(j) == 0:
+        return 0, counts
+    bomb_4 = (j[:, 2:15] >= 4).any(axis=1)
+    for i, combination in enumerate(combinations):
+        if not (combination[0] == CombinationType.BOMB and combination[1] >= 5):  # Farbbomben sind im Rangraum nicht zu erkennen
+            b = has_higher_combi(j, None, combination, with_bombs=False)
+            counts[i, 0] = w[b].sum()
+            counts[i, 1] = w[b | bomb_4].sum() if combination[0] != CombinationType.BOMB else counts[i, 0]
+        counts[i, 2] = w[has_lower_combi(j, combination)].sum()
+    counts[-1, 0] = w[bomb_4].sum()
+    return len(j), counts
+
+
+# ------------------------------------------------------
+# Orakel
+# ------------------------------------------------------
+
+# Berechnet `p_high` und `p_low` für mehrere Kombinationen exakt durch vollständige Aufzählung
+#
+# Die Sonderfälle Phönix und Hund werden wie in possible_hands_hi() bzw. possible_hands_lo() behandelt.
+#
+# cards: Verfügbare Karten
+# k: Anzahl der Handkarten (1 bis 14)
+# combinations: Die gegebenen Kombinationen (Typ, Länge und Rang; nicht Passen)
+# workers: Anzahl Prozesse (None == Anzahl CPUs; 1 == ohne Pool)
+# depth: Anzahl Ränge, nach deren Anzahl Handkarten die Arbeit aufgeteilt wird
+# return: Die exakten Wahrscheinlichkeiten je Kombination
+def oracle_probs(cards: Cards, k: int, combinations: Sequence[Combination], workers: Optional[int] = None, depth: int = 3) -> OracleResult:
+    n = len(cards)
+    assert 0 < k <= min(n, 14)
+    assert all(combination != (0, 0, 0) and validate_combination(combination) for combination in combinations)
+    time_start = time()
+    combinations = [tuple(combination) for combination in combinations]
+    h = np.array(ranks_to_vector(cards), dtype=np.int64)
+    positions = [x for x in range(17) if h[x] > 0]
+
+    # Aufgaben nach den Anzahlen der ersten Ränge bilden
+    depth = min(depth, len(positions))
+    prefixes = [()]
+    for x in positions[:depth]:
+        prefixes = [prefix + (c,) for prefix in prefixes for c in range(min(int(h[x]), k) + 1) if sum(prefix) + c <= k]
+    tasks = [(h, k, positions, prefix, combinations) for prefix in prefixes]
+
+    if workers == 1:
+        results = [_count_task(task) for task in tasks]
+    else:
+        with Pool(processes=workers) as pool:
+            results = pool.map(_count_task, tasks)
+
+    vectors = sum(v for v, _ in results)
+    counts = np.sum([c for _, c in results], axis=0)
+    hands = math.comb(n, k)
+    assert counts.shape[0] == len(combinations) + 1
+    p = counts[:-1] / hands
+    color_bomb = np.array([combination[0] == CombinationType.BOMB and combination[1] >= 5 for combination in combinations], dtype=bool)
+    p_high = np.where(color_bomb, np.nan, p[:, 0])
+    p_high_4 = np.where(color_bomb, np.nan, p[:, 1])
+    return OracleResult(p_high=p_high, p_high_4=p_high_4, p_4=counts[-1, 0] / hands, p_low=p[:, 2],
+                        vectors=vectors, hands=hands, seconds=time() - time_start)
@@ -1,44 +1,598 @@
 """
-Dieses Modul bietet eine Funktion zur Berechnung der Wahrscheinlichkeiten, dass die Mitspieler eine bestimmte
-Kombination anspielen bzw. überstechen können.
+Dieses Modul berechnet die Wahrscheinlichkeiten, dass die Mitspieler eine bestimmte Kombination anspielen bzw.
+überstechen können, und bewertet damit die Partitionen der Handkarten.
+
+Die Statistik wird für alle Kombinationen der Hand in einem Durchgang berechnet. Grundlage ist das Histogramm der Ränge
+der Karten, die die Mitspieler haben können (die ungespielten Karten ohne die eigenen Handkarten). Wie in prob_gf werden
+die Karten eines Rangs als Polynom dargestellt (der Koeffizient von y^j ist die Anzahl Möglichkeiten, j dieser Karten
+auf der Hand zu haben) und Rang für Rang je Zustand eines kleinen Automaten multipliziert. Jeder Automat läuft einmal
+aufwärts (vom Mahjong zum Ass) und einmal abwärts, und nach jedem Rang wird der Zwischenstand festgehalten (Nachricht).
+Ob eine Hand eine höhere bzw. niedrigere Kombination hat, ergibt sich aus den Nachrichten unterhalb und oberhalb des
+Rangs der Kombination. So erhält man die Ergebnisse für alle Ränge und alle Anzahlen von Handkarten (also für alle
+Mitspieler) gleichzeitig.
+
+Die Regeln entsprechen `possible_hands_hi` (mit 4er-Bomben) und `possible_hands_lo`. Zwei Terme sind Näherungen:
+
+- Farbbomben werden in hi als unabhängig von der Kombination angenommen (sie sind selten). Für einen einzelnen
+  Mitspieler weicht hi dadurch um höchstens etwa 0.01 vom exakten Wert ab.
+- Die Werte für "mindestens ein Gegner" (opp) werden gebildet, als wären die Hände der beiden Gegner unabhängig
+  voneinander. Tatsächlich schließen sie sich gegenseitig aus; bei kleinem Pool weicht opp um bis zu etwa 0.15 ab.
+
+Die Schranken werden in tests/prob/test_statistic.py (test_calc_statistic_array_error) gegen die vollständige
+Aufzählung aller Kartenverteilungen geprüft. Exakte Werte würden einen gemeinsamen Automaten für beide Gegner erfordern
+und wären für das Spiel zu langsam.
 """
 
-__all__ = "calc_statistic"
+__all__ = "STATISTIC_DTYPE", "calc_statistic_array", "calc_statistic", "Statistic", "partition_quality",
 
 import math
-from src.lib.cards import CARD_DOG, CARD_MAH, CARD_DRA, CARD_PHO, Cards
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from src import config
+from src.lib.cards import Cards, canonicalize_suits, cards_to_mask, mask_to_cards, ranks_to_vector
 from src.lib.combinations import CombinationType, Combination
 from src.lib.partitions import Partition
-from typing import List, Tuple, Dict, Optional
-
-
-# todo Die Funktionen in diesem Modul müssen nochmal durchdacht und die neuen prob-Funktionen angewendet werden.
-
-
-# Dies ist noch die unveränderte (und nicht korrekte) Vorgänger-Version.
-#
-# Wahrscheinlichkeit berechnen, dass die Mitspieler eine bestimmte Kombination anspielen bzw. überstechen können
-# Für jede eigene Kombination liefert die Funktion folgende Werte:
-# lo_opp: Wahrscheinlichkeit, das der Gegner eine Kombination hat, die ich stechen kann und somit das Anspiel gewinne
-# lo_par: Wahrscheinlichkeit, das der Partner eine Kombination hat, die ich stechen kann und somit das Anspiel gewinne
-# hi_opp: Wahrscheinlichkeit, das der Gegner eine höherwertige Kombination hat und das Anspiel verliere
-# hi_par: Wahrscheinlichkeit, das der Partner eine höherwertige Kombination hat und das Anspiel verliere
-# eq_opp: Wahrscheinlichkeit, dass der Gegner eine gleichwertige Kombinationen hat
-# eq_par: Wahrscheinlichkeit, dass der Partner eine gleichwertige Kombinationen hat
-# Daraus folgt:
-# 1 - lo_opp - hi_opp - eq_opp: Wahrscheinlichkeit, dass der Gegner nicht die Kombi vom gleichen Typ und Länge hat
-# 1 - lo_par - hi_par - eq_par: Wahrscheinlichkeit, dass der Partner nicht die Kombi vom gleichen Typ und Länge hat
-# Diese Parameter werden erwartet:
-# player: Meine Spielernummer (zw. 0 und 3)
-# hand: Eigene Handkarten
-# combis: Zu bewertende Kombinationen (gebildet aus den Handkarten) [(Karten, (Typ, Länge, Rang)), ...]
-# number_of_cards: Anzahl der Handkarten aller Spieler.
-# trick_combination: Kombination (Typ, Länge, Rang) des aktuellen Stichs ((0,0,0), falls kein Stich liegt).
-# unplayed_cards: Noch nicht gespielte Karten
-def calc_statistic(player: int, hand: Cards, combis: List[Tuple[Cards, Combination]], number_of_cards: List[int], trick_combination: Combination, unplayed_cards: Cards) -> Dict[Cards, Tuple[float, float, float, float, float, float]]:
-    assert hand  # wir haben bereits bzw. noch Karten auf der Hand
-    assert len(hand) == number_of_cards[player]
+from src.lib.prob.automata import FOUND, mul_poly, free_poly, tuple_step, stair_step, street_step, fullhouse_step, fullhouse_accept, \
+    count_color_without_higher_color_bomb
+from typing import List, Tuple, Dict, Optional, Callable, Hashable
+
+STATISTIC_DTYPE = np.dtype([(f"{kind}_{who}", np.float64) for kind in ("lo", "hi", "eq") for who in ("right", "left", "opp", "par")])
+"""
+Datentyp der Statistik je Kombination (siehe calc_statistic_array()).
+
+lo: Wahrscheinlichkeit, dass der Mitspieler eine niedrigere Kombination gleichen Typs und gleicher Länge hat (die ich stechen kann)
+hi: Wahrscheinlichkeit, dass der Mitspieler die Kombination überstechen kann (auch mit einer Bombe)
+eq: Wahrscheinlichkeit, dass der Mitspieler eine gleichwertige Kombination hat
+right, left, par: Rechter Gegner, linker Gegner, Partner; opp: mindestens einer der beiden Gegner
+"""
+
+# LRU-Cache für calc_statistic_array() und Statistic (Schlüssel sind die Anzahl der Handkarten von rechtem Gegner,
+# linkem Gegner und Partner sowie die kanonische Form der Karten der Mitspieler; die Größe ist durch
+# config.STATISTIC_CACHE_SIZE begrenzt)
+_statistic_cache: OrderedDict = OrderedDict()
+
+_RANKS = frozenset(range(2, 15))  # Ränge, mit denen sich Pärchen, Drillinge, Treppen, Fullhouses und Bomben bilden lassen
+
+
+# ------------------------------------------------------
+# Automaten
+# ------------------------------------------------------
+
+class _Automaton:
+    """
+    Endlicher Automat über den Rängen 1 (Mahjong) bis 14 (Ass) mit vorberechneten Übergängen.
+
+    Zustand 0 ist der absorbierende Zustand `FOUND`, Zustand 1 der Startzustand.
+    """
+    def __init__(self, init: Hashable, step: Callable):
+        index = {FOUND: 0, init: 1}
+        self.states: List[Hashable] = [FOUND, init]
+        rows = []
+        for state in self.states:  # die Liste wächst, bis alle erreichbaren Zustände erfasst sind
+            row = np.zeros((15, 5), dtype=np.int64)
+            for x in range(1, 15):
+                for j in range(5):
+                    next_state = FOUND if state == FOUND else step(state, x, j)
+                    if next_state not in index:
+                        index[next_state] = len(self.states)
+                        self.states.append(next_state)
+                    row[x, j] = index[next_state]
+            rows.append(row)
+        self.next = np.stack(rows, axis=-1)  # Folgezustand je Rang, Anzahl Karten und Zustand; Shape (15, 5, S)
+
+
+_automata: Dict[tuple, _Automaton] = {}
+
+
+def _wrap_step(step: Callable, skip_mahjong: bool, bombs: bool) -> Callable:
+    """
+    Ergänzt die Übergangsfunktion um 4er-Bomben und lässt den Mahjong aus, wenn er nicht zur Kombination gehören kann.
+
+    :param step: Die Übergangsfunktion (Zustand, Rang, Anzahl Karten) -> Folgezustand.
+    :param skip_mahjong: Wenn True, bleibt der Zustand beim Mahjong unverändert.
+    :param bombs: Wenn True, führt jede 4er-Bombe in den Zustand FOUND.
+    :return: Die ergänzte Übergangsfunktion.
+    """
+    def wrapped(state, x, j):
+        if bombs and x >= 2 and j >= 4:
+            return FOUND
+        if skip_mahjong and x == 1:
+            return state
+        return step(state, x, j)
+    return wrapped
+
+
+def _get_automaton(kind: str, m: int = 0, pho: int = 0, bombs: bool = False, lo: bool = False) -> _Automaton:
+    """
+    Gibt den Automaten zurück (wird beim ersten Aufruf erzeugt).
+
+    :param kind: "free" (erkennt nur Bomben), "pairs" (zählt Ränge mit mindestens 2 bzw. 1 Karte), "tuple", "stair",
+                 "street" oder "fullhouse" (wie in prob_gf; der Rang der Kombination ist beliebig).
+    :param m: (Optional) Länge der Kombination.
+    :param pho: (Optional) 1, wenn der Phönix auf der Hand ist und eine Karte ersetzen darf.
+    :param bombs: (Optional) Wenn True, führt jede 4er-Bombe in den Zustand FOUND.
+    :param lo: (Optional) Wenn True, gilt die Regel von p_low für den Phönix am unteren Ende einer Straße.
+    :return: Der Automat.
+    """
+    key = kind, m, pho, bombs, lo
+    automaton = _automata.get(key)
+    if automaton is None:
+        if kind == "free":
+            init, step = 0, lambda state, x, j: state
+        elif kind == "pairs":
+            init, step = (0, 0), lambda state, x, j: (min(state[0] + (j >= 2), 2), min(state[1] + (j >= 1), 2))
+        elif kind == "tuple":
+            init, step = 0, tuple_step(m, _RANKS, pho)
+        elif kind == "stair":
+            init, step = (0, 0), stair_step(m // 2, _RANKS, pho)
+        elif kind == "street":
+            init, step = (0, 0, 0), street_step(m, set(range(1, 15)), pho, lo)
+        elif kind == "fullhouse":
+            init, step = (False, False, 0, 0), fullhouse_step(_RANKS)
+        else:
+            assert False
+        automaton = _automata[key] = _Automaton(init, _wrap_step(step, kind != "street", bombs))
+    return automaton
+
+
+_accepts: Dict[tuple, np.ndarray] = {}
+
+
+def _get_accept(lower: _Automaton, upper: _Automaton, pho: int) -> np.ndarray:
+    """
+    Gibt die Akzeptanzmatrix für die Zustände unterhalb (Zeilen) und oberhalb (Spalten) der Grenze zurück.
+
+    Akzeptiert wird, wenn einer der beiden Automaten die Kombination gefunden hat. Beim Fullhouse zählt ein Automat die
+    Drillinge bzw. Pärchen im Rangbereich der Kombination ("fullhouse"), der andere nur die Pärchen und Einzelkarten
+    ("pairs"); akzeptiert wird wie in fullhouse_accept().
+
+    :param lower: Der Automat unterhalb der Grenze.
+    :param upper: Der Automat oberhalb der Grenze.
+    :param pho: 1, wenn der Phönix auf der Hand ist.
+    :return: Die Akzeptanzmatrix (1.0 oder 0.0), Shape (Zustände unten, Zustände oben).
+    """
+    key = id(lower), id(upper), pho
+    accept = _accepts.get(key)
+    if accept is None:
+        accept = np.zeros((len(lower.states), len(upper.states)), dtype=np.float64)
+        for a, state_a in enumerate(lower.states):
+            for b, state_b in enumerate(upper.states):
+                if state_a == FOUND or state_b == FOUND:
+                    accept[a, b] = 1.0
+                elif isinstance(state_a, tuple) and isinstance(state_b, tuple) and len(state_a) + len(state_b) == 6:
+                    fullhouse, pairs = (state_a, state_b) if len(state_a) == 4 else (state_b, state_a)
+                    t3, t2, c2, c1 = fullhouse
+                    if fullhouse_accept((t3, t2, min(c2 + pairs[0], 2), min(c1 + pairs[1], 2)), pho):
+                        accept[a, b] = 1.0
+        _accepts[key] = accept
+    return accept
+
+
+# ------------------------------------------------------
+# Nachrichten
+# ------------------------------------------------------
+
+def _step_message(next_states: np.ndarray, msg: np.ndarray, x: int, c: int) -> np.ndarray:
+    """
+    Multipliziert die Nachricht mit dem Polynom eines Rangs (je Zustand; Grad höchstens K).
+
+    :param next_states: Folgezustand je Rang, Anzahl Karten und Zustand (siehe _Automaton.next).
+    :param msg: Polynom je Zustand, Shape (S, K + 1).
+    :param x: Der Rang.
+    :param c: Anzahl verfügbarer Karten mit dem Rang.
+    :return: Die neue Nachricht, Shape (S, K + 1).
+    """
+    s, size = msg.shape
+    targets, weights = [], []
+    for j in range(min(c, size - 1) + 1):
+        targets.append((next_states[x, j][:, None] * size + np.arange(j, size)).ravel())
+        weights.append((msg[:, :size - j] * math.comb(c, j)).ravel())
+    return np.bincount(np.concatenate(targets), np.concatenate(weights), minlength=s * size).reshape(s, size)
+
+
+def _messages(automata: List[_Automaton], h: np.ndarray, K: int, ascending: bool,
+              previous: Optional[List[np.ndarray]] = None, changed: Tuple[int, int] = (1, 14)) -> List[np.ndarray]:
+    """
+    Berechnet die Nachrichten mehrerer Automaten für alle Grenzen b (0 bis 14).
+
+    Die Zustände der Automaten werden aneinandergehängt, so dass alle Automaten in einem Durchgang berechnet werden.
+    Aufwärts ist Eintrag b das Polynom je Zustand für die Ränge 1 bis b, abwärts für die Ränge b + 1 bis 14.
+
+    Sind die bisherigen Nachrichten gegeben, werden nur die Einträge neu berechnet, die einen geänderten Rang abdecken
+    (aufwärts ab dem niedrigsten, abwärts ab dem höchsten geänderten Rang).
+
+    :param automata: Die Automaten.
+    :param h: Anzahl verfügbarer Karten je Rang.
+    :param K: Höchster benötigter Grad (größte Anzahl Handkarten).
+    :param ascending: Richtung.
+    :param previous: (Optional) Die bisherigen Nachrichten je Automat.
+    :param changed: (Optional) Niedrigster und höchster Rang, dessen Anzahl sich seitdem geändert hat.
+    :return: Je Automat die Nachrichten, Shape (15, S, K + 1).
+    """
+    offsets = np.cumsum([0] + [len(automaton.states) for automaton in automata])
+    next_states = np.concatenate([automaton.next + offset for automaton, offset in zip(automata, offsets)], axis=-1)
+    if previous is None:
+        result = np.zeros((15, offsets[-1], K + 1))
+        result[0 if ascending else 14, offsets[:-1] + 1, 0] = 1.0  # Startzustände
+        changed = 1, 14
+    else:
+        result = np.concatenate(previous, axis=1)
+    if ascending:
+        for x in range(changed[0], 15):
+            result[x] = _step_message(next_states, result[x - 1], x, int(h[x]))
+    else:
+        for x in range(changed[1], 0, -1):
+            result[x - 1] = _step_message(next_states, result[x], x, int(h[x]))
+    return [result[:, offsets[i]:offsets[i + 1]] for i in range(len(automata))]
+
+
+def _count(lower: np.ndarray, upper: np.ndarray, accept: np.ndarray, g: np.ndarray, ks: List[int], pho: int) -> np.ndarray:
+    """
+    Zählt je Grenze b die akzeptierten Hände (Kombination der Nachrichten unterhalb und oberhalb der Grenze).
+
+    :param lower: Nachrichten aufwärts, Shape (15, S, K + 1).
+    :param upper: Nachrichten abwärts, Shape (15, S, K + 1).
+    :param accept: Akzeptanzmatrix (siehe _get_accept()).
+    :param g: Polynom der übrigen Karten (Hund und Drache).
+    :param ks: Anzahl Handkarten.
+    :param pho: 1, wenn der Phönix auf der Hand ist (er belegt dann eine der Handkarten).
+    :return: Anzahl Hände je Grenze und Anzahl Handkarten, Shape (15, len(ks)).
+    """
+    size = lower.shape[-1]
+    toeplitz = np.zeros((size, size))
+    for i in range(size):
+        toeplitz[i, i:] = g[:size - i]
+    lower = lower @ toeplitz
+    result = np.zeros((15, len(ks)))
+    for i, k in enumerate(ks):
+        k2 = k - pho
+        if k2 >= 0:
+            pairs = np.einsum("rad,rbd->rab", lower[:, :, :k2 + 1], upper[:, :, k2::-1])
+            result[:, i] = np.einsum("rab,ab->r", pairs, accept)
+    return result
+
+
+# ------------------------------------------------------
+# Statistik
+# ------------------------------------------------------
+
+@dataclass
+class _Context:
+    """
+    Karten der Mitspieler und Zwischenergebnisse einer Berechnung.
+    """
+    cards: Cards  # Karten, die die Mitspieler haben können
+    h: np.ndarray  # Anzahl dieser Karten je Rang
+    ks: List[int]  # Anzahl Handkarten der Mitspieler (verschiedene Werte größer 0)
+    K: int  # Höchster Grad der Polynome (mindestens max(ks))
+    messages: Dict[Tuple[_Automaton, bool], np.ndarray] = field(default_factory=dict)  # Nachrichten je Automat und Richtung
+    counts: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = field(default_factory=dict)  # hi und lo je Typ und Länge
+    color_counts: Dict[tuple, np.ndarray] = field(default_factory=dict)  # Hände ohne höhere Farbbombe je Länge, Rang und Farbe
+    p_color: Optional[np.ndarray] = None  # Wahrscheinlichkeit einer Farbbombe je Anzahl Handkarten
+
+    @property
+    def n(self) -> int:
+        return len(self.cards)
+
+    def get_messages(self, automaton: _Automaton, ascending: bool) -> np.ndarray:
+        """
+        Gibt die Nachrichten eines Automaten zurück (werden beim ersten Aufruf berechnet).
+
+        :param automaton: Der Automat.
+        :param ascending: Richtung.
+        :return: Die Nachrichten, Shape (15, S, K + 1).
+        """
+        key = automaton, ascending
+        if key not in self.messages:
+            self.compute_messages([key])
+        return self.messages[key]
+
+    def compute_messages(self, needed: List[Tuple[_Automaton, bool]]):
+        """
+        Berechnet die fehlenden Nachrichten der benötigten Automaten (je Richtung in einem Durchgang).
+
+        :param needed: Die benötigten Nachrichten [(Automat, aufwärts), ...].
+        """
+        for ascending in (True, False):
+            automata = list(dict.fromkeys(automaton for automaton, direction in needed
+                                          if direction == ascending and (automaton, ascending) not in self.messages))
+            if automata:
+                for automaton, messages in zip(automata, _messages(automata, self.h, self.K, ascending)):
+                    self.messages[automaton, ascending] = messages
+
+    def remove_cards(self, cards: Cards, ks: List[int], needed: List[Tuple[_Automaton, bool]]):
+        """
+        Entfernt Karten aus dem Pool der Mitspieler.
+
+        Es werden nur die Nachrichten der benötigten Automaten aktualisiert, und zwar nur für die Ränge ab dem
+        niedrigsten bzw. höchsten geänderten Rang.
+
+        :param cards: Die Karten, die den Pool verlassen.
+        :param ks: Anzahl Handkarten der Mitspieler danach.
+        :param needed: Die benötigten Nachrichten [(Automat, aufwärts), ...].
+        """
+        assert max(ks) <= self.K
+        removed = set(cards)
+        self.cards = [card for card in self.cards if card not in removed]
+        h = np.array(ranks_to_vector(self.cards), dtype=np.int64)
+        changed = [x for x in range(1, 15) if h[x] != self.h[x]]
+        self.h = h
+        self.ks = ks
+        self.counts = {}
+        self.p_color = None
+        colors = {color for v, color in removed if 2 <= v <= 14}
+        self.color_counts = {key: poly for key, poly in self.color_counts.items() if key[2] not in colors}
+        needed = set(needed)
+        self.messages = {key: messages for key, messages in self.messages.items() if key in needed}
+        if changed:
+            for ascending in (True, False):
+                keys = [key for key in self.messages if key[1] == ascending]
+                if keys:
+                    previous = [self.messages[key] for key in keys]
+                    updated = _messages([automaton for automaton, _ in keys], self.h, self.K, ascending, previous, (changed[0], changed[-1]))
+                    self.messages.update(zip(keys, updated))
+
+
+def _class_automata(t: CombinationType, m: int, pho: int) -> Tuple[_Automaton, _Automaton, Optional[_Automaton], Optional[_Automaton]]:
+    """
+    Gibt die Automaten für hi (unterhalb und oberhalb der Grenze) und für lo (dito) zurück.
+
+    :param t: Typ der Kombination (Pärchen, Drilling, Treppe, Fullhouse, Straße oder 4er-Bombe).
+    :param m: Länge der Kombination.
+    :param pho: 1, wenn der Phönix auf der Hand ist.
+    :return: Die Automaten für hi unten, hi oben, lo unten und lo oben (für lo None, wenn es nicht benötigt wird).
+    """
+    if t == CombinationType.FULLHOUSE:
+        return _get_automaton("pairs", bombs=True), _get_automaton("fullhouse", bombs=True), _get_automaton("fullhouse"), _get_automaton("pairs")
+    if t == CombinationType.BOMB:
+        return _get_automaton("free"), _get_automaton("tuple", 4), None, None  # eine Bombe kann jede Einzelkarte übernehmen
+    kind = "tuple" if t in (CombinationType.PAIR, CombinationType.TRIPLE) else "stair" if t == CombinationType.STAIR else "street"
+    return _get_automaton("free", bombs=True), _get_automaton(kind, m, pho, bombs=True), _get_automaton(kind, m, pho, lo=kind == "street"), _get_automaton("free")
+
+
+def _class_counts(ctx: _Context, t: CombinationType, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Zählt je Grenze b die Hände mit einer höheren Kombination oder 4er-Bombe (hi) bzw. mit einer niedrigeren
+    Kombination (lo) vom Typ t und der Länge m (Pärchen, Drilling, Treppe, Fullhouse, Straße oder 4er-Bombe).
+
+    hi: Pärchen, Drillinge, Fullhouses und 4er-Bomben mit einem Rang über b, Treppen und Straßen, die ganz über b liegen.
+    lo: Kombinationen mit einem Rang bis b.
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param t: Typ der Kombination.
+    :param m: Länge der Kombination.
+    :return: hi und lo, jeweils Shape (15, len(ks)).
+    """
+    key = t, m
+    if key not in ctx.counts:
+        g = free_poly(int(ctx.h[0] + ctx.h[15]), ctx.K)
+        hi = np.zeros((15, len(ctx.ks)))
+        lo = np.zeros((15, len(ctx.ks)))
+        for pho in range(int(ctx.h[16]) + 1):
+            hi_lower, hi_upper, lo_lower, lo_upper = _class_automata(t, m, pho)
+            hi += _count(ctx.get_messages(hi_lower, True), ctx.get_messages(hi_upper, False), _get_accept(hi_lower, hi_upper, pho), g, ctx.ks, pho)
+            if lo_lower:
+                lo += _count(ctx.get_messages(lo_lower, True), ctx.get_messages(lo_upper, False), _get_accept(lo_lower, lo_upper, pho), g, ctx.ks, pho)
+        ctx.counts[key] = hi, lo
+    return ctx.counts[key]
+
+
+def _needed_automata(ctx: _Context, combinations: List[Combination]) -> List[Tuple[_Automaton, bool]]:
+    """
+    Listet die Automaten auf, deren Nachrichten für die Kombinationen benötigt werden.
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param combinations: Die Kombinationen (Typ, Länge, Rang).
+    :return: Die benötigten Nachrichten [(Automat, aufwärts), ...].
+    """
+    needed = [(_get_automaton("free", bombs=True), True)]
+    for t, m, _r in set(combinations):
+        if t != CombinationType.SINGLE and not (t == CombinationType.BOMB and m >= 5):
+            for pho in range(int(ctx.h[16]) + 1):
+                hi_lower, hi_upper, lo_lower, lo_upper = _class_automata(t, m, pho)
+                needed += [(hi_lower, True), (hi_upper, False)]
+                if lo_lower:
+                    needed += [(lo_lower, True), (lo_upper, False)]
+    return needed
+
+
+def _choose(c: int, K: int, j_min: int = 0, j_max: int = 4) -> np.ndarray:
+    """
+    Gibt das Polynom für die Auswahl von j_min bis j_max aus c Karten zurück.
+
+    :param c: Anzahl verfügbarer Karten.
+    :param K: Höchster Grad.
+    :param j_min: (Optional) Mindestanzahl ausgewählter Karten.
+    :param j_max: (Optional) Höchstanzahl ausgewählter Karten.
+    :return: Die Koeffizienten, Shape (K + 1,).
+    """
+    poly = np.zeros(K + 1)
+    for j in range(j_min, min(c, j_max, K) + 1):
+        poly[j] = math.comb(c, j)
+    return poly
+
+
+def _count_without_higher_single(ctx: _Context, v: int, dragon: bool, phoenix: bool) -> np.ndarray:
+    """
+    Zählt die Hände, die keine Karte über dem Rang v und keine 4er-Bombe haben (für Einzelkarten).
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param v: Höchster erlaubter Rang (1 bis 14).
+    :param dragon: Wenn True, darf der Drache auf der Hand sein.
+    :param phoenix: Wenn True, darf der Phönix auf der Hand sein.
+    :return: Anzahl Hände je Anzahl Handkarten, Shape (len(ks),).
+    """
+    msg = ctx.get_messages(_get_automaton("free", bombs=True), True)[v, 1]
+    poly = mul_poly(msg, free_poly(int(ctx.h[0] + (ctx.h[15] if dragon else 0)), ctx.K))
+    result = np.zeros(len(ctx.ks))
+    for i, k in enumerate(ctx.ks):
+        result[i] = poly[k] + (poly[k - 1] if phoenix and ctx.h[16] and k > 0 else 0)
+    return result
+
+
+def _count_equal(ctx: _Context, t: CombinationType, m: int, r: int) -> np.ndarray:
+    """
+    Zählt die Hände mit einer gleichwertigen Kombination (gleicher Typ, gleiche Länge und gleicher Rang).
 
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param t: Typ der Kombination.
+    :param m: Länge der Kombination.
+    :param r: Rang der Kombination.
+    :return: Anzahl Hände je Anzahl Handkarten, Shape (len(ks),).
+    """
+    h, K = ctx.h, ctx.K
+    result = np.zeros(len(ctx.ks))
+    if t == CombinationType.BOMB and m >= 5:  # Farbbombe in einer anderen Farbe (Inklusion-Exklusion über die Farben)
+        colors = [color for color in range(1, 5) if all((x, color) in ctx.cards for x in range(r - m + 1, r + 1))]
+        for i, k in enumerate(ctx.ks):
+            for size in range(1, len(colors) + 1):
+                if k >= m * size:
+                    result[i] += (-1) ** (size + 1) * math.comb(len(colors), size) * math.comb(ctx.n - m * size, k - m * size)
+        return result
+    if t == CombinationType.SINGLE:
+        if 2 <= r <= 14:
+            for i, k in enumerate(ctx.ks):
+                result[i] = math.comb(ctx.n, k) - math.comb(ctx.n - int(h[r]), k)
+        return result
+
+    polys = []  # Polynome ohne Phönix und mit Phönix (dann eine Karte weniger)
+    if t in (CombinationType.PAIR, CombinationType.TRIPLE, CombinationType.BOMB):
+        rest = free_poly(ctx.n - int(h[r] + h[16]), K)
+        polys.append(mul_poly(_choose(int(h[r]), K, m), rest))
+        if t != CombinationType.BOMB:
+            polys.append(mul_poly(_choose(int(h[r]), K, m - 1), rest))
+        else:
+            polys.append(polys[0])
+    elif t in (CombinationType.STREET, CombinationType.STAIR):
+        need = 1 if t == CombinationType.STREET else 2
+        window = range(r - m + 1, r + 1) if t == CombinationType.STREET else range(r - m // 2 + 1, r + 1)
+        full = free_poly(ctx.n - int(sum(h[x] for x in window) + h[16]), K)
+        for x in window:
+            full = mul_poly(full, _choose(int(h[x]), K, need))
+        gap = np.zeros(K + 1)  # genau ein Rang mit einer Karte zu wenig
+        for w in window:
+            poly = free_poly(ctx.n - int(sum(h[x] for x in window) + h[16]), K)
+            for x in window:
+                poly = mul_poly(poly, _choose(int(h[x]), K, need - 1, need - 1) if x == w else _choose(int(h[x]), K, need))
+            gap += poly
+        polys += [full, full + gap]
+    elif t == CombinationType.FULLHOUSE:
+        others = [x for x in range(2, 15) if x != r]
+        rest = free_poly(ctx.n - int(sum(h[2:15]) + h[16]), K)
+        total = free_poly(int(sum(h[x] for x in others)), K)
+        no_pair = np.eye(1, K + 1)[0]
+        for x in others:
+            no_pair = mul_poly(no_pair, _choose(int(h[x]), K, 0, 1))
+        no_card = np.eye(1, K + 1)[0]
+        polys.append(mul_poly(mul_poly(_choose(int(h[r]), K, 3), total - no_pair), rest))
+        polys.append(mul_poly(mul_poly(_choose(int(h[r]), K, 3), total - no_card) + mul_poly(_choose(int(h[r]), K, 2, 2), total - no_pair), rest))
+    else:
+        assert False
+
+    for i, k in enumerate(ctx.ks):
+        result[i] = polys[0][k] + (polys[1][k - 1] if h[16] and k > 0 else 0)
+    return result
+
+
+def _calc_probs(ctx: _Context, combination: Combination, v: int) -> np.ndarray:
+    """
+    Berechnet lo, hi und eq für eine Kombination.
+
+    Farbbomben gehen in hi als unabhängig von der Kombination ein (siehe Moduldokumentation).
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param combination: Die eigene Kombination (Typ, Länge, Rang).
+    :param v: Beim Phönix als Einzelkarte der Rang, über dem die Karten liegen müssen, um ihn zu überstechen.
+    :return: Wahrscheinlichkeiten lo, hi und eq je Anzahl Handkarten, Shape (3, len(ks)).
+    """
+    t, m, r = combination
+    h = ctx.h
+    total = np.array([math.comb(ctx.n, k) for k in ctx.ks], dtype=np.float64)
+    result = np.zeros((3, len(ctx.ks)))
+    if combination == (CombinationType.SINGLE, 1, 0):  # der Hund kann weder anspielen noch überstochen werden
+        result[1] = 1.0
+        return result
+
+    # lo
+    if t == CombinationType.SINGLE:
+        lower = 0 if r <= 1 else int(sum(h[1:min(r, 15)]) + (h[16] if r != 16 else 0))
+        result[0] = 1 - np.array([math.comb(ctx.n - lower, k) for k in ctx.ks]) / total
+    elif t == CombinationType.BOMB:
+        result[0] = 1.0
+    else:
+        r_min = m // 2 + 1 if t == CombinationType.STAIR else m if t == CombinationType.STREET else 2
+        result[0] = _class_counts(ctx, t, m)[1][r - 1] / total if r > r_min else 0.0
+
+    # hi
+    if t == CombinationType.SINGLE:
+        if r == 16:
+            avoid = _count_without_higher_single(ctx, min(v, 14), dragon=v >= 15, phoenix=False)
+        elif r == 15:
+            avoid = _count_without_higher_single(ctx, 14, dragon=True, phoenix=True)
+        else:
+            avoid = _count_without_higher_single(ctx, r, dragon=False, phoenix=False)
+        result[1] = 1 - avoid / total
+    elif t == CombinationType.BOMB and m >= 5:
+        result[1] = 1 - _count_without_higher_color_bomb(ctx, m, r)[ctx.ks] / total
+    else:
+        b = r - m + 1 if t == CombinationType.STREET else r - m // 2 + 1 if t == CombinationType.STAIR else r
+        result[1] = _class_counts(ctx, t, m)[0][b] / total
+    if not (t == CombinationType.BOMB and m >= 5):
+        if ctx.p_color is None:
+            ctx.p_color = _prob_of_color_bomb(ctx, total)
+        result[1] = 1 - (1 - result[1]) * (1 - ctx.p_color)
+
+    # eq
+    result[2] = _count_equal(ctx, t, m, r) / total
+    return result
+
+
+def _count_without_higher_color_bomb(ctx: _Context, m: int = 5, r: int = 5) -> np.ndarray:
+    """
+    Zählt die Hände ohne höhere Farbbombe (die Polynome der Farben werden zwischengespeichert).
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param m: (Optional) Länge der gegebenen Farbbombe.
+    :param r: (Optional) Rang der gegebenen Farbbombe (mit m = r = 5 zählt jede Farbbombe).
+    :return: Anzahl Hände je Anzahl Handkarten als Polynom, Shape (K + 1,).
+    """
+    avoid = free_poly(ctx.n - int(sum(ctx.h[2:15])), ctx.K)
+    for color in range(1, 5):
+        key = m, r, color
+        if key not in ctx.color_counts:
+            ctx.color_counts[key] = count_color_without_higher_color_bomb(ctx.cards, color, ctx.K, m, r)
+        avoid = mul_poly(avoid, ctx.color_counts[key])
+    return avoid
+
+
+def _prob_of_color_bomb(ctx: _Context, total: np.ndarray) -> np.ndarray:
+    """
+    Berechnet die Wahrscheinlichkeit, dass die Hand irgendeine Farbbombe hat.
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse.
+    :param total: Anzahl möglicher Hände je Anzahl Handkarten.
+    :return: Wahrscheinlichkeit je Anzahl Handkarten, Shape (len(ks),).
+    """
+    for color in range(1, 5):
+        run = 0
+        for x in range(2, 15):
+            run = run + 1 if (x, color) in ctx.cards else 0
+            if run >= 5:
+                return 1 - _count_without_higher_color_bomb(ctx)[ctx.ks] / total
+    return np.zeros(len(ctx.ks))  # keine Farbbombe möglich
+
+
+def _normalize_number_of_cards(player: int, hand: Cards, number_of_cards: List[int], unplayed_cards: Cards) -> List[int]:
+    """
+    Passt die Anzahl der Handkarten an, solange die Karten verteilt bzw. geschupft werden.
+
+    :param player: Meine Spielernummer (zw. 0 und 3).
+    :param hand: Eigene Handkarten.
+    :param number_of_cards: Anzahl der Handkarten aller Spieler.
+    :param unplayed_cards: Noch nicht gespielte Karten (inkl. eigene Handkarten).
+    :return: Anzahl der Handkarten aller Spieler (als wären alle Karten verteilt).
+    """
     if sum(number_of_cards) != len(unplayed_cards):
         # die Karten werden gerade verteilt bzw. es wird geschupft!
         m = len(hand)
@@ -47,291 +601,233 @@ def calc_statistic(player: int, hand: Cards, combis: List[Tuple[Cards, Combinati
         n = int((56 - m) / 3)
         number_of_cards = [n, n, n, n]  # wir tun so, als wenn alle Karten bereits verteilt sind
         number_of_cards[player] = m
+    return number_of_cards
 
-    # Anzahl der ungespielten Karten (die eigenen Handkarten werden hier nicht mitgezählt)
-    #  Dog Mah 2  3  4  5  6  7  8  9 10 Bu Da Kö As Dra
-    c = [
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],  # rot oder Sonderkarte
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],  # grün
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],  # blau
-        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]   # schwarz
-    ]
-    phoenix = False
-    for card in unplayed_cards:
-        if card not in hand:
-            if card == CARD_DOG:
-                c[0][0] = 1
-            elif card == CARD_MAH:
-                c[0][1] = 1
-            elif card == CARD_DRA:
-                c[0][15] = 1
-            elif card == CARD_PHO:
-                phoenix = True
-            else:
-                c[card[1]-1][card[0]] = 1
-
-    # Anzahl der ungespielten Karten gesamt (ohne die eigenen Handkarten)
-    sum_c = len(unplayed_cards) - len(hand)
-
-    # Anzahl Kombinationen pro Typ (Single/1 bis Bombe/7)
-    #           1   2   3   4   5   6   7
-    d = [None, [], [], [], [], [], [], []]
-
-    # Anzahl Einzelkarten gesamt (d[CombinationType.SINGLE][1][15] == Drache, d[CombinationType.SINGLE][1][16] == Phönix)
-    d[CombinationType.SINGLE] = [None, [c[0][v] + c[1][v] + c[2][v] + c[3][v] for v in range(16)] + [int(phoenix)]]
-
-    # Paare, Drillinge und Fullhouse (zunächst ohne Phönix)
-    d[CombinationType.PAIR] = [None, None, [6 if d[CombinationType.SINGLE][1][v] == 4 else 3 if d[CombinationType.SINGLE][1][v] == 3 else 1 if d[CombinationType.SINGLE][1][v] == 2 else 0 for v in range(15)]]
-    d[CombinationType.TRIPLE] = [None, None, None, [4 if d[CombinationType.SINGLE][1][v] == 4 else 1 if d[CombinationType.SINGLE][1][v] == 3 else 0 for v in range(15)]]
-    sum_pairs = sum(d[CombinationType.PAIR][2])
-    d[CombinationType.FULLHOUSE] = [None, None, None, None, None, [d[CombinationType.TRIPLE][3][v] * (sum_pairs - d[CombinationType.PAIR][2][v]) for v in range(15)]]
-
-    # Treppen   0     1     2     3    4    5    6    7    8    9   10   11   12   13   14 Karten
-    d[CombinationType.STAIR] = [None, None, None, None, [], None, [], None, [], None, [], None, [], None, []]
-    for k in range(7, 1, -1):  # Anzahl Paare in der Treppe (7 bis 2)
-        n = k * 2  # Anzahl Karten in der Treppe
-        # Wert         0  1  2  3  4  5  6  7  8  9 10 11 12 13 14
-        d[CombinationType.STAIR][n] = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        for v in range(k + 1, 15):  # höchstes Paar (=Wert der Kombination)
-            phoenix_available = phoenix
-            counter = 1
-            for i in range(k):  # Anzahl Paare
-                if phoenix_available and not d[CombinationType.PAIR][2][v - i]:
-                    phoenix_available = False  # Fehlendes Paar mit Einzelkarte und Phönix ersetzen
-                    counter *= d[CombinationType.SINGLE][1][v - i]
-                else:
-                    counter *= d[CombinationType.PAIR][2][v - i]
-            if phoenix_available and counter:
-                counter_without_phoenix = counter  # Anzahl Kombinationsmöglichkeiten ohne Phönix
-                for i in range(k):  # jede Karte mit dem Phönix ersetzten und zu den Möglichkeiten dazuzählen
-                    if d[CombinationType.PAIR][2][v - i]:
-                        counter += int(counter_without_phoenix / d[CombinationType.PAIR][2][v - i]) * 2
-            d[CombinationType.STAIR][n][v] = counter
-
-    # Paare, Drillinge und Fullhouse mit Phönix
-    if phoenix:
-        counter = 0
-        sum_singles = sum(d[CombinationType.SINGLE][1][:16])  # Anzahl Karten ohne Phönix
-        for v in range(2, 15):
-            # fullhouse = # Drilling + Einzelkarte + Phönix
-            # Ausnahmeregel: Der Drilling darf nicht vom gleichen Wert sein wie die Einzelkarte.
-            d[CombinationType.FULLHOUSE][5][v] += d[CombinationType.TRIPLE][3][v] * (sum_singles - d[CombinationType.SINGLE][1][v])
-            # fullhouse = Paar1 + Phönix + Paar2
-            # Bedingung: Paar1 ist größer als Paar2 (man würde immer den Phönix zum höherwertigen Pärchen sortieren)
-            d[CombinationType.FULLHOUSE][5][v] += d[CombinationType.PAIR][2][v] * counter
-            counter += d[CombinationType.PAIR][2][v]
-            d[CombinationType.TRIPLE][3][v] += d[CombinationType.PAIR][2][v]  # Drilling mit Phönix = Paar + Phönix
-            d[CombinationType.PAIR][2][v] += d[CombinationType.SINGLE][1][v]  # Paar mit Phönix = Einzelkarte + Phönix
-
-    # Bomben     0     1     2     3    4   5   6   7   8   9  10  11  12  13 Karten
-    d[CombinationType.BOMB] = [None, None, None, None, [], [], [], [], [], [], [], [], [], []]
-    # 4er-Bomben
-    d[CombinationType.BOMB][4] = [1 if d[CombinationType.SINGLE][1][v] == 4 else 0 for v in range(15)]
-    # Straßenbomben
-    for n in range(5, 14):  # Anzahl Karten in der Straßenbombe (5 bis 13)
-        bombs0 = [4 if v > n else 0 for v in range(15)]  # Werte 0 bis As
-        for v in range(n + 1, 15):  # höchste Karte (=Wert der Kombination)
-            for color in range(4):
-                for i in range(n):
-                    if c[color][v - i] == 0:
-                        bombs0[v] -= 1
-                        break
-        d[CombinationType.BOMB][n] = bombs0
-
-    # Straßen    0     1     2     3     4    5   6   7   8   9  10  11  12  13  14 Karten
-    d[CombinationType.STREET] = [None, None, None, None, None, [], [], [], [], [], [], [], [], [], []]
-    for n in range(14, 4, -1):  # Anzahl Karten in der Straße (14 bis 5)
-        # Wert        0  1  2  3  4  5  6  7  8  9 10 11 12 13 14
-        d[CombinationType.STREET][n] = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        for v in range(n, 15):  # höchste Karte (=Wert der Kombination)
-            phoenix_available = phoenix
-            counter = 1
-            for i in range(n):
-                if phoenix_available and not d[CombinationType.SINGLE][1][v - i] and (i < n - 1 or v == 14):
-                    phoenix_available = False  # Lücke mit Phönix ersetzten (nur nicht ganz hinten, wenn vorne noch Platz wäre)
-                else:
-                    counter *= d[CombinationType.SINGLE][1][v - i]
-            if phoenix_available and counter:
-                counter_without_phoenix = counter  # Anzahl Kombinationsmöglichkeiten ohne Phönix
-                for i in range(n):  # jede Karte mit dem Phönix ersetzten und zu den Möglichkeiten dazuzählen
-                    counter += int(counter_without_phoenix / d[CombinationType.SINGLE][1][v - i])
-            d[CombinationType.STREET][n][v] = counter
-
-    # Wir wissen nun die Anzahl der Kombinationen, die mit allen Handkarten der anderen Spieler zusammen gebildet
-    # werden können. Als Nächstes berechnen wir die statistische Häufigkeit der Kombinationen auf der Hand der
-    # einzelnen Mitspieler.
-
-    # Wahrscheinlichkeit, dass die Mitspieler eine Kombination mit bestimmter Länge auf der Hand haben.
-    # p[0][n]+p[1][n]+p[2][n]+p[3][n] ist die Wahrscheinlichkeit, dass irgendein Mitspieler eine Kombi mit n Karten hat.
-    # 1 - (p[0][n]+p[1][n]+p[2][n]+p[3][n]) ist die Wahrscheinlichkeit, das kein Mitspieler eine Kombi mit n Karten hat.
-    #       0  1  2  3  4  5  6  7  8  9 10 11 12 13 14  Kombi-Länge n
-    p: List[Optional[List[float]]] = [
-        [None, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],  # Spieler 0
-        [None, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],  # Spieler 1
-        [None, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],  # Spieler 2
-        [None, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]   # Spieler 3
-    ]
-    if sum_c > 0:
-        for i in range(4):  # Mitspieler
-            if i == player:
-                p[i] = None  # die Wahrscheinlichkeiten für die eigenen Handkarten werden nicht benötigt
-                continue
-            h = number_of_cards[i]  # Anzahl der Handkarten des Mitspielers i
-            p[i][1] = h / sum_c  # Wahrscheinlichkeit, dass der Spieler i eine bestimmte Einzelkarte hat
-            for j in range(1, min(sum_c, 14)):
-                # nachdem eine Karte gezogen wurde, gibt es noch h - 1 Handkarten und sum_c - 1 ungespielte Karten
-                p[i][j + 1] = p[i][j] * (h - j) / (sum_c - j)
-
-    # Indizes der Mitspieler
-    opp_right = (player + 1) % 4
-    partner = (player + 2) % 4
-    opp_left = (player + 3) % 4
-
-    # Wahrscheinlichkeit, dass ein Mitspieler eine Bombe werfen kann
-    p_bomb_opp = sum([sum(d[CombinationType.BOMB][n]) * (p[opp_right][n] + p[opp_left][n]) for n in range(4, 14)])
-    p_bomb_par = sum([sum(d[CombinationType.BOMB][n]) * p[partner][n] for n in range(4, 14)])
-
-    # Anzahl der möglichen Bomben auf den Händen der Mitspieler gesamt
-    sum_bombs = sum([sum(d[CombinationType.BOMB][n]) for n in range(4, 14)])
-
-    # Uns interessieren nur die Kombinationen der Mitspieler, die zu den eigenen Handkarten passen...
-    statistic = {}
-    for cards, combination in combis:
-        t, n, v = combination
-
-        if t == CombinationType.BOMB:
-            # Anzahl Kombis der Mitspieler insgesamt, die hier betrachtet werden (das sind alle Kombis bis auf Hund)
-            sum_combis = \
-                sum([sum(d[k][m]) for k in range(1, 7) for m in range(1, len(d[k])) if d[k][m] is not None]) \
-                + (0 if combination == (CombinationType.SINGLE, 1, 0) else sum_bombs)
-
-            # lo = normale Kombis + kürzere Bomben + niederwertige Bomben gleicher Länge
-            lo_opp = \
-                sum([sum(d[k][m]) * (p[opp_right][m] + p[opp_left][m]) for k in range(1, 7) for m in range(1, len(d[k])) if d[k][m] is not None]) \
-                + sum([sum(d[CombinationType.BOMB][m]) * (p[opp_right][m] + p[opp_left][m]) for m in range(4, n)]) \
-                + sum(d[CombinationType.BOMB][n][:v]) * (p[opp_right][n] + p[opp_left][n])
-            lo_par = \
-                sum([sum(d[k][m]) * p[partner][m] for k in range(1, 7) for m in range(1, len(d[k])) if d[k][m] is not None]) \
-                + sum([sum(d[CombinationType.BOMB][m]) * p[partner][m] for m in range(4, n)]) \
-                + sum(d[CombinationType.BOMB][n][:v]) * p[partner][n]
-
-            # hi = längere Bomben + höherwertige Bomben gleicher Länge
-            hi_opp = \
-                sum([sum(d[CombinationType.BOMB][m]) * (p[opp_right][m] + p[opp_left][m]) for m in range(n + 1, 14)]) \
-                + sum(d[CombinationType.BOMB][n][v + 1:]) * (p[opp_right][n] + p[opp_left][n])
-            hi_par = \
-                sum([sum(d[CombinationType.BOMB][m]) * p[partner][m] for m in range(n + 1, 14)]) \
-                + sum(d[CombinationType.BOMB][n][v + 1:]) * p[partner][n]
-
-            # eq = gleichwertige Bomben gleicher Länge
-            eq_opp = d[CombinationType.BOMB][n][v] * (p[opp_right][n] + p[opp_left][n])
-            eq_par = d[CombinationType.BOMB][n][v] * p[partner][n]
-
-        else:  # keine Bombe
-            # Anzahl Kombis der Mitspieler, die betrachtet werden (Kombis gleicher Länge (aber kein Hund) plus Bomben)
-            sum_combis = sum(d[t][n][1:]) + (0 if combination == (CombinationType.SINGLE, 1, 0) else sum_bombs)
-
-            # niederwertige Kombis (ohne Hund) - wie viele Kombinationen gibt es, die ich mit combi stechen kann?
-            a = 1
-            b = 15 if combination == (CombinationType.SINGLE, 1, 16) else v
-            w = sum(d[t][n][a:b]) + (d[t][n][16] if combination == (CombinationType.SINGLE, 1, 15) else 0)  # Anzahl niederwertiger Kombinationen
-            lo_opp = (p[opp_right][n] + p[opp_left][n]) * w
-            lo_par = p[partner][n] * w
-
-            # höherwertige Kombis
-            a = trick_combination[2] + 1 if combination == (CombinationType.SINGLE, 1, 16) else v + 1
-            b = 16
-            w = sum(d[t][n][a:b]) + (d[t][n][16] if t == CombinationType.SINGLE and combination != (CombinationType.SINGLE, 1, 15) else 0)  # höherwertige (ohne Bomben)
-            hi_opp = (p[opp_right][n] + p[opp_left][n]) * w + (0 if combination == (CombinationType.SINGLE, 1, 0) else p_bomb_opp)
-            hi_par = p[partner][n] * w + (0 if combination == (CombinationType.SINGLE, 1, 0) else p_bomb_par)
-
-            # gleichwertige Kombis
-            w = d[t][n][v]  # Anzahl gleichwertiger Kombinationen
-            eq_opp = (p[opp_right][n] + p[opp_left][n]) * w
-            eq_par = p[partner][n] * w
-
-        # Beim Phönix wurden die spielbaren Kombinationen (außer Drache) doppelt gerechnet. Das liegt daran, dass der
-        # Wert vom ausgelegten Stich abhängt.
-        w = sum_combis + (sum(d[t][n][(trick_combination[2] + 1):15]) if combination == (CombinationType.SINGLE, 1, 16) else 0)
-        if w:
-            # normalisieren
-            lo_opp /= w
-            lo_par /= w
-            hi_opp /= w
-            hi_par /= w
-            eq_opp /= w
-            eq_par /= w
-            # if combination == (CombinationType.SINGLE, 1, 16):
-            #     assert eq_opp == 0
-            #     assert eq_par == 0
-            #     w = lo_opp + lo_par + hi_opp + hi_par
-            #     if w > 1:
-            #         lo_opp /= w
-            #         lo_par /= w
-            #         hi_opp /= w
-            #         hi_par /= w
-            # assert 0 <= lo_opp + hi_opp + eq_opp <= 1
-            # assert 0 <= lo_par + hi_par + eq_par <= 1
-            assert 0 <= lo_opp + lo_par + hi_opp + hi_par + eq_opp + eq_par <= 1.000001, lo_opp + lo_par + hi_opp + hi_par + eq_opp + eq_par
-        else:
-            assert lo_opp + lo_par + hi_opp + hi_par + eq_opp + eq_par == 0
 
-        statistic.setdefault(tuple(cards), (lo_opp, lo_par, hi_opp, hi_par, eq_opp, eq_par))
+def _combination_key(combination: Combination, trick_combination: Combination) -> tuple:
+    """
+    Ermittelt den Schlüssel einer Kombination für den Cache (nur beim Phönix hängt das Ergebnis vom Stich ab).
+
+    :param combination: Die Kombination (Typ, Länge, Rang).
+    :param trick_combination: Kombination des aktuellen Stichs.
+    :return: Die Kombination und der Rang, über dem die Karten liegen müssen, um den Phönix zu überstechen (sonst 0).
+    """
+    if combination == (CombinationType.SINGLE, 1, 16):
+        # Rang, über dem die Karten liegen müssen, um den Phönix zu überstechen (im Anspiel 1.5)
+        v = min(trick_combination[2], 15) if trick_combination[0] == CombinationType.SINGLE and trick_combination[2] >= 1 else 1
+        return combination, v
+    return combination, 0
+
+
+def _get_cache_entry(number_of_cards: List[int], roles: Tuple[int, int, int], others_mask: int) -> Dict[tuple, tuple]:
+    """
+    Gibt den Eintrag des Caches für die Kartenverteilung zurück und markiert ihn als zuletzt verwendet.
+
+    Die Statistik hängt (neben dem Stich) nur von der Anzahl der Handkarten der Mitspieler und von deren Karten ab, aber
+    nicht von den Farben. Gleichwertige Kartenverteilungen teilen sich daher einen Eintrag, auch über die Spieler hinweg.
+
+    Gibt es noch keinen Eintrag, wird er angelegt; ist der Cache dann zu groß, wird der am längsten nicht verwendete
+    Eintrag verdrängt. Mit config.STATISTIC_CACHE_SIZE == 0 wird nichts gespeichert.
+
+    :param number_of_cards: Anzahl der Handkarten aller Spieler.
+    :param roles: Rechter Gegner, linker Gegner und Partner.
+    :param others_mask: Karten, die die Mitspieler haben können.
+    :return: Die Werte je Kombination (siehe _combination_key()); das Dictionary wird vom Aufrufer gefüllt.
+    """
+    key = tuple(number_of_cards[i] for i in roles), canonicalize_suits(others_mask)[0]
+    entry = _statistic_cache.get(key)
+    if entry is not None:
+        _statistic_cache.move_to_end(key)
+        return entry
+    entry = {}
+    if config.STATISTIC_CACHE_SIZE > 0:
+        _statistic_cache[key] = entry
+        while len(_statistic_cache) > config.STATISTIC_CACHE_SIZE:
+            _statistic_cache.popitem(last=False)
+    return entry
+
+
+def _create_context(others: Cards, number_of_cards: List[int], roles: Tuple[int, int, int]) -> Optional[_Context]:
+    """
+    Legt die Zwischenergebnisse für die Karten der Mitspieler an.
+
+    :param others: Karten, die die Mitspieler haben können.
+    :param number_of_cards: Anzahl der Handkarten aller Spieler.
+    :param roles: Rechter Gegner, linker Gegner und Partner.
+    :return: Die Zwischenergebnisse (None, wenn die Mitspieler keine Karten haben).
+    """
+    ks = sorted({number_of_cards[i] for i in roles if number_of_cards[i] > 0})
+    if not ks:
+        return None
+    return _Context(cards=others, h=np.array(ranks_to_vector(others), dtype=np.int64), ks=ks, K=max(ks))
+
+
+def _calc_values(ctx: Optional[_Context], number_of_cards: List[int], roles: Tuple[int, int, int], keys: List[tuple]) -> Dict[tuple, tuple]:
+    """
+    Berechnet die Werte der Kombinationen (lo, hi und eq je rechter Gegner, linker Gegner, Gegner und Partner).
+
+    Die Werte für "mindestens ein Gegner" werden aus den Werten der beiden Gegner gebildet, als wären deren Hände
+    unabhängig voneinander (siehe Moduldokumentation).
+
+    :param ctx: Karten der Mitspieler und Zwischenergebnisse (None, wenn die Mitspieler keine Karten haben).
+    :param number_of_cards: Anzahl der Handkarten aller Spieler.
+    :param roles: Rechter Gegner, linker Gegner und Partner.
+    :param keys: Die Kombinationen (siehe _combination_key()).
+    :return: Je Kombination die Werte in der Reihenfolge von STATISTIC_DTYPE.
+    """
+    if ctx:
+        ctx.compute_messages(_needed_automata(ctx, [combination for combination, _ in keys]))
+    result = {}
+    for combination, v in keys:
+        probs = _calc_probs(ctx, combination, v) if ctx else np.zeros((3, 0))
+        values = []
+        for kind in range(3):
+            right, left, par = (probs[kind, ctx.ks.index(number_of_cards[i])] if number_of_cards[i] > 0 else 0.0 for i in roles)
+            values += [right, left, 1 - (1 - right) * (1 - left), par]
+        result[(combination, v)] = tuple(float(value) for value in values)
+    return result
+
+
+def _to_dict(combis: List[Tuple[Cards, Combination]], array: np.ndarray) -> Dict[Cards, Tuple[float, float, float, float, float, float]]:
+    """
+    Wandelt die Statistik in ein Dictionary um.
+
+    :param combis: Die Kombinationen [(Karten, (Typ, Länge, Rang)), ...].
+    :param array: Die Statistik (siehe calc_statistic_array()).
+    :return: Je Karten der Kombination die Werte (lo_opp, lo_par, hi_opp, hi_par, eq_opp, eq_par).
+    """
+    statistic = {}
+    for (cards, _), row in zip(combis, array.tolist()):
+        statistic.setdefault(tuple(cards), (row[2], row[3], row[6], row[7], row[10], row[11]))
     return statistic
 
 
-# Dies wird die neue Version, die die Wahrscheinlichkeitsberechnung korrekt durchführt (unter der Verwendung der Hilfstabelle).
-#
-# p_lo # Wahrscheinlichkeit, dass die Kombination angespielt wird.
-# p_hi # Wahrscheinlichkeit, dass die Kombination überstochen wird.
-# p_an = 1 - p_hi # Wahrscheinlichkeit, mit der Kombination das Anspielrecht zu erhalten.
-# v_ausspielen = (1 - p_lo) * p_an # Bewertung der Kombination, die ausgespielt wird.
-# v_bleibt = p_lo * p_an # Bewertung der Kombination, die auf der Hand bleibt.
-#
-# Berechnet die Wahrscheinlichkeit, dass die Mitspieler eine bestimmte Kombination anspielen bzw. überstechen können
-#
-# Für jede eigene Kombination liefert die Funktion folgende Werte:
-# p_lo: Wahrscheinlichkeit, dass ein Mitspieler diese Kombination (mit niederem Rang) anspielen kann
-# p_hi_opp_right: Wahrscheinlichkeit, dass der rechte Gegner diese Kombination überstechen kann
-# p_hi_opp_left: Wahrscheinlichkeit, dass der linke Gegner diese Kombination überstechen kann
-# p_hi_par: Wahrscheinlichkeit, dass der Partner diese Kombination überstechen kann
-#
-# player: Meine Spielernummer (zw. 0 und 3)
-# hand: Eigene Handkarten
-# combis: Zu bewertende Kombinationen (gebildet aus den Handkarten) [(Karten, (Typ, Länge, Rang)), ...]
-# number_of_cards: Anzahl der Handkarten aller Spieler.
-# trick_combination: Kombination (Typ, Länge, Rang) des aktuellen Stichs ((0,0,0), falls kein Stich liegt)
-# unplayed_cards: Noch nicht gespielte Karten (inkl. eigene Handkarten)
-def calc_statistic2(player: int, hand: Cards, combis: List[Tuple[Cards, Combination]], number_of_cards: List[int], _trick_combination: Combination, unplayed_cards: Cards) -> Dict[Cards, Tuple[float, float, float, float]]:
+def calc_statistic_array(player: int, hand: Cards, combis: List[Tuple[Cards, Combination]], number_of_cards: List[int], trick_combination: Combination, unplayed_cards: Cards) -> np.ndarray:
+    """
+    Berechnet die Wahrscheinlichkeiten, dass die Mitspieler die eigenen Kombinationen anspielen bzw. überstechen können.
+
+    Die Mitspieler erhalten ihre Handkarten zufällig aus den ungespielten Karten, die nicht auf der eigenen Hand sind.
+    Für jede Kombination wird berechnet, mit welcher Wahrscheinlichkeit der Mitspieler eine niedrigere Kombination
+    gleichen Typs und gleicher Länge hat (lo, wie p_low), die Kombination überstechen kann (hi, wie p_high, inklusive
+    Bomben) und eine gleichwertige Kombination hat (eq).
+
+    :param player: Meine Spielernummer (zw. 0 und 3).
+    :param hand: Eigene Handkarten.
+    :param combis: Zu bewertende Kombinationen (gebildet aus den Handkarten) [(Karten, (Typ, Länge, Rang)), ...].
+    :param number_of_cards: Anzahl der Handkarten aller Spieler.
+    :param trick_combination: Kombination (Typ, Länge, Rang) des aktuellen Stichs ((0,0,0), falls kein Stich liegt).
+    :param unplayed_cards: Noch nicht gespielte Karten (inkl. eigene Handkarten).
+    :return: Je Kombination ein Eintrag vom Typ STATISTIC_DTYPE (in der Reihenfolge von combis).
+    """
     assert hand  # wir haben bereits bzw. noch Karten auf der Hand
     assert len(hand) == number_of_cards[player]
+    number_of_cards = _normalize_number_of_cards(player, hand, number_of_cards, unplayed_cards)
+    roles = (player + 1) % 4, (player + 3) % 4, (player + 2) % 4  # rechter Gegner, linker Gegner, Partner
 
-    if sum(number_of_cards) != len(unplayed_cards):
-        # die Karten werden gerade verteilt bzw. es wird geschupft!
-        m = len(hand)
-        assert m in (0, 8, 11, 14)
-        assert len(unplayed_cards) == 56
-        n = int((56 - m) / 3)
-        number_of_cards = [n, n, n, n]  # wir tun so, als wenn alle Karten bereits verteilt sind
-        number_of_cards[player] = m
+    others_mask = cards_to_mask(unplayed_cards) & ~cards_to_mask(hand)
+    cache = _get_cache_entry(number_of_cards, roles, others_mask)
 
-    # Indizes der Mitspieler
-    _opp_right = (player + 1) % 4
-    _partner = (player + 2) % 4
-    _opp_left = (player + 3) % 4
+    keys = [_combination_key(combination, trick_combination) for _, combination in combis]
+    missing = [combination_key for combination_key in dict.fromkeys(keys) if combination_key not in cache]
+    if missing:
+        cache.update(_calc_values(_create_context(mask_to_cards(others_mask), number_of_cards, roles), number_of_cards, roles, missing))
+    return np.array([cache[combination_key] for combination_key in keys], dtype=STATISTIC_DTYPE)
 
-    # Uns interessieren nur die Kombinationen der Mitspieler, die zu den eigenen Handkarten passen...
-    statistic = {}
-    for cards, combination in combis:
-        _t, _n, _v = combination
-        p_lo = 0.0
-        p_hi = 0.0
 
-        # BAUSTELLE
+def calc_statistic(player: int, hand: Cards, combis: List[Tuple[Cards, Combination]], number_of_cards: List[int], trick_combination: Combination, unplayed_cards: Cards) -> Dict[Cards, Tuple[float, float, float, float, float, float]]:
+    """
+    Berechnet die Statistik wie calc_statistic_array(), aber als Dictionary.
+
+    :return: Je Karten der Kombination die Werte (lo_opp, lo_par, hi_opp, hi_par, eq_opp, eq_par).
+    """
+    return _to_dict(combis, calc_statistic_array(player, hand, combis, number_of_cards, trick_combination, unplayed_cards))
 
-        statistic[tuple(cards)] = p_lo, p_hi
 
-    return statistic
+class Statistic:
+    """
+    Statistik der eigenen Kombinationen, die im Laufe einer Runde schrittweise aktualisiert wird.
+
+    Spielt ein Mitspieler Karten aus, verlassen sie den Pool der Mitspieler. Dann werden nur die Nachrichten für die
+    betroffenen Ränge neu berechnet (aufwärts ab dem niedrigsten, abwärts ab dem höchsten geänderten Rang), und nur für
+    die Automaten, die für die Kombinationen auf der Hand noch benötigt werden. Spielt man selbst Karten aus, ändert sich
+    am Pool nichts, und die bereits berechneten Werte der übrigen Kombinationen bleiben erhalten. Werte werden erst
+    berechnet, wenn sie abgefragt werden.
+
+    Die Werte werden im selben Cache abgelegt wie bei calc_statistic_array(). Stehen sie dort bereits (z.B. von einem
+    anderen Spieler mit gleichwertiger Kartenverteilung), werden die Nachrichten gar nicht erst aktualisiert.
+
+    Das Ergebnis ist dasselbe wie bei calc_statistic_array().
+    """
+    def __init__(self, player: int):
+        """
+        :param player: Meine Spielernummer (zw. 0 und 3).
+        """
+        self.player = player
+        self._roles = (player + 1) % 4, (player + 3) % 4, (player + 2) % 4  # rechter Gegner, linker Gegner, Partner
+        self._others_mask: Optional[int] = None  # Karten, die die Mitspieler haben können
+        self._number_of_cards: List[int] = []  # Anzahl der Handkarten aller Spieler
+        self._combinations: List[Combination] = []  # Kombinationen, die zuletzt abgefragt wurden
+        self._ctx: Optional[_Context] = None  # Zwischenergebnisse
+        self._removed = 0  # Karten, die den Pool verlassen haben, aber noch nicht aus den Zwischenergebnissen entfernt sind
+        self._values: Dict[tuple, tuple] = {}  # Werte je Kombination (Eintrag im Cache, siehe _get_cache_entry())
+
+    def update(self, hand: Cards, number_of_cards: List[int], unplayed_cards: Cards):
+        """
+        Aktualisiert die Statistik, nachdem Karten gespielt wurden.
+
+        Kommen Karten zum Pool der Mitspieler hinzu (z.B. in einer neuen Runde oder beim Schupfen) oder haben die
+        Mitspieler mehr Handkarten als zuvor, wird die Statistik neu berechnet.
+
+        :param hand: Eigene Handkarten.
+        :param number_of_cards: Anzahl der Handkarten aller Spieler.
+        :param unplayed_cards: Noch nicht gespielte Karten (inkl. eigene Handkarten).
+        """
+        assert hand  # wir haben bereits bzw. noch Karten auf der Hand
+        assert len(hand) == number_of_cards[self.player]
+        number_of_cards = _normalize_number_of_cards(self.player, hand, number_of_cards, unplayed_cards)
+        others_mask = cards_to_mask(unplayed_cards) & ~cards_to_mask(hand)
+        if others_mask == self._others_mask and all(number_of_cards[i] == self._number_of_cards[i] for i in self._roles):
+            self._number_of_cards = number_of_cards
+            return  # nur die eigenen Handkarten haben sich geändert
+        ks = sorted({number_of_cards[i] for i in self._roles if number_of_cards[i] > 0})
+        if self._ctx and ks and others_mask & ~self._others_mask == 0 and max(ks) <= self._ctx.K:
+            self._removed |= self._others_mask & ~others_mask  # wird erst entfernt, wenn Werte berechnet werden müssen
+        else:
+            self._ctx = _create_context(mask_to_cards(others_mask), number_of_cards, self._roles)
+            self._removed = 0
+        self._others_mask = others_mask
+        self._number_of_cards = number_of_cards
+        self._values = _get_cache_entry(number_of_cards, self._roles, others_mask)
+
+    def get_array(self, combis: List[Tuple[Cards, Combination]], trick_combination: Combination) -> np.ndarray:
+        """
+        Gibt die Statistik der Kombinationen zurück (siehe calc_statistic_array()).
+
+        :param combis: Zu bewertende Kombinationen (gebildet aus den Handkarten) [(Karten, (Typ, Länge, Rang)), ...].
+        :param trick_combination: Kombination (Typ, Länge, Rang) des aktuellen Stichs ((0,0,0), falls kein Stich liegt).
+        :return: Je Kombination ein Eintrag vom Typ STATISTIC_DTYPE (in der Reihenfolge von combis).
+        """
+        assert self._others_mask is not None, "update() wurde noch nicht aufgerufen"
+        self._combinations = [combination for _, combination in combis]
+        keys = [_combination_key(combination, trick_combination) for _, combination in combis]
+        missing = [combination_key for combination_key in dict.fromkeys(keys) if combination_key not in self._values]
+        if missing:
+            if self._removed:
+                ks = sorted({self._number_of_cards[i] for i in self._roles if self._number_of_cards[i] > 0})
+                self._ctx.remove_cards(mask_to_cards(self._removed), ks, _needed_automata(self._ctx, self._combinations))
+                self._removed = 0
+            self._values.update(_calc_values(self._ctx, self._number_of_cards, self._roles, missing))
+        return np.array([self._values[combination_key] for combination_key in keys], dtype=STATISTIC_DTYPE)
+
+    def get_dict(self, combis: List[Tuple[Cards, Combination]], trick_combination: Combination) -> Dict[Cards, Tuple[float, float, float, float, float, float]]:
+        """
+        Gibt die Statistik der Kombinationen als Dictionary zurück (siehe calc_statistic()).
+
+        :param combis: Zu bewertende Kombinationen (gebildet aus den Handkarten) [(Karten, (Typ, Länge, Rang)), ...].
+        :param trick_combination: Kombination (Typ, Länge, Rang) des aktuellen Stichs ((0,0,0), falls kein Stich liegt).
+        :return: Je Karten der Kombination die Werte (lo_opp, lo_par, hi_opp, hi_par, eq_opp, eq_par).
+        """
+        return _to_dict(combis, self.get_array(combis, trick_combination))
 
 
 def partition_quality(partition: Partition, action_space: List[Tuple[Cards, Combination]], statistic: dict) -> float:
@@ -403,4 +899,4 @@ def partition_quality(partition: Partition, action_space: List[Tuple[Cards, Comb
     # - Falls n_lo gleich 0 ist, ist n_hi auch 0, denn wir sind wir dran und spielen die letzte Kombi. q ist in diesem Fall 1.
     # - Falls nur n_hi gleich 0 ist, haben wir nur noch eine Kombi, sind aber nicht dran. Dann ist nur der lo-Anteil relevant.
     q = ((total_lo / n_lo) if n_lo else 1) - ((total_hi / n_hi) if n_hi else 0)
-    return q
\ No newline at end of file
+    return q
@@ -3,15 +3,18 @@ Dieses Modul erstellt und verwaltet Tabellen, die für die Berechnung der Wahrsc
 benötigt werden.
 """
 
-__all__ = "load_table_lo",
+__all__ = "load_table_lo", "load_pattern_table_lo", "get_table_keys_lo", "preload_tables_lo",
 
 import gzip
 import itertools
 import pickle
-from os import path, mkdir
+from os import path, makedirs, getpid, replace
 from src import config
+from src.common.logger import logger
 from src.lib.combinations import stringify_type, CombinationType
+from src.lib.prob.patterns import build_pattern_table, PatternTable, save_pattern_tables, map_pattern_tables, verify_pattern_table
 from time import time
+from typing import List, Tuple
 
 # -------------------------------------------------------------------------
 # Generierung von Hilfstabellen für die Wahrscheinlichkeitsberechnung p_low
@@ -24,7 +27,7 @@ from time import time
 def get_filename_lo(t: CombinationType, m: int = None):
     folder = path.join(config.DATA_PATH, "prob")
     if not path.exists(folder):
-        mkdir(folder)
+        makedirs(folder, exist_ok=True)
     name = stringify_type(t, m)
     file = path.join(folder, f"{name}_lo.pkl.gz")
     return file
@@ -42,10 +45,12 @@ def save_table_lo(t: CombinationType, m: int, table: list):
     #     # noinspection PyTypeChecker
     #     pickle.dump(table, fp)
 
-    # komprimiert speichern
-    with gzip.open(file, "wb") as fp:
+    # komprimiert speichern (unter temporärem Namen, damit ein abgebrochener Lauf keine halbe Datei hinterlässt)
+    tmp = f"{file}.{getpid()}.tmp"
+    with gzip.open(tmp, "wb") as fp:
         # noinspection PyTypeChecker
         pickle.dump(table, fp)
+    replace(tmp, file)
 
     # # zusätzlich als Textdatei speichern (nützlich zum Debuggen)
     # with open(file[:-7] + ".txt", "w") as datei:
@@ -55,7 +60,7 @@ def save_table_lo(t: CombinationType, m: int, table: list):
     #             for case in cases:
     #                 datei.write(f"{r}, {case}\n")
 
-    print(f"Hilfstabelle in {path.basename(file)} gespeichert", )
+    logger.info(f"Hilfstabelle in {path.basename(file)} gespeichert")
 
 
 # Cache für die geladenen Hilfstabellen
@@ -71,21 +76,97 @@ def load_table_lo(t: CombinationType, m: int) -> list:
     if m in _cache[t]:
         return _cache[t][m]
 
-    print(f"Lade Hilfstabelle {stringify_type(t, m)}... ", end="")
     time_start = time()
     file = get_filename_lo(t, m)
     if not path.exists(file):
+        logger.warning(f"Hilfstabelle {stringify_type(t, m)} nicht vorhanden, wird erzeugt")
         create_table_lo(t, m)
     #with open(file, 'rb') as fp:  # aus unkomprimierte Datei
     #    table = pickle.load(fp)
     with gzip.open(file, 'rb') as fp:  # aus komprimierte Datei
         table = pickle.load(fp)
     _cache[t][m] = table
-    print(f"({(time() - time_start) * 1000:.3f} ms) ok")
+    logger.debug(f"Hilfstabelle {stringify_type(t, m)} geladen ({(time() - time_start) * 1000:.3f} ms)")
 
     return table
 
 
+# Gibt den Dateinamen für die Hilfstabelle im Binärformat (siehe patterns.py)
+#
+# t: Typ der Kombination
+# m: Länge der Kombination (nur für Treppe, Straße und Bombe relevant)
+def get_binary_filename_lo(t: CombinationType, m: int = None):
+    return get_filename_lo(t, m)[:-7] + ".tpat"
+
+
+# Cache für die Hilfstabellen als NumPy-Arrays
+_pattern_cache = {t: {} for t in range(1, 8)}
+
+
+# Lädt die Hilfstabelle als NumPy-Arrays (je eine PatternTable ohne und mit Phönix)
+#
+# Die Muster beginnen alle beim niedrigsten Rang (Mahjong bzw. 2) und werden rechts bis zum Rang 15 aufgefüllt.
+#
+# Die Arrays werden schreibgeschützt aus der Binärdatei eingeblendet (mmap), so dass sich alle Prozesse dieselben
+# Speicherseiten teilen. Fehlt die Binärdatei, wird sie einmalig aus der Pickle-Datei erzeugt.
+#
+# t: Typ der Kombination
+# m: Länge der Kombination
+def load_pattern_table_lo(t: CombinationType, m: int) -> Tuple[PatternTable, PatternTable]:
+    if m in _pattern_cache[t]:
+        return _pattern_cache[t][m]
+
+    time_start = time()
+    file = get_binary_filename_lo(t, m)
+    if not path.exists(file):
+        table = load_table_lo(t, m)
+        r_start = 1 if t in [CombinationType.SINGLE, CombinationType.STREET] else 2
+        tables = tuple(build_pattern_table(table[pho], offset=r_start, width=16 - r_start, align_right=False) for pho in range(2))
+        save_pattern_tables(file, tables)
+        logger.info(f"Hilfstabelle in {path.basename(file)} gespeichert")
+    _pattern_cache[t][m] = map_pattern_tables(file)
+    logger.debug(f"Hilfstabelle {stringify_type(t, m)} eingeblendet ({(time() - time_start) * 1000:.3f} ms)")
+    return _pattern_cache[t][m]
+
+
+# Listet Typ und Länge aller Hilfstabellen
+def get_table_keys_lo() -> List[Tuple[CombinationType, int]]:
+    keys = []
+    t: CombinationType
+    for t in range(1, 7):  # für Bomben werden keine Hilfstabellen benötigt (s. create_table_lo())
+        if t == CombinationType.STAIR:
+            keys += [(t, m) for m in range(4, 15, 2)]
+        elif t == CombinationType.STREET:
+            keys += [(t, m) for m in range(5, 15)]
+        else:
+            keys.append((t, t))
+    return keys
+
+
+# Blendet alle vorhandenen Hilfstabellen ein (fehlende Binärdateien werden aus den Pickle-Dateien erzeugt)
+#
+# Tabellen, für die weder eine Binär- noch eine Pickle-Datei existiert, werden nicht erzeugt, sondern als fehlend gemeldet.
+#
+# verify: Wenn True, wird jede Tabelle auf Konsistenz geprüft (dabei werden alle Seiten gelesen)
+# return: Typ und Länge der fehlenden bzw. fehlerhaften Tabellen
+def preload_tables_lo(verify: bool = False) -> List[Tuple[CombinationType, int]]:
+    failed = []
+    for t, m in get_table_keys_lo():
+        if not path.exists(get_binary_filename_lo(t, m)) and not path.exists(get_filename_lo(t, m)):
+            logger.warning(f"Hilfstabelle {stringify_type(t, m)} fehlt")
+            failed.append((t, m))
+            continue
+        try:
+            tables = load_pattern_table_lo(t, m)
+        except ValueError as e:
+            logger.error(e)
+            failed.append((t, m))
+            continue
+        if verify and not all(verify_pattern_table(table) for table in tables):
+            logger.error(f"Hilfstabelle {stringify_type(t, m)} ist fehlerhaft")
+            failed.append((t, m))
+    return failed
+
 # Ermittelt den niedrigsten Rang der gegebenen Kombination im Datensatz, der überstochen werden kann
 #
 # Datensatz bei einer Einzelkarte, r = 8:
@@ -357,23 +438,9 @@ def create_table_lo(t: CombinationType, m: int):
 
 # Erzeugt alle Hilfstabellen, falls nicht vorhanden
 def create_tables_lo():
-    t: CombinationType
-    for t in range(1, 7):  # von Einzelkarte bis Straße (Bomben werden nicht benötigt)
-        if t == CombinationType.STAIR:
-            for m in range(4, 15, 2):
-                file = get_filename_lo(t, m)
-                if not path.exists(file):
-                    create_table_lo(t, m)
-        elif t == CombinationType.STREET:
-            for m in range(5, 15):
-                file = get_filename_lo(t, m)
-                if not path.exists(file):
-                    create_table_lo(t, m)
-        else:
-            assert t in [CombinationType.SINGLE, CombinationType.PAIR, CombinationType.TRIPLE, CombinationType.FULLHOUSE]
-            file = get_filename_lo(t)
-            if not path.exists(file):
-                create_table_lo(t, t)
+    for t, m in get_table_keys_lo():
+        if not path.exists(get_filename_lo(t, m)):
+            create_table_lo(t, m)
 
 
 if __name__ == '__main__':  # pragma: no cover
@@ -0,0 +1,398 @@
+"""
+Dieses Modul definiert einen prozessübergreifenden Cache für die Kombinationen und Partitionen einer Hand.
+
+Der Cache liegt in einer Datei, die per mmap in jeden Prozess eingeblendet wird (z.B. in die Worker der Arena). Er ist
+als satzassoziative Hash-Tabelle mit fester Anzahl Einträge organisiert; ist ein Satz voll, wird der am längsten nicht
+verwendete Eintrag überschrieben (LRU innerhalb des Satzes).
+
+Schlüssel ist die Hand in farbkanonischer Form (siehe canonicalize_suits()), so dass sich Hände, die sich nur in den
+Farben unterscheiden, einen Eintrag teilen. Gespeichert werden die Kombinationen der kanonischen Hand; beim Lesen
+werden die Farben auf die tatsächliche Hand zurückübertragen. Die Reihenfolge der Kombinationen ist damit für alle
+diese Hände gleich (sie kann bei gleichwertigen Kombinationen von build_combinations() abweichen).
+
+Ein Eintrag hat eine feste Größe. Von den Partitionen werden nur so viele gespeichert (die kürzesten zuerst), wie in
+einen Eintrag passen; die Liste gilt dann als unvollständig. Nutzdaten, die dennoch zu groß sind, werden nicht
+gespeichert und gezählt (siehe SharedCache.rejected).
+
+Die Einträge werden ohne Sperre geschrieben. Jeder Eintrag trägt eine CRC32-Prüfsumme über Schlüssel und Nutzdaten;
+ein gerade überschriebener (und daher inkonsistenter) Eintrag wird beim Lesen als Fehltreffer gewertet. Aus demselben
+Grund sind die Zähler bei mehreren Prozessen nur Näherungswerte.
+"""
+
+__all__ = "SharedCache", "attach_shared_cache", "detach_shared_cache", "get_shared_cache",
+
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+import numpy as np
+from src import config
+from src.common.logger import logger
+from src.lib.cards import deck, canonicalize_suits, invert_suit_permutation, permute_cards, mask_to_cards, Cards, CardSet, SuitPermutation
+from src.lib.combinations import build_combinations, get_combination_id, get_combination_by_id, Combination
+from src.lib.partitions import take_partitions, Partition
+from typing import List, Tuple, Optional
+
+# ------------------------------------------------------
+# Serialisierung
+# ------------------------------------------------------
+
+_card_index = {card: i for i, card in enumerate(deck)}
+
+
+def _encode_combinations(combis: List[Tuple[Cards, Combination]]) -> bytes:
+    """
+    Serialisiert Kombinationen (je Kombination die ID und die Kartenindizes in der ursprünglichen Reihenfolge).
+
+    :param combis: Die Kombinationen [(Karten, (Typ, Länge, Rang)), ...].
+    :return: Die Kombinationen als Bytes.
+    """
+    data = bytearray()
+    for cards, combination in combis:
+        data.append(get_combination_id(combination))
+        data.extend(_card_index[card] for card in cards)
+    return bytes(data)
+
+
+def _decode_combinations(data: bytes) -> List[Tuple[Cards, Combination]]:
+    """
+    Stellt die Kombinationen aus den Bytes wieder her (Umkehrung von _encode_combinations()).
+
+    Die Länge der Kombination entspricht der Anzahl ihrer Karten.
+
+    :param data: Die serialisierten Kombinationen.
+    :return: Die Kombinationen [(Karten, (Typ, Länge, Rang)), ...].
+    """
+    combis = []
+    i = 0
+    while i < len(data):
+        combination = get_combination_by_id(data[i])
+        n = combination[1]
+        combis.append(([deck[j] for j in data[i + 1:i + 1 + n]], combination))
+        i += 1 + n
+    return combis
+
+
+def _encode_partitions(partitions: List[Partition], combis: List[Tuple[Cards, Combination]], completed: bool, limit: int) -> Tuple[bytes, int]:
+    """
+    Serialisiert Partitionen als Indizes in die Liste der Kombinationen (je Partition die Länge, dann die Indizes).
+
+    Es werden nur so viele Partitionen (in der gegebenen Reihenfolge) serialisiert, wie in `limit` Bytes passen. Fehlen
+    dadurch Partitionen, gilt die Liste als unvollständig.
+
+    :param partitions: Die Partitionen.
+    :param combis: Die Kombinationen, aus denen die Partitionen gebildet wurden.
+    :param completed: True, wenn alle Partitionen berechnet wurden (Ergebnis von take_partitions()).
+    :param limit: Maximale Größe der Nutzdaten in Bytes.
+    :return: Die Partitionen als Bytes und die Anzahl der serialisierten Partitionen.
+    """
+    index = {id(combi): i for i, combi in enumerate(combis)}
+    values = [int(completed)]
+    count = 0
+    for partition in partitions:
+        if 2 * (len(values) + 1 + len(partition)) > limit:
+            values[0] = 0  # unvollständig
+            break
+        values.append(len(partition))
+        values.extend(index[id(combi)] for combi in partition)
+        count += 1
+    return np.array(values, dtype=np.uint16).tobytes(), count
+
+
+def _decode_partitions(data: bytes, combis: List[Tuple[Cards, Combination]]) -> Tuple[List[Partition], bool]:
+    """
+    Stellt die Partitionen aus den Bytes wieder her (Umkehrung von _encode_partitions()).
+
+    :param data: Die serialisierten Partitionen.
+    :param combis: Die Kombinationen, aus denen die Partitionen gebildet wurden.
+    :return: Die Partitionen und True, wenn alle Partitionen berechnet wurden.
+    """
+    values = np.frombuffer(data, dtype=np.uint16).tolist()
+    partitions = []
+    i = 1
+    while i < len(values):
+        n = values[i]
+        partitions.append([combis[j] for j in values[i + 1:i + 1 + n]])
+        i += 1 + n
+    return partitions, bool(values[0])
+
+
+# ------------------------------------------------------
+# Cache
+# ------------------------------------------------------
+
+_MAGIC = b"TCHC"
+_VERSION = 2
+
+# Dateikopf: Magic, Version, Anzahl Sätze, Einträge je Satz, Größe eines Eintrags, Zeitstempel, Treffer, Fehltreffer,
+# abgewiesene Nutzdaten
+_HEADER = struct.Struct("<4sIIIIIQQQ")
+_HEADER_SIZE = 64
+_OFFSET_TICK = 20
+_OFFSET_HITS = 24
+_OFFSET_MISSES = 32
+_OFFSET_REJECTED = 40
+
+# Eintrag: CRC32, Länge der Nutzdaten, Zeitstempel, Art, Zusatzschlüssel, Handkarten (danach folgen die Nutzdaten)
+_ENTRY = struct.Struct("<IIIHxxIQ")
+
+_KIND_COMBINATIONS = 1
+_KIND_PARTITIONS = 2
+
+
+class SharedCache:
+    """
+    Prozessübergreifender Cache für die Kombinationen und Partitionen einer Hand (siehe Moduldokumentation).
+
+    Schlüssel ist die farbkanonische Hand als Bitmaske. Partitionen werden zusätzlich mit der Prüfsumme der
+    (farbkanonischen) Kombinationen verschlüsselt, aus denen sie gebildet wurden.
+    """
+
+    def __init__(self, path: str):
+        """
+        Blendet eine bestehende Cache-Datei ein (siehe create()).
+
+        :param path: Pfad der Cache-Datei.
+        :raises ValueError: Wenn die Datei keine gültige Cache-Datei ist.
+        """
+        self._path = path
+        with open(path, "r+b") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0)
+        magic, version, sets, ways, entry_size, _tick, _hits, _misses, _rejected = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._mm.close()
+            raise ValueError(f"Ungültige Cache-Datei: {path}")
+        self._sets = sets
+        self._ways = ways
+        self._entry_size = entry_size
+
+    @classmethod
+    def create(cls, path: Optional[str] = None, size: int = config.ARENA_SHARED_CACHE_SIZE, ways: int = 4, entry_size: int = 8192) -> "SharedCache":
+        """
+        Legt eine neue (leere) Cache-Datei an und blendet sie ein.
+
+        :param path: (Optional) Pfad der Cache-Datei. Wenn None, wird eine temporäre Datei angelegt.
+        :param size: (Optional) Maximale Anzahl Einträge (wird auf ein Vielfaches von ways aufgerundet).
+        :param ways: (Optional) Anzahl Einträge je Satz.
+        :param entry_size: (Optional) Größe eines Eintrags in Bytes (begrenzt die Anzahl gespeicherter Partitionen; größere Kombinationslisten werden nicht gespeichert).
+        :return: Der Cache.
+        """
+        assert size > 0 and ways > 0 and entry_size > _ENTRY.size
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="tichu_cache_", suffix=".bin")
+            os.close(fd)
+        sets = (size + ways - 1) // ways
+        with open(path, "wb") as fp:
+            fp.truncate(_HEADER_SIZE + sets * ways * entry_size)
+            fp.write(_HEADER.pack(_MAGIC, _VERSION, sets, ways, entry_size, 0, 0, 0, 0))
+        return cls(path)
+
+    def close(self, unlink: bool = False):
+        """
+        Blendet die Cache-Datei aus.
+
+        :param unlink: (Optional) Wenn True, wird die Datei gelöscht.
+        """
+        self._mm.close()
+        if unlink and os.path.exists(self._path):
+            os.remove(self._path)
+
+    @property
+    def path(self) -> str:
+        """Pfad der Cache-Datei"""
+        return self._path
+
+    @property
+    def size(self) -> int:
+        """Maximale Anzahl Einträge"""
+        return self._sets * self._ways
+
+    @property
+    def hits(self) -> int:
+        """Anzahl Treffer (über alle Prozesse; Näherungswert)"""
+        return struct.unpack_from("<Q", self._mm, _OFFSET_HITS)[0]
+
+    @property
+    def misses(self) -> int:
+        """Anzahl Fehltreffer (über alle Prozesse; Näherungswert)"""
+        return struct.unpack_from("<Q", self._mm, _OFFSET_MISSES)[0]
+
+    @property
+    def rejected(self) -> int:
+        """Anzahl Nutzdaten, die zu groß für einen Eintrag waren (über alle Prozesse; Näherungswert)"""
+        return struct.unpack_from("<Q", self._mm, _OFFSET_REJECTED)[0]
+
+    @property
+    def hit_rate(self) -> float:
+        """Trefferquote (0, wenn noch nicht gelesen wurde)"""
+        hits, misses = self.hits, self.misses
+        return hits / (hits + misses) if hits + misses else 0.
+
+    def _count(self, offset: int):
+        """Erhöht den Zähler an der gegebenen Position im Dateikopf (Treffer, Fehltreffer oder abgewiesene Nutzdaten)."""
+        struct.pack_into("<Q", self._mm, offset, struct.unpack_from("<Q", self._mm, offset)[0] + 1)
+
+    def _tick(self) -> int:
+        """Erhöht den gemeinsamen Zeitstempel und gibt ihn zurück (für die LRU-Verdrängung)."""
+        tick = (struct.unpack_from("<I", self._mm, _OFFSET_TICK)[0] + 1) & 0xFFFFFFFF
+        struct.pack_into("<I", self._mm, _OFFSET_TICK, tick)
+        return tick
+
+    def _offsets(self, kind: int, aux: int, mask: CardSet) -> range:
+        """Ermittelt die Positionen der Einträge des Satzes, in den der Schlüssel fällt."""
+        h = (mask * 0x9E3779B97F4A7C15 ^ aux * 0xC2B2AE3D27D4EB4F ^ kind) & 0xFFFFFFFFFFFFFFFF
+        start = _HEADER_SIZE + (h % self._sets) * self._ways * self._entry_size
+        return range(start, start + self._ways * self._entry_size, self._entry_size)
+
+    def get(self, kind: int, aux: int, mask: CardSet) -> Optional[bytes]:
+        """
+        Liest die Nutzdaten zu einem Schlüssel.
+
+        :param kind: Art des Eintrags.
+        :param aux: Zusatzschlüssel (32 Bit).
+        :param mask: Die Handkarten als Bitmaske.
+        :return: Die Nutzdaten oder None, wenn der Schlüssel nicht (oder nicht konsistent) gespeichert ist.
+        """
+        mm = self._mm
+        for offset in self._offsets(kind, aux, mask):
+            crc, length, _tick, kind_, aux_, mask_ = _ENTRY.unpack_from(mm, offset)
+            if length and kind_ == kind and aux_ == aux and mask_ == mask:
+                data = mm[offset + _ENTRY.size:offset + _ENTRY.size + length]
+                if zlib.crc32(data, zlib.crc32(mm[offset + 12:offset + _ENTRY.size])) == crc:
+                    struct.pack_into("<I", mm, offset + 8, self._tick())
+                    self._count(_OFFSET_HITS)
+                    return data
+        self._count(_OFFSET_MISSES)
+        return None
+
+    def put(self, kind: int, aux: int, mask: CardSet, data: bytes) -> bool:
+        """
+        Speichert die Nutzdaten zu einem Schlüssel.
+
+        Ist der Satz voll, wird der am längsten nicht verwendete Eintrag verdrängt.
+
+        :param kind: Art des Eintrags.
+        :param aux: Zusatzschlüssel (32 Bit).
+        :param mask: Die Handkarten als Bitmaske.
+        :param data: Die Nutzdaten.
+        :return: False, wenn die Nutzdaten zu groß für einen Eintrag sind (wird gezählt, siehe rejected).
+        """
+        if not data or len(data) > self._entry_size - _ENTRY.size:
+            self._count(_OFFSET_REJECTED)
+            logger.debug(f"Nutzdaten zu groß für den Cache ({len(data)} Bytes, Art {kind})")
+            return False
+        mm = self._mm
+        victim = None
+        oldest = None
+        for offset in self._offsets(kind, aux, mask):
+            _crc, length, tick, kind_, aux_, mask_ = _ENTRY.unpack_from(mm, offset)
+            if not length or (kind_ == kind and aux_ == aux and mask_ == mask):
+                victim = offset
+                break
+            if oldest is None or tick < oldest:
+                victim, oldest = offset, tick
+        struct.pack_into("<I", mm, victim + 4, 0)  # Eintrag ungültig machen, bevor er überschrieben wird
+        mm[victim + _ENTRY.size:victim + _ENTRY.size + len(data)] = data
+        _ENTRY.pack_into(mm, victim, 0, len(data), self._tick(), kind, aux, mask)
+        crc = zlib.crc32(data, zlib.crc32(mm[victim + 12:victim + _ENTRY.size]))
+        struct.pack_into("<I", mm, victim, crc)
+        return True
+
+    def build_combinations(self, hand: Cards, mask: CardSet) -> List[Tuple[Cards, Combination]]:
+        """
+        Liefert die Kombinationsmöglichkeiten der Hand aus dem Cache bzw. berechnet und speichert sie (siehe build_combinations()).
+
+        Berechnet werden die Kombinationen der farbkanonischen Hand; die Farben werden anschließend auf die Hand
+        zurückübertragen (siehe Moduldokumentation).
+
+        :param hand: Die Handkarten (absteigend sortiert).
+        :param mask: Die Handkarten als Bitmaske.
+        :return: Die Kombinationsmöglichkeiten [(Karten, (Typ, Länge, Rang)), ...] (die besten zuerst).
+        """
+        canonical, _, perm = canonicalize_suits(mask)
+        data = self.get(_KIND_COMBINATIONS, 0, canonical)
+        if data is not None:
+            combis = _decode_combinations(data)
+        else:
+            combis = build_combinations(mask_to_cards(canonical, descending=True))
+            self.put(_KIND_COMBINATIONS, 0, canonical, _encode_combinations(combis))
+        return _permute_combinations(combis, invert_suit_permutation(perm))
+
+    def build_partitions(self, partitions: List[Partition], combis: List[Tuple[Cards, Combination]], mask: CardSet) -> bool:
+        """
+        Liefert die Partitionen der Hand aus dem Cache bzw. berechnet und speichert sie (siehe take_partitions()).
+
+        Es werden höchstens so viele Partitionen geliefert, wie in einen Eintrag passen (auch wenn sie neu berechnet
+        werden, damit das Ergebnis nicht davon abhängt, ob der Eintrag vorhanden ist).
+
+        :param partitions: Diese Liste wird mit den Partitionen gefüllt.
+        :param combis: Die Kombinationsmöglichkeiten der Handkarten (sortiert, die besten zuerst!).
+        :param mask: Die Handkarten als Bitmaske.
+        :return: True, wenn alle möglichen Partitionen geliefert wurden, sonst False.
+        """
+        canonical, _, perm = canonicalize_suits(mask)
+        aux = zlib.crc32(_encode_combinations(_permute_combinations(combis, perm)))
+        data = self.get(_KIND_PARTITIONS, aux, canonical)
+        if data is not None:
+            cached, completed = _decode_partitions(data, combis)
+            partitions.extend(cached)
+            return completed
+        start = len(partitions)
+        completed = take_partitions(partitions, combis=combis)
+        data, count = _encode_partitions(partitions[start:], combis, completed, self._entry_size - _ENTRY.size)
+        if start + count < len(partitions):
+            del partitions[start + count:]
+            completed = False
+        self.put(_KIND_PARTITIONS, aux, canonical, data)
+        return completed
+
+
+def _permute_combinations(combis: List[Tuple[Cards, Combination]], perm: SuitPermutation) -> List[Tuple[Cards, Combination]]:
+    """
+    Vertauscht die Farben der Karten in den Kombinationen (die Reihenfolge bleibt erhalten).
+
+    :param combis: Die Kombinationen [(Karten, (Typ, Länge, Rang)), ...].
+    :param perm: Die Farbpermutation.
+    :return: Die Kombinationen mit vertauschten Farben (bei der identischen Permutation die gegebene Liste).
+    """
+    if perm == (0, 1, 2, 3, 4):
+        return combis
+    return [(permute_cards(cards, perm), combination) for cards, combination in combis]
+
+
+# ------------------------------------------------------
+# Cache des Prozesses
+# ------------------------------------------------------
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def attach_shared_cache(path: str):
+    """
+    Blendet die Cache-Datei in den aktuellen Prozess ein (z.B. als Initializer eines Prozess-Pools).
+
+    :param path: Pfad der Cache-Datei.
+    """
+    global _shared_cache
+    detach_shared_cache()
+    _shared_cache = SharedCache(path)
+
+
+def detach_shared_cache():
+    """
+    Blendet die Cache-Datei des aktuellen Prozesses aus (die Datei bleibt erhalten).
+    """
+    global _shared_cache
+    if _shared_cache is not None:
+        _shared_cache.close()
+        _shared_cache = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """
+    Liefert den Cache des aktuellen Prozesses.
+
+    :return: Der Cache oder None, wenn keine Cache-Datei eingeblendet ist.
+    """
+    return _shared_cache
@@ -7,8 +7,8 @@ from src import config
 from src.common.rand import Random
 from src.lib.cards import Card, Cards, CARD_DOG, CARD_MAH
 from src.lib.combinations import Combination, build_action_space, remove_combinations, CombinationType
-from src.lib.partitions import filter_playable_combinations, filter_playable_partitions
-from src.lib.prob.statistic import calc_statistic, partition_quality
+from src.lib.partitions import build_shortest_partitions, build_shortest_playable_partitions, filter_playable_combinations, build_best_partition
+from src.lib.prob.statistic import Statistic, partition_quality
 from src.players.agent import Agent
 from src.private_state import PrivateState
 from src.public_state import PublicState
@@ -34,15 +34,13 @@ class HeuristicAgent(Agent):
         super().__init__(name, session_id=session_id)
         self._quality = grand_quality
         self._random = Random(seed)  # Zufallsgenerator, geeignet für Multiprocessing
-        self.__statistic: dict = {}  # Statistische Häufigkeit der Kombinationen (wird erst berechnet, wenn benötigt)
-        self._statistic_key: tuple = ()  # Spieler und Anzahl von Handkarten, für die die Statistik berechnet wurde
+        self.__statistic: Optional[Statistic] = None  # Statistische Häufigkeit der Kombinationen (wird im Laufe der Runde aktualisiert)
 
     def reset_round(self):  # pragma: no cover
         """
         Setzt spielrundenspezifische Werte zurück.
         """
-        self.__statistic = {}
-        self._statistic_key = ()
+        self.__statistic = None
 
     def _statistic(self, pub: PublicState, priv: PrivateState) -> dict:
         """
@@ -52,12 +50,11 @@ class HeuristicAgent(Agent):
         :param priv: Der private Spielzustand.
         :return: Ergebnis von calc_statistic() (Package src.lib.prob.statistic)
         """
-        n = pub.count_hand_cards
-        key = (priv.player_index, priv.hand_cards, n)
-        if self._statistic_key != key:
-            self._statistic_key = key
-            self.__statistic = calc_statistic(priv.player_index, priv.hand_cards, priv.combinations, n, pub.trick_combination, pub.unplayed_cards)
-        return self.__statistic
+        if self.__statistic is None or self.__statistic.player != priv.player_index:
+            self.__statistic = Statistic(priv.player_index)
+        # Die Statistik wird nur um die Karten aktualisiert, die seit dem letzten Aufruf gespielt wurden.
+        self.__statistic.update(priv.hand_cards, pub.count_hand_cards, pub.unplayed_cards)
+        return self.__statistic.get_dict(priv.combinations, pub.trick_combination)
 
     # ------------------------------------------------------
     # Entscheidungen
@@ -99,16 +96,14 @@ class HeuristicAgent(Agent):
 
             # Falls wir am Zug sind, spielbare Kombinationen ermitteln (ansonsten ist der Aktionsraum leer)
             my_turn = self.pub.current_turn_index == self.priv.player_index or (self.pub.start_player_index == -1 and CARD_MAH in self.priv.hand_cards)
-            action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value) if my_turn else []
-
-            # Kürzeste Partition bewerten
-            len_min = 14
-            shortest_partition = []
-            for partition in self.priv.partitions:
-                n = len(partition)
-                if len_min >= n:
-                    len_min = n
-                    shortest_partition = partition
+            action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value, index=self.priv.action_space_index) if my_turn else []
+
+            # Kürzeste Partition bewerten (wird direkt ermittelt, ohne alle Partitionen aufzulisten). Wie bisher wird die
+            # letzte kürzeste Partition in der Reihenfolge von build_partitions() genommen; diese Reihenfolge entspricht
+            # der lexikographischen Ordnung nach den Indizes der Kombinationen.
+            combis = self.priv.combinations
+            position = {id(combi): i for i, combi in enumerate(combis)}
+            shortest_partition = max(build_shortest_partitions(combis), key=lambda partition: [position[id(combi)] for combi in partition])
             q = partition_quality(shortest_partition, action_space if my_turn else [], self._statistic(self.pub, self.priv))
             announcement = q >= min_q
         return announcement
@@ -214,7 +209,7 @@ class HeuristicAgent(Agent):
             return self._random.choice(action_space)
 
         # mögliche Kombinationen (inklusive Passen; wenn Passen erlaubt ist, steht Passen an erster Stelle)
-        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value)
+        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value, index=self.priv.action_space_index)
 
         action_len = len(action_space)
         assert action_len > 0
@@ -257,35 +252,30 @@ class HeuristicAgent(Agent):
             if figure == (CombinationType.SINGLE, 1, 0):
                 return cards, figure  # wir spielen den Hund so bald wie möglich
 
-        # Wir suchen zuerst die Partitionen, die mindestens eine spielbare Kombination haben. Damit vermeiden wir das
-        # Passen, neben aber in Kauf, dass evtl. eine Bombe, Straße, Fullhouse oder Treppe auseinandergerissen wird.
-        partitions = filter_playable_partitions(self.priv.partitions, action_space)
-        if not partitions:  # pragma: no cover
-            # Anscheinend hat build_partitions() alle Partitionen abgeschnitten, die jetzt passen würden.
-            # Als Fallback bilden wir für jede gültige Aktion eine neue Partition, die neben der jeweiligen Aktion
-            # nur aus Einzel-Kombinationen besteht.
+        # Wir suchen unter den Partitionen, die mindestens eine spielbare Kombination haben, die kürzesten, da wir mit
+        # diesen vermutlich am schnellsten fertig werden. Damit vermeiden wir das Passen, nehmen aber in Kauf, dass evtl.
+        # eine Bombe, Straße, Fullhouse oder Treppe auseinandergerissen wird (eine Bombe bleibt meistens in der Auswahl;
+        # eine Straße könnte aber eine kürzere Partition bilden). Unter den kürzesten Partitionen wählen wir die mit der
+        # besten Güte, d.h., mit der wir statistisch gesehen am schnellsten fertig werden. Die Suche verwirft Zweige,
+        # die die bisher beste Partition nicht mehr übertreffen können, anstatt alle Partitionen zu bewerten.
+        # Gibt es nur eine kürzeste Partition, wird die Statistik hierfür nicht benötigt.
+        partitions = build_shortest_playable_partitions(self.priv.combinations, action_space, max_count=2)
+        if len(partitions) == 1:
+            best_partition = partitions[0]
+        elif partitions:
+            best_partition = build_best_partition(self.priv.combinations, action_space, self._statistic(self.pub, self.priv), max_nodes=config.HEURISTIC_PARTITION_SEARCH_NODES)
+        else:
+            best_partition = None
+        if best_partition is None:  # pragma: no cover
+            # Keine Kombination der Handkarten ist spielbar (sollte nicht vorkommen, da es mehr als eine Aktion gibt).
+            # Als Fallback bilden wir für jede gültige Aktion eine Partition, die neben der jeweiligen Aktion nur aus
+            # Einzel-Kombinationen besteht, und nehmen die kürzeste.
+            partitions = []
             for cards, figure in action_space:
-                singles = [([card], (CombinationType.SINGLE, 1, card[0])) for card in self.priv.hand_cards if card not in cards]
-                partitions.append([(cards, figure)] + singles)
-
-        # Als Zweites suchen wir die kürzeste Partition, da wir mit dieser vermutlich am schnellsten fertig werden.
-        # Eine Bombe bleibt meistens in der Auswahl. Eine Straße könnte aber eine kürzere Partition bilden, sodass
-        # in diesem Fall die Bombe auseinandergerissen wird.
-        len_min = 14
-        for partition in partitions:
-            len_min = min(len_min, len(partition))
-        partitions = [partition for partition in partitions if len(partition) == len_min]
-
-        # Als Drittes suchen wir die Partitionen mit der besten Güte, d.h., mit der wir statistisch gesehen am
-        # schnellsten fertig werden.
-        best_partition = partitions[0]
-        if len(partitions) > 1:
-            q_max = -math.inf
-            for partition in partitions:
-                q = partition_quality(partition, action_space, self._statistic(self.pub, self.priv))
-                if q_max < q:
-                    q_max = q
-                    best_partition = partition
+                if figure[0] != CombinationType.PASS:
+                    singles = [([card], (CombinationType.SINGLE, 1, card[0])) for card in self.priv.hand_cards if card not in cards]
+                    partitions.append([(cards, figure)] + singles)
+            best_partition = min(partitions, key=len)
 
         # Wir haben uns für eine Partition entschieden! Jetzt schauen wir uns die spielbaren Kombinationen in dieser
         # Partition genauer an.
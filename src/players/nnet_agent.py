@@ -49,7 +49,7 @@ class NNetAgent(Agent):
         # wird hierher übergeben. Nehmen wir an, es ist in `self.pub.action_space`
         # oder wird direkt als Parameter übergeben.
         # Für das Beispiel nehmen wir an, der `action_space` verfügbar ist.
-        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value)
+        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value, index=self.priv.action_space_index)
 
         best_action = None
         highest_score = -1.0  # Initialisiere mit einem sehr niedrigen Wert
@@ -152,7 +152,7 @@ class Peer(Player):
 
         # Kombination der Bombe ermitteln. Ist sie spielbar?
         combination = None
-        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, wish_value=0)
+        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, wish_value=0, index=self.priv.action_space_index)
         for playable_cards, playable_combination in action_space:
             if playable_combination[0] == CombinationType.BOMB and set(cards) == set(playable_cards):
                 combination = playable_combination
@@ -432,7 +432,7 @@ class Peer(Player):
                 if response_data is None:
                     # Heuristik: Die schwächste spielbare Kombination wird ausgewählt. Passen ist die letzte Option.
                     logger.debug(f"[{self._name}] Fallback-Antwort")
-                    action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value)
+                    action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value, index=self.priv.action_space_index)
                     return action_space[-1]
 
                 # Hat die Antwort die erwartete Struktur?
@@ -473,7 +473,7 @@ class Peer(Player):
                 action_space = build_action_space(combinations, self.pub.trick_combination, wish_value=0)
             else:
                 # Der Client ist am Zug.
-                action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value)
+                action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value, index=self.priv.action_space_index)
             for playable_cards, playable_combination in action_space:
                 if set(cards) == set(playable_cards):
                     combination = playable_combination
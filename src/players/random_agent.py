@@ -4,7 +4,7 @@ Definiert einen Zufallsagenten.
 
 from src.common.rand import Random
 from src.lib.cards import Card, Cards
-from src.lib.combinations import Combination, build_action_space, CombinationType
+from src.lib.combinations import Combination, build_action_space, build_bombs, build_responses, CombinationType
 from src.players.agent import Agent
 from typing import Optional, Tuple
 
@@ -69,12 +69,16 @@ class RandomAgent(Agent):
             # der Spieler ist nicht am Zug, daher kann er nur eine Bombe werfen
             if not self._random.choice([True, False], [1, 2]):  # einmal Ja, zweimal Nein
                 return [], (CombinationType.PASS, 0, 0)
-            combinations = [combi for combi in self.priv.combinations if combi[1][0] == CombinationType.BOMB]
+            combinations = build_bombs(self.priv.hand_cards)
             action_space = build_action_space(combinations, self.pub.trick_combination, wish_value=0)
             return self._random.choice(action_space)
 
         # alle spielbaren Kombinationen (inklusive Passen; wenn Passen erlaubt ist, steht Passen an erster Stelle)
-        action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value)
+        if self.pub.trick_combination[2] > 0:
+            # Stich liegt - nur die Kombinationen bilden, die den Stich überstechen können
+            action_space = build_responses(self.priv.hand_cards, self.pub.trick_combination, self.pub.wish_value)
+        else:
+            action_space = build_action_space(self.priv.combinations, self.pub.trick_combination, self.pub.wish_value, index=self.priv.action_space_index)
         return self._random.choice(action_space)
 
     async def wish(self) -> int:
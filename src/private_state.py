@@ -3,9 +3,10 @@ Definiert die Datenstruktur für den privaten Spielzustand eines Spielers.
 """
 
 from dataclasses import dataclass, field
-from src.lib.cards import Card, Cards
-from src.lib.combinations import build_combinations, Combination, CombinationType
-from src.lib.partitions import build_partitions, Partition
+from src.lib.cards import Card, Cards, CardSet, cards_to_mask, is_card_in_mask
+from src.lib.combinations import build_combinations, remove_combinations, build_action_space_index, contains_bomb, ActionSpaceIndex, Combination
+from src.lib.partitions import take_partitions, Partition, PartitionStore
+from src.lib.shared_cache import get_shared_cache
 from typing import List, Dict, Any, Tuple, Optional
 
 
@@ -26,6 +27,8 @@ class PrivateState:
 
     # --- Information über die aktuelle Runde ---
     _hand_cards: Cards = field(default_factory=list)
+    _hand_mask: CardSet = field(default=0, init=False, repr=False)  # wird aus den Handkarten abgeleitet
+    _has_bomb: bool = field(default=False, init=False, repr=False)  # dito
     given_schupf_cards: Optional[Tuple[Card, Card, Card]] = None
     received_schupf_cards: Optional[Tuple[Card, Card, Card]] = None
 
@@ -33,10 +36,15 @@ class PrivateState:
     _combination_cache: List[Tuple[Cards, Combination]] = field(default_factory=list, repr=False)  # Nur intern verwendet, daher repr=False
     _partition_cache: List[Partition] = field(default_factory=list, repr=False)
     _partitions_aborted: bool = field(default=True, repr=False)
+    _partition_store: Optional[PartitionStore] = field(default=None, repr=False)
+    _action_space_index: Optional[ActionSpaceIndex] = field(default=None, repr=False)
 
     def __post_init__(self):
         if not (0 <= self.player_index <= 3):
             raise ValueError(f"player_index muss zwischen 0 und 3 liegen, nicht {self.player_index}")
+        # abgeleitete Werte auch dann setzen, wenn die Handkarten direkt übergeben werden (z.B. mit dataclasses.replace())
+        self._hand_mask = cards_to_mask(self._hand_cards)
+        self._has_bomb = contains_bomb(self._hand_mask)
 
     def reset_round(self):
         """Status für eine neue Runde zurücksetzen."""
@@ -72,9 +80,44 @@ class PrivateState:
         # Karten absteigend sortieren
         self._hand_cards = value
         self._hand_cards.sort(reverse=True)
+        self._hand_mask = cards_to_mask(self._hand_cards)
+        self._has_bomb = contains_bomb(self._hand_mask)
         self._combination_cache = []
         self._partition_cache = []
         self._partitions_aborted = True
+        self._partition_store = None
+
+    def remove_hand_cards(self, cards: Cards):
+        """
+        Entfernt Karten aus der Hand (ausspielen oder abgeben) und aktualisiert die Caches inkrementell.
+
+        Durch das Entfernen von Karten fallen Kombinationen nur weg, neue entstehen nicht. Die verbleibenden
+        Kombinationen und Partitionen werden daher aus den Caches übernommen, anstatt sie neu zu berechnen (die
+        Partitionen über den invertierten Index des Partitionsspeichers). Wurde die Berechnung der Partitionen zuvor
+        abgebrochen, ist die Liste unvollständig und wird verworfen.
+
+        :param cards: Die Karten, die entfernt werden sollen (müssen auf der Hand sein).
+        """
+        mask = cards_to_mask(cards)
+        assert self._hand_mask & mask == mask, "Die Karten sind nicht auf der Hand."
+        self._hand_cards = [card for card in self._hand_cards if not is_card_in_mask(card, mask)]  # bleibt absteigend sortiert
+        self._hand_mask &= ~mask
+        if self._has_bomb:  # ohne Bombe kann durch Entfernen von Karten auch keine entstehen
+            self._has_bomb = contains_bomb(self._hand_mask)
+        if self._combination_cache:
+            self._combination_cache = remove_combinations(self._combination_cache, cards)
+        if self._partition_cache and not self._partitions_aborted:
+            self._partition_store.remove_cards(cards)
+            self._partition_cache = self._partition_store.partitions
+        else:
+            self._partition_cache = []
+            self._partitions_aborted = True
+            self._partition_store = None
+
+    @property
+    def hand_mask(self) -> CardSet:
+        """Die aktuellen Handkarten des Spielers als Bitmaske."""
+        return self._hand_mask
 
     @property
     def partner_index(self) -> int:
@@ -95,18 +138,43 @@ class PrivateState:
     def combinations(self) -> List[Tuple[Cards, Combination]]:
         """Kombinationsmöglichkeiten der Hand (zuerst die besten)"""
         if not self._combination_cache and self.hand_cards:
-            self._combination_cache = build_combinations(self.hand_cards)
+            cache = get_shared_cache()  # prozessübergreifender Cache (nur, wenn eingeblendet, z.B. in der Arena)
+            if cache is not None:
+                self._combination_cache = cache.build_combinations(self.hand_cards, self._hand_mask)
+            else:
+                self._combination_cache = build_combinations(self.hand_cards)
         return self._combination_cache
 
+    @property
+    def action_space_index(self) -> ActionSpaceIndex:
+        """Index über die Kombinationsmöglichkeiten der Hand (für build_action_space())"""
+        combis = self.combinations
+        if self._action_space_index is None or self._action_space_index.combis is not combis:
+            self._action_space_index = build_action_space_index(combis)
+        return self._action_space_index
+
     @property
     def partitions(self) -> List[Partition]:
-        """Mögliche Partitionen der Hand (zuerst die besten)"""
+        """Mögliche Partitionen der Hand (zuerst die kürzesten; höchstens config.PARTITIONS_MAXLEN, siehe take_partitions())"""
         if not self._partition_cache and self.hand_cards:
-            self._partitions_aborted = not build_partitions(self._partition_cache, combis=self.combinations, counter=len(self.hand_cards))
+            cache = get_shared_cache()
+            partitions = []
+            if cache is not None:
+                self._partitions_aborted = not cache.build_partitions(partitions, combis=self.combinations, mask=self._hand_mask)
+            else:
+                self._partitions_aborted = not take_partitions(partitions, combis=self.combinations)
+            self._partition_store = PartitionStore(partitions)
+            self._partition_cache = self._partition_store.partitions
         return self._partition_cache
 
+    @property
+    def partition_store(self) -> PartitionStore:
+        """Speicher mit invertiertem Index über die möglichen Partitionen der Hand (z.B. für filter_playable())"""
+        if self._partition_store is None and not self.partitions:  # keine Handkarten
+            self._partition_store = PartitionStore()
+        return self._partition_store
+
     @property
     def has_bomb(self) -> bool:
-        """True, wenn der Spieler eine Bombe hat"""
-        combis = self.combinations
-        return True if combis and combis[0][1][0] == CombinationType.BOMB else False
+        """True, wenn der Spieler eine Bombe hat (wird beim Setzen und Entfernen der Handkarten aktualisiert)"""
+        return self._has_bomb
@@ -3,7 +3,7 @@ Definiert die Datenstruktur für den öffentlichen Spielzustand.
 """
 
 from dataclasses import dataclass, field
-from src.lib.cards import Card, Cards, other_cards
+from src.lib.cards import Card, Cards, CardSet, MASK_DECK, cards_to_mask, mask_to_cards
 from src.lib.combinations import Combination, CombinationType
 from typing import List, Tuple, Dict, Any
 
@@ -33,6 +33,7 @@ class PublicState:
     :ivar start_player_index: Index des Spielers, der den Mahjong hat oder hatte (-1 == steht noch nicht fest; es wurde noch nicht geschupft).
     :ivar count_hand_cards: Anzahl der Handkarten pro Spieler.
     :ivar played_cards: Bereits gespielte Karten in der aktuellen Runde [Card, ...].
+    :ivar played_mask: Bereits gespielte Karten in der aktuellen Runde als Bitmaske (wird aus played_cards abgeleitet und zusammen damit fortgeschrieben).
     :ivar announcements: Tichu-Ansagen pro Spieler (0 == keine Ansage, 1 == einfaches Tichu, 2 == großes Tichu).
     :ivar wish_value: Der gewünschte Kartenwert (2 bis 14, -1 == noch kein Mahjong gespielt, 0 == ohne Wunsch oder bereits erfüllt).
     :ivar dragon_recipient: Index des Spielers, der den Drachen bekommen hat (-1 == noch niemand).
@@ -60,6 +61,7 @@ class PublicState:
     start_player_index: int = -1
     count_hand_cards: List[int] = field(default_factory=lambda: [0, 0, 0, 0])
     played_cards: Cards = field(default_factory=list)
+    played_mask: CardSet = field(default=0, init=False)  # wird aus den gespielten Karten abgeleitet
     announcements: List[int] = field(default_factory=lambda: [0, 0, 0, 0])
     wish_value: int = -1
     dragon_recipient: int = -1
@@ -89,6 +91,8 @@ class PublicState:
             raise ValueError("table_name darf nicht leer sein.")
         if len(self.player_names) != 4 or any(not name.strip() for name in self.player_names):
             raise ValueError(f"`player_names` muss 4 Namen auflisten.")
+        # abgeleiteten Wert auch dann setzen, wenn die gespielten Karten direkt übergeben werden (z.B. mit dataclasses.replace())
+        self.played_mask = cards_to_mask(self.played_cards)
 
     def reset_round(self):
         """Status für eine neue Runde zurücksetzen."""
@@ -96,6 +100,7 @@ class PublicState:
         self.start_player_index = -1
         self.count_hand_cards = [0, 0, 0, 0]
         self.played_cards = []
+        self.played_mask = 0
         self.announcements = [0, 0, 0, 0]
         self.wish_value = -1
         self.dragon_recipient = -1
@@ -131,6 +136,7 @@ class PublicState:
             "start_player_index": self.start_player_index,
             "count_hand_cards": self.count_hand_cards,
             "played_cards": self.played_cards,
+            "played_mask": self.played_mask,
             "announcements": self.announcements,
             "wish_value": self.wish_value,
             "dragon_recipient": self.dragon_recipient,
@@ -160,10 +166,15 @@ class PublicState:
         #return sum(1 for n in self.count_hand_cards if n > 0)
         return (self.count_hand_cards[0] > 0) + (self.count_hand_cards[1] > 0) + (self.count_hand_cards[2] > 0) + (self.count_hand_cards[3] > 0)
 
+    @property
+    def unplayed_mask(self) -> CardSet:
+        """Nicht gespielte Karten als Bitmaske."""
+        return MASK_DECK & ~self.played_mask
+
     @property
     def unplayed_cards(self) -> List[Card]:  # pragma: no cover
         """Nicht gespielte Karten (in aufsteigender Reihenfolge)."""
-        return other_cards(self.played_cards)
+        return mask_to_cards(MASK_DECK & ~self.played_mask)
 
     # @property
     # def is_round_over(self) -> bool:
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 # noinspection PyProtectedMember
 from src.lib.cards import _card_labels
@@ -129,6 +130,36 @@ def test_cards_to_vector_simple():
     assert h[(2-2)*4 + CardSuit.STAR + 1]
     assert h[55]
 
+# --- Tests für Bitmasken ---
+
+def test_cards_to_mask_and_back():
+    """Testet die Umwandlung von Karten in eine Bitmaske und zurück."""
+    hand = parse_cards("Ph Dr RA S2 Ma Hu")
+    mask = cards_to_mask(hand)
+    assert mask == MASK_PHO | MASK_DRA | (1 << 53) | (1 << 2) | MASK_MAH | MASK_DOG
+    assert mask_to_cards(mask) == sorted(hand)
+    assert mask_to_cards(mask, descending=True) == sorted(hand, reverse=True)
+    assert cards_to_mask([]) == 0
+    assert mask_to_cards(0) == []
+    assert mask_to_cards(MASK_DECK) == list(deck)
+
+def test_mask_operations():
+    """Testet Vereinigung, Differenz, Enthaltensein und Anzahl."""
+    a = cards_to_mask(parse_cards("S2 B2 G2"))
+    b = cards_to_mask(parse_cards("G2 R2"))
+    assert mask_to_cards(a | b) == parse_cards("S2 B2 G2 R2")
+    assert mask_to_cards(a & ~b) == parse_cards("S2 B2")
+    assert is_card_in_mask((2, CardSuit.JADE), a)
+    assert not is_card_in_mask((2, CardSuit.STAR), a)
+    assert count_cards_in_mask(a | b) == 4
+    assert count_cards_in_mask(MASK_DECK) == 56
+    assert a | b == MASK_RANKS[2]
+    assert card_to_mask(CARD_PHO) == MASK_PHO
+
+def test_parse_card_invalid_label():
+    """Testet das Parsen eines ungültigen Labels."""
+    with pytest.raises(ValueError):
+        parse_card("XX")
 
 # -------------------------------------------------------
 # Alte Tests (ursprünglich mit unittest geschrieben)
@@ -166,6 +197,28 @@ def test_cards_to_vector():
           1, 0]
     assert h3 == cards_to_vector([(2, CardSuit.SWORD), (15, CardSuit.SPECIAL)])
 
+def test_cards_and_ranks_to_vectors():
+    """Testet die Batch-Varianten mit Kartenlisten, Bitmasken und vorab angelegtem Ausgabepuffer."""
+    hands = [parse_cards("Hu SA BZ G5 R2"), parse_cards("Ma RA Ph"), [], parse_cards("S8 B8 G8 R8 Dr")]
+    expected_cards = np.array([cards_to_vector(hand) for hand in hands], dtype=np.uint8)
+    expected_ranks = np.array([ranks_to_vector(hand) for hand in hands], dtype=np.int8)
+    masks = [cards_to_mask(hand) for hand in hands]
+    masks_np = np.array(masks, dtype=np.uint64)
+    for batch in (hands, masks, masks_np, list(masks_np), masks_np.astype(">u8")):  # auch np.integer und Big-Endian
+        vectors = cards_to_vectors(batch)
+        assert vectors.dtype == np.uint8 and vectors.shape == (4, 56)
+        assert (vectors == expected_cards).all()
+        ranks = ranks_to_vectors(batch)
+        assert ranks.dtype == np.int8 and ranks.shape == (4, 17)
+        assert (ranks == expected_ranks).all()
+    out = np.ones((4, 56), dtype=np.uint8)
+    assert cards_to_vectors(masks, out=out) is out
+    assert (out == expected_cards).all()
+    out = np.ones((4, 17), dtype=np.int8)
+    assert ranks_to_vectors(masks, out=out) is out
+    assert (out == expected_ranks).all()
+    assert cards_to_vectors([]).shape == (0, 56)
+
 def test_is_wish_in2():
     assert is_wish_in(10, parse_cards("RA Ph BZ BZ RB SB")), "eine 10 ist unter den Karten"
     assert not is_wish_in(13, parse_cards("RA Ph BZ BZ RB SB")), "eine 13 ist nicht unter den Karten"
@@ -177,3 +230,24 @@ def test_sum_card_points2():
 
 def test_other_cards():
     assert other_cards([card for card in deck if card[0] != 14]) == [(14, 1), (14, 2), (14, 3), (14, 4)]
+
+def test_canonicalize_suits():
+    """Testet, dass alle farbvertauschten Varianten einer Hand dieselbe kanonische Form erhalten."""
+    hand = cards_to_mask(parse_cards("Ph RA RK RD RB RZ G9 G8 B8 S2 Ma"))
+    context = cards_to_mask(parse_cards("SA GA BA Dr SK"))
+    canonical_hand, canonical_context, perm = canonicalize_suits(hand, context)
+    assert perm[0] == 0
+    assert sorted(perm[1:]) == [1, 2, 3, 4]
+    assert permute_suits(hand, perm) == canonical_hand
+    assert permute_suits(context, perm) == canonical_context
+    assert permute_suits(canonical_hand, invert_suit_permutation(perm)) == hand
+    swapped = (0, 4, 3, 2, 1)
+    assert canonicalize_suits(permute_suits(hand, swapped), permute_suits(context, swapped))[:2] == (canonical_hand, canonical_context)
+    assert cards_to_mask(permute_cards(parse_cards("RA G9 Ph"), perm)) == permute_suits(cards_to_mask(parse_cards("RA G9 Ph")), perm)
+
+def test_canonicalize_suits_color_bomb():
+    """Die Farbe einer Farbbombe wird vertauscht, die Bombe bleibt erhalten."""
+    hand = cards_to_mask(parse_cards("S9 S8 S7 S6 S5"))
+    canonical_hand, _, perm = canonicalize_suits(hand)
+    assert canonical_hand == cards_to_mask(permute_cards(parse_cards("S9 S8 S7 S6 S5"), perm))
+    assert mask_to_cards(canonical_hand) == [(v, CardSuit(perm[CardSuit.SWORD])) for v in range(5, 10)]
@@ -116,6 +116,20 @@ def test_build_combinations_bomb():
     combis = build_combinations(hand)
     assert find_combination(parse_cards("S5 G5 B5 R5"), combis) == (CombinationType.BOMB, 4, 5)
 
+def test_build_combinations_subset_of_hand():
+    """Testet, dass nur Kombinationen aus den Handkarten gebildet werden (Auswahl aus dem Kombinationsuniversum)."""
+    hand = parse_cards("Ph SA GA RK BK GK S9 B9 G3 Ma Hu")
+    hand_mask = cards_to_mask(hand)
+    combis = build_combinations(hand)
+    for cards, combination in combis:
+        assert cards_to_mask(cards) & ~hand_mask == 0
+    assert find_combination(parse_cards("SA GA RK BK GK"), combis) == (CombinationType.FULLHOUSE, 5, 13)
+    assert find_combination(parse_cards("SA GA Ph"), combis) == (CombinationType.TRIPLE, 3, 14)
+    assert find_combination(parse_cards("Hu"), combis) == (CombinationType.SINGLE, 1, 0)
+    assert len([combi for combi in combis if combi[1][0] == CombinationType.SINGLE]) == 11
+    # jeder Aufruf liefert neue Kartenlisten
+    assert build_combinations(hand)[0][0] is not combis[0][0]
+
 # Fixture für eine Beispielhand und daraus resultierende Kombinationen
 @pytest.fixture
 def sample_hand_and_combis() -> Tuple[Cards, List[Tuple[Cards, Combination]]]:
@@ -202,6 +216,99 @@ def test_action_space_wish_unfulfillable(sample_hand_and_combis):
     assert ([], (CombinationType.SINGLE, 1, 0)) not in action_space
     assert len(action_space) == len(combis) # Alle Kombinationen der Hand
 
+def test_action_space_trick_as_list(sample_hand_and_combis):
+    """Testet, dass der Stich auch als Liste übergeben werden kann (z.B. aus JSON)."""
+    hand, combis = sample_hand_and_combis
+    for trick in [(CombinationType.PASS, 0, 0), (CombinationType.SINGLE, 1, 0), (CombinationType.PAIR, 2, 4), (CombinationType.STREET, 5, 6)]:
+        assert build_action_space(combis, list(trick), 0) == build_action_space(combis, trick, 0)
+        assert build_responses(list(hand), list(trick), 0) == build_action_space(combis, trick, 0)
+
+@pytest.mark.parametrize("hand_str", [
+    "B2 B3 B4 S5 G5 S6 B6 S7 S8 S9 Dr",
+    "R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph",
+    "Ph RA GK RK BD RB RZ SZ R9 G8 R8 B7 Ma Hu",
+    "S9 S8 S7 S6 S5 G5 B5 R5 Dr",
+])
+def test_action_space_with_index(hand_str):
+    """Testet, dass der Action Space über den Index derselbe ist wie beim Durchlaufen aller Kombinationen."""
+    combis = build_combinations(parse_cards(hand_str))
+    index = build_action_space_index(combis)
+    tricks = [(CombinationType.PASS, 0, 0), (CombinationType.SINGLE, 1, 0), (CombinationType.SINGLE, 1, 1),
+              (CombinationType.SINGLE, 1, 9), (CombinationType.SINGLE, 1, 15), (CombinationType.PAIR, 2, 4),
+              (CombinationType.TRIPLE, 3, 2), (CombinationType.STAIR, 4, 4), (CombinationType.FULLHOUSE, 5, 3),
+              (CombinationType.STREET, 5, 7), (CombinationType.STREET, 6, 10), (CombinationType.BOMB, 4, 4),
+              (CombinationType.BOMB, 5, 9)]
+    for trick in tricks:
+        for wish in (-1, 0, 2, 5, 8, 14):
+            assert build_action_space(combis, trick, wish, index=index) == build_action_space(combis, trick, wish)
+
+@pytest.mark.parametrize("hand_str", [
+    "B2 B3 B4 S5 G5 S6 B6 S7 S8 S9 Dr",
+    "R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph",
+    "Ph RA GK RK BD RB RZ SZ R9 G8 R8 B7 Ma Hu",
+    "S9 S8 S7 S6 S5 G5 B5 R5 Dr",
+])
+def test_build_responses(hand_str):
+    """Testet, dass die gezielt gebildeten Antworten auf einen Stich dem Action Space aller Kombinationen entsprechen."""
+    combis = build_combinations(parse_cards(hand_str))
+    bombs = [combi for combi in combis if combi[1][0] == CombinationType.BOMB]
+    tricks = [(CombinationType.PASS, 0, 0), (CombinationType.SINGLE, 1, 0), (CombinationType.SINGLE, 1, 1),
+              (CombinationType.SINGLE, 1, 9), (CombinationType.SINGLE, 1, 15), (CombinationType.PAIR, 2, 4),
+              (CombinationType.TRIPLE, 3, 2), (CombinationType.STAIR, 4, 4), (CombinationType.STAIR, 6, 6),
+              (CombinationType.FULLHOUSE, 5, 3), (CombinationType.STREET, 5, 7), (CombinationType.STREET, 6, 10),
+              (CombinationType.BOMB, 4, 4), (CombinationType.BOMB, 5, 9)]
+    for trick in tricks:
+        for wish in (-1, 0, 2, 5, 8, 14):
+            assert build_responses(parse_cards(hand_str), trick, wish) == build_action_space(combis, trick, wish)
+        assert build_responses(parse_cards(hand_str), trick, 0, bombs_only=True) == build_action_space(bombs, trick, 0)
+
+@pytest.mark.parametrize("hand_str", [
+    "B2 B3 B4 S5 G5 S6 B6 S7 S8 S9 Dr",
+    "R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph",
+    "S9 S8 S7 S6 S5 G5 B5 R5 Dr",
+    "SA SK SD SB Dr Ph",
+    "",
+])
+def test_build_bombs(hand_str):
+    """Testet, dass der Bomben-Detektor und build_bombs() mit den Bomben aus build_combinations() übereinstimmen."""
+    bombs = [combi for combi in build_combinations(parse_cards(hand_str)) if combi[1][0] == CombinationType.BOMB]
+    assert contains_bomb(cards_to_mask(parse_cards(hand_str))) is bool(bombs)
+    assert build_bombs(parse_cards(hand_str)) == bombs
+
+def test_combination_ids():
+    """Testet die Kombinations-IDs (Hin- und Rückrichtung, Beschreibung, internierte Tupel)."""
+    cid = get_combination_id((CombinationType.STREET, 5, 9))
+    assert get_combination_by_id(cid) == (CombinationType.STREET, 5, 9)
+    assert get_combination_id(get_combination_by_id(cid)) == cid
+    assert get_combination_id((CombinationType.PASS, 0, 0)) == 0
+    assert get_combination_id((CombinationType.BOMB, 13, 14)) == 226  # die höchste Kombination hat die höchste ID
+    assert get_combination_id((CombinationType.PAIR, 2, 8)) < get_combination_id((CombinationType.PAIR, 2, 9))
+    info = get_combination_info(cid)
+    assert info.type == CombinationType.STREET and info.length == 5 and info.rank == 9
+    assert info.to_dict() == {"id": cid, "type": 6, "length": 5, "rank": 9, "label": "STREET05-09"}
+    with pytest.raises(ValueError):
+        get_combination_id((CombinationType.STREET, 4, 9))
+    combis = build_combinations(parse_cards("S9 S8 S7 S6 G5 R5"))
+    assert combis[0][1] is get_combination_by_id(get_combination_id(combis[0][1]))
+    assert get_combination_ids(combis).tolist() == [get_combination_id(combi[1]) for combi in combis]
+
+@pytest.mark.parametrize("combination, trick_combination, expected", [
+    ((CombinationType.SINGLE, 1, 9), (CombinationType.PASS, 0, 0), True),  # Anspiel
+    ((CombinationType.PAIR, 2, 3), (CombinationType.SINGLE, 1, 0), True),  # Hund
+    ((CombinationType.SINGLE, 1, 9), (CombinationType.SINGLE, 1, 8), True),
+    ((CombinationType.SINGLE, 1, 8), (CombinationType.SINGLE, 1, 8), False),
+    ((CombinationType.SINGLE, 1, 16), (CombinationType.SINGLE, 1, 14), True),  # Phönix
+    ((CombinationType.SINGLE, 1, 16), (CombinationType.SINGLE, 1, 15), False),  # Phönix auf Drache
+    ((CombinationType.STREET, 6, 10), (CombinationType.STREET, 5, 9), False),  # andere Länge
+    ((CombinationType.BOMB, 4, 2), (CombinationType.STREET, 5, 9), True),
+    ((CombinationType.BOMB, 5, 6), (CombinationType.BOMB, 4, 14), True),  # Farbbombe schlägt 4er-Bombe
+    ((CombinationType.BOMB, 4, 14), (CombinationType.BOMB, 5, 6), False),
+    ((CombinationType.PASS, 0, 0), (CombinationType.PASS, 0, 0), False),
+])
+def test_beats(combination, trick_combination, expected):
+    """Testet die vorberechnete Tabelle, ob eine Kombination den Stich überstechen kann."""
+    assert beats(get_combination_id(combination), get_combination_id(trick_combination)) is expected
+
 @pytest.mark.parametrize("figure, expected_valid", [
     ((CombinationType.SINGLE, 1, 0), True),
     ((CombinationType.SINGLE, 1, 5), True),
@@ -310,6 +417,21 @@ def test_build_combinations_counts():
     assert sum(1 for _, f in combis if f[0] == CombinationType.STAIR) == 21
     assert sum(1 for _, f in combis if f[0] == CombinationType.FULLHOUSE) == 8
 
+@pytest.mark.parametrize("hand", [
+    "Ph S9 G9 B9 S8 G8 B8 S7 G7 B7 S6 G6 B6 S5",
+    "Ph SA GA SK GK SD GD SB GB SZ GZ S9 G9 Ma",
+    "S6 R6 G6 B5 S5 R4 G4 B3 S3 R3 G2 B2 S2 Ph",
+])
+def test_build_combinations_unique(hand):
+    """Testet, dass jede Straße und Farbbombe genau einmal gebildet wird."""
+    combis = build_combinations(parse_cards(hand))
+    keys = [(tuple(cards), combi) for cards, combi in combis]
+    assert len(keys) == len(set(keys))
+    streets = [combi for combi in combis if combi[1][0] == CombinationType.STREET]
+    assert len(streets) > 100
+    for cards, combi in streets:
+        assert get_trick_combination(list(cards), 0) == combi
+
 @pytest.mark.parametrize("hand, expected_cards, expected_labels", [
     (
         "BD GD RD BZ RZ",
@@ -0,0 +1,108 @@
+import itertools
+import pytest
+from src.lib.cards import parse_cards
+from src.lib.combinations import build_combinations, build_action_space, remove_combinations, CombinationType
+from src.lib.partitions import *
+
+
+def _key(partition: Partition) -> tuple:
+    """Hilfsfunktion: Partition unabhängig von der Reihenfolge vergleichbar machen."""
+    return tuple(sorted((tuple(cards), combination) for cards, combination in partition))
+
+
+@pytest.mark.parametrize("hand_str", [
+    "S5 G5 B5 R5 Dr",
+    "Ph RA GK BD SB RZ",
+    "R9 R8 R7 R6 R5 G5 Hu Ma",
+])
+def test_iter_partitions_same_as_build_partitions(hand_str):
+    """Testet, dass iter_partitions() dieselben Partitionen liefert wie build_partitions(), die kürzesten zuerst."""
+    combis = build_combinations(parse_cards(hand_str))
+    expected = []
+    assert build_partitions(expected, combis, len(parse_cards(hand_str)), maxlen=100000)
+    partitions = list(iter_partitions(combis))
+    assert sorted(map(_key, partitions)) == sorted(map(_key, expected))
+    assert [len(p) for p in partitions] == sorted(len(p) for p in partitions)
+
+
+def test_iter_partitions_lazy():
+    """Bei vielen Möglichkeiten werden nur die benötigten Partitionen gebildet; die kürzeste Partition kommt zuerst."""
+    combis = build_combinations(parse_cards("R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph"))
+    partitions = list(itertools.islice(iter_partitions(combis), 3))
+    assert len(partitions) == 3
+    assert stringify_partition(partitions[0]) == "STAIR06-04 STAIR08-05"  # findet build_partitions() wegen der Obergrenze nicht
+
+
+def test_iter_partitions_empty():
+    """Ohne Kombinationen gibt es keine Partition."""
+    assert list(iter_partitions([])) == []
+
+
+def test_take_partitions():
+    """take_partitions() entnimmt höchstens maxlen Partitionen und meldet, ob es weitere gibt."""
+    combis = build_combinations(parse_cards("R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph"))
+    partitions = []
+    assert not take_partitions(partitions, combis, maxlen=3)
+    assert list(map(_key, partitions)) == list(map(_key, itertools.islice(iter_partitions(combis), 3)))
+    combis = build_combinations(parse_cards("S5 G5 S6 S7 S8"))
+    partitions = []
+    assert take_partitions(partitions, combis, maxlen=100)
+    assert len(partitions) == len(list(iter_partitions(combis)))
+
+
+@pytest.mark.parametrize("hand_str", [
+    "S5 G5 B5 R5 Dr",
+    "Ph RA GK BD SB RZ",
+    "R9 R8 R7 R6 R5 G5 Hu Ma",
+    "R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph",
+])
+def test_build_shortest_partitions(hand_str):
+    """Testet, dass build_shortest_partitions() genau die kürzesten Partitionen von iter_partitions() liefert."""
+    combis = build_combinations(parse_cards(hand_str))
+    length = len(next(iter_partitions(combis)))
+    expected = list(itertools.takewhile(lambda p: len(p) == length, iter_partitions(combis)))
+    assert list(map(_key, build_shortest_partitions(combis))) == list(map(_key, expected))
+    assert list(map(_key, build_shortest_partitions(combis, all_partitions=False))) == [_key(expected[0])]
+
+
+@pytest.mark.parametrize("hand_str, trick", [
+    ("S5 G5 B5 R5 Dr", (0, 0, 0)),
+    ("Ph RA GK BD SB RZ R9 S9 G8", (0, 0, 0)),
+    ("R9 R8 R7 R6 R5 G5 Hu Ma", (CombinationType.SINGLE, 1, 6)),
+    ("RA GA SK BK RD GD B9 S9 R8 G7 S6 B5 R4 Ma", (CombinationType.PAIR, 2, 8)),
+    ("RA GK", (CombinationType.PAIR, 2, 8)),
+])
+def test_build_shortest_playable_partitions(hand_str, trick):
+    """Testet, dass build_shortest_playable_partitions() genau die kürzesten spielbaren Partitionen liefert."""
+    combis = build_combinations(parse_cards(hand_str))
+    action_space = build_action_space(combis, trick, 0)
+    expected = filter_playable_partitions(list(iter_partitions(combis)), action_space)
+    expected = [p for p in expected if len(p) == min(map(len, expected))] if expected else []
+    assert sorted(map(_key, build_shortest_playable_partitions(combis, action_space))) == sorted(map(_key, expected))
+    assert len(build_shortest_playable_partitions(combis, action_space, max_count=2)) == min(len(expected), 2)
+
+
+def test_build_shortest_partitions_empty():
+    """Ohne Handkarten gibt es keine Partition."""
+    assert build_shortest_partitions([]) == []
+
+
+def test_partition_store():
+    """Testet, dass PartitionStore dieselben Ergebnisse liefert wie remove_partitions() und filter_playable_partitions()."""
+    hand = parse_cards("S5 G5 S6 S7 S8 R9 RZ Ph")
+    combis = build_combinations(hand)
+    partitions = []
+    assert build_partitions(partitions, combis, len(hand), maxlen=100000)
+    store = PartitionStore(partitions)
+    assert store.partitions == partitions
+    assert len(store) == len(partitions)
+    assert not store.add(partitions[-1])  # Duplikat
+
+    for cards in [parse_cards("S5 G5"), parse_cards("Ph"), parse_cards("S7")]:
+        partitions = remove_partitions(partitions, cards)
+        combis = remove_combinations(combis, cards)
+        store.remove_cards(cards)
+        assert store.partitions == partitions
+        assert len(store) == len(partitions)
+        action_space = [combi for combi in combis if combi[1][0] == CombinationType.SINGLE]
+        assert store.filter_playable(action_space) == filter_playable_partitions(partitions, action_space)
@@ -0,0 +1,120 @@
+import itertools
+import pytest
+from src.lib.cards import parse_cards, cards_to_mask, permute_cards
+from src.lib.combinations import build_combinations
+from src.lib.partitions import take_partitions, iter_partitions
+# noinspection PyProtectedMember
+from src.lib.shared_cache import SharedCache, attach_shared_cache, detach_shared_cache, get_shared_cache, _ENTRY, _KIND_COMBINATIONS
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SharedCache.create(str(tmp_path / "cache.bin"), size=16)
+    yield cache
+    cache.close(unlink=True)
+
+
+def _key(combis) -> list:
+    """Hilfsfunktion: Kombinationen unabhängig von der Reihenfolge vergleichbar machen."""
+    return sorted((tuple(sorted(cards)), combination) for cards, combination in combis)
+
+
+def test_shared_cache_combinations(cache):
+    """Die Kombinationen werden beim zweiten Aufruf (auch aus einem anderen Mapping) aus dem Cache gelesen."""
+    hand = parse_cards("Ph RA GK BD SB RZ R9 S9 G8 Hu")
+    hand.sort(reverse=True)
+    combis = cache.build_combinations(hand, cards_to_mask(hand))
+    assert _key(combis) == _key(build_combinations(hand))
+    assert (cache.hits, cache.misses) == (0, 1)
+    other = SharedCache(cache.path)
+    assert other.build_combinations(hand, cards_to_mask(hand)) == combis
+    other.close()
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_shared_cache_combinations_canonical(cache):
+    """Hände, die sich nur in den Farben unterscheiden, teilen sich einen Eintrag; die Farben werden zurückübertragen."""
+    hand = parse_cards("Ph RA GK BD SB RZ R9 S9 G8 Hu")
+    hand.sort(reverse=True)
+    perm = (0, 2, 3, 4, 1)
+    other_hand = sorted(permute_cards(hand, perm), reverse=True)
+    combis = cache.build_combinations(hand, cards_to_mask(hand))
+    other_combis = cache.build_combinations(other_hand, cards_to_mask(other_hand))
+    assert cache.hits == 1
+    assert _key(other_combis) == _key(build_combinations(other_hand))
+    assert other_combis == [(permute_cards(cards, perm), combination) for cards, combination in combis]
+
+
+def test_shared_cache_partitions(cache):
+    """Die Partitionen werden inklusive Abbruch-Flag wiederhergestellt, auch für Hände mit vertauschten Farben."""
+    hand = parse_cards("S5 G5 S6 S7 S8 R9 RZ")
+    hand.sort(reverse=True)
+    combis = build_combinations(hand)
+    expected = []
+    completed = take_partitions(expected, combis)
+    for _ in range(2):
+        partitions = []
+        assert cache.build_partitions(partitions, combis, cards_to_mask(hand)) == completed
+        assert partitions == expected
+    assert cache.hits == 1
+
+    perm = (0, 4, 3, 2, 1)
+    other_hand = sorted(permute_cards(hand, perm), reverse=True)
+    other_combis = [(permute_cards(cards, perm), combination) for cards, combination in combis]
+    partitions = []
+    assert cache.build_partitions(partitions, other_combis, cards_to_mask(other_hand)) == completed
+    assert partitions == [[other_combis[combis.index(combi)] for combi in partition] for partition in expected]
+    assert cache.hits == 2
+
+
+def test_shared_cache_partitions_bounded(tmp_path):
+    """Es werden nur so viele Partitionen geliefert, wie in einen Eintrag passen; die Liste gilt als unvollständig."""
+    cache = SharedCache.create(str(tmp_path / "cache.bin"), size=4, entry_size=256)
+    hand = parse_cards("R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph")
+    hand.sort(reverse=True)
+    combis = build_combinations(hand)
+    results = []
+    for _ in range(2):
+        partitions = []
+        assert not cache.build_partitions(partitions, combis, cards_to_mask(hand))
+        results.append(partitions)
+    assert cache.hits == 1
+    assert results[0] == results[1]
+    assert 0 < len(results[0]) < 100
+    assert results[0] == list(itertools.islice(iter_partitions(combis), len(results[0])))  # die kürzesten zuerst
+    assert cache.rejected == 0
+    cache.close(unlink=True)
+
+
+def test_shared_cache_eviction_and_crc(tmp_path):
+    """Bei vollem Satz wird der älteste Eintrag verdrängt; ein beschädigter Eintrag gilt als Fehltreffer."""
+    cache = SharedCache.create(str(tmp_path / "cache.bin"), size=2, ways=2, entry_size=64)
+    assert cache.put(_KIND_COMBINATIONS, 0, 1, b"a")
+    assert cache.put(_KIND_COMBINATIONS, 0, 2, b"b")
+    assert cache.get(_KIND_COMBINATIONS, 0, 1) == b"a"  # Eintrag 1 wird verwendet, Eintrag 2 ist damit der älteste
+    assert cache.put(_KIND_COMBINATIONS, 0, 3, b"c")
+    assert cache.get(_KIND_COMBINATIONS, 0, 2) is None
+    assert cache.get(_KIND_COMBINATIONS, 0, 3) == b"c"
+    assert not cache.put(_KIND_COMBINATIONS, 0, 4, bytes(64))  # zu groß
+    assert cache.rejected == 1
+
+    # Nutzdaten des Eintrags 3 beschädigen
+    with open(cache.path, "r+b") as fp:
+        data = fp.read()
+        offset = next(i for i in range(64, len(data), 64) if _ENTRY.unpack_from(data, i)[5] == 3)
+        fp.seek(offset + _ENTRY.size)
+        fp.write(b"x")
+    assert cache.get(_KIND_COMBINATIONS, 0, 3) is None
+    cache.close(unlink=True)
+
+
+def test_attach_shared_cache(cache):
+    """Der Cache des Prozesses wird ein- und ausgeblendet."""
+    assert get_shared_cache() is None
+    attach_shared_cache(cache.path)
+    try:
+        assert get_shared_cache().path == cache.path
+    finally:
+        detach_shared_cache()
+    assert get_shared_cache() is None
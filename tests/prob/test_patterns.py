@@ -0,0 +1,84 @@
+import itertools
+import math
+import random
+import numpy as np
+import pytest
+# noinspection PyProtectedMember
+from src.lib.prob import patterns
+from src.lib.prob.patterns import BINOMIAL, build_pattern_table, count_hands, save_pattern_tables, map_pattern_tables, verify_pattern_table
+
+
+def _brute_force(table_dict, offset, width, align_right, cards, k, r_from, r_to):
+    # Hände aufzählen, die mindestens eines der Muster enthalten
+    matches = 0
+    for hand in itertools.combinations(range(len(cards)), k):
+        h = [0] * 17
+        for i in hand:
+            h[cards[i]] += 1
+        for r in range(r_from, r_to):
+            found = False
+            for case in table_dict.get(r, []):
+                start = offset + (width - len(case) if align_right else 0)
+                if all(h[start + i] >= c for i, c in enumerate(case)):
+                    found = True
+                    break
+            if found:
+                matches += 1
+                break
+    return matches
+
+
+def test_binomial():
+    assert BINOMIAL.shape == (57, 15)
+    assert BINOMIAL[56, 14] == math.comb(56, 14)
+    assert BINOMIAL[3, 5] == 0
+
+
+@pytest.mark.parametrize("small", [1024, 0])
+def test_count_hands(monkeypatch, small):
+    monkeypatch.setattr(patterns, "_SMALL", small)  # 0: immer über die Bitsets
+    # disjunkte Muster (je Rang ein Pärchen), rechtsbündig wie bei p_high
+    table_dict = {r: [(2,) + (0,) * (14 - r)] for r in range(2, 15)}
+    table = build_pattern_table(table_dict, offset=1, width=14, align_right=True)
+    rnd = random.Random(1)
+    for _ in range(10):
+        cards = rnd.sample([r for r in range(2, 15) for _ in range(4)], 10)
+        k = rnd.randint(0, 6)
+        h = np.zeros(17, dtype=np.int64)
+        for r in cards:
+            h[r] += 1
+        r_from = rnd.randint(2, 14)
+        # Inklusion-Exklusion entfällt nur bei k < 4, da sich die Pärchen sonst überschneiden können
+        if k >= 4:
+            continue
+        expected = _brute_force(table_dict, 1, 14, True, cards, k, r_from, 15)
+        assert count_hands(table, table.select(r_from, 15), h, len(cards), k) == expected
+
+
+def test_select():
+    table = build_pattern_table({3: [(1,)], 5: [(1,), (2,)]}, offset=2, width=14, align_right=False)
+    assert table.select(0, 3) == slice(0, 0)
+    assert table.select(3, 5) == slice(0, 1)
+    assert table.select(4, 17) == slice(1, 3)
+
+
+def test_save_and_map(tmp_path):
+    table_dict = {r: [(1, 1), (2, 0)] for r in range(2, 15)}
+    tables = tuple(build_pattern_table(table_dict, offset=1, width=14, align_right=True) for _ in range(2))
+    file = str(tmp_path / "test.tpat")
+    save_pattern_tables(file, tables)
+    mapped = map_pattern_tables(file)
+    assert len(mapped) == 2
+    for table, m in zip(tables, mapped):
+        assert m.offset == table.offset and m.bounds == table.bounds
+        for name in ("ranks", "cases", "covered", "sizes", "too_many", "too_large"):
+            assert np.array_equal(getattr(m, name), getattr(table, name))
+        assert not m.cases.flags.writeable
+        assert verify_pattern_table(m)
+
+
+def test_map_invalid(tmp_path):
+    file = tmp_path / "test.tpat"
+    file.write_bytes(b"TPAT" + (99).to_bytes(4, "little") + (0).to_bytes(4, "little"))
+    with pytest.raises(ValueError):
+        map_pattern_tables(str(file))
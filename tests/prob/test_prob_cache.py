@@ -0,0 +1,72 @@
+import pytest
+from src.lib.cards import parse_cards
+from src.lib.prob.prob_cache import ProbCache, get_prob_cache
+# noinspection PyProtectedMember
+from src.lib.prob.prob_hi import prob_of_higher_combi_or_bomb, prob_of_higher_combi_batch, _prob_of_higher_combi_or_bomb
+# noinspection PyProtectedMember
+from src.lib.prob.prob_lo import prob_of_lower_combi, prob_of_lower_combi_batch, _prob_of_lower_combi_uncached
+
+
+@pytest.fixture
+def cards():
+    return parse_cards("Dr Ph Hu RK GK BD SB RB R9 G8 B7 S6 R5 B4 R3 R2")
+
+
+@pytest.fixture
+def cache():
+    cache = get_prob_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_prob_cache_hits(cards, cache):
+    p = prob_of_higher_combi_or_bomb(cards, 5, (2, 2, 11))
+    assert p == _prob_of_higher_combi_or_bomb(cards, 5, (2, 2, 11))
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert prob_of_higher_combi_or_bomb(list(reversed(cards)), 5, (2, 2, 11)) == p  # Reihenfolge egal
+    assert prob_of_higher_combi_or_bomb(cards, 6, (2, 2, 11)) != p  # anderes k
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == pytest.approx(1 / 3)
+    assert prob_of_lower_combi(cards, 5, (2, 2, 11)) == _prob_of_lower_combi_uncached(cards, 5, (2, 2, 11))  # eigene Art
+    assert cache.misses == 3
+
+
+def test_prob_cache_special_cards(cards, cache):
+    # Phönix als Anspielkarte, Phönix auf einer 11, Hund
+    for combination in [(1, 1, 16), (1, 1, 11), (1, 1, 0)]:
+        assert prob_of_higher_combi_or_bomb(cards, 5, combination) == _prob_of_higher_combi_or_bomb(cards, 5, combination)
+        assert prob_of_lower_combi(cards, 5, combination) == _prob_of_lower_combi_uncached(cards, 5, combination)
+    assert cache.hits == 0
+
+
+def test_prob_cache_lru():
+    cache = ProbCache(size=2)
+    cache.put(("low", 1, 5, (1, 1, 5)), 0.5)
+    cache.put(("low", 1, 5, (1, 1, 6)), 0.6)
+    assert cache.get(("low", 1, 5, (1, 1, 5))) == 0.5  # 5 ist jetzt der jüngste Eintrag
+    cache.put(("low", 1, 5, (1, 1, 7)), 0.7)  # verdrängt 6
+    assert len(cache) == 2
+    assert cache.get(("low", 1, 5, (1, 1, 6))) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_prob_cache_disabled():
+    cache = ProbCache(size=0)
+    cache.put(("low", 1, 5, (1, 1, 5)), 0.5)
+    assert len(cache) == 0
+    assert cache.get(("low", 1, 5, (1, 1, 5))) is None
+
+
+def test_prob_cache_batch(cards, cache):
+    combinations = [(1, 1, 11), (2, 2, 11), (1, 1, 11), (1, 1, 16)]
+    prob_of_higher_combi_or_bomb(cards, 5, (2, 2, 11))
+    actual = prob_of_higher_combi_batch(cards, 5, combinations)
+    for i, combination in enumerate(combinations):
+        assert tuple(actual[i]) == pytest.approx(_prob_of_higher_combi_or_bomb(cards, 5, combination))
+    assert (cache.hits, cache.misses) == (1, 3)  # nur (1, 1, 11) und (1, 1, 16) wurden berechnet
+    actual = prob_of_lower_combi_batch(cards, 5, combinations)
+    assert list(actual) == [_prob_of_lower_combi_uncached(cards, 5, combination) for combination in combinations]
+    assert len(cache) == 6
+    assert prob_of_lower_combi(cards, 5, (1, 1, 16)) == actual[3]
+    assert cache.hits == 2
@@ -0,0 +1,46 @@
+import pytest
+from src.lib.cards import parse_cards
+from src.lib.prob.prob_gf import prob_of_higher_combi_gf, prob_of_lower_combi_gf, prob_of_any_4_bomb_gf
+from src.lib.prob.prob_hi import possible_hands_hi
+from src.lib.prob.prob_lo import possible_hands_lo
+
+_cases = [
+    ("Dr Ph Hu Ma RK GK BD SB RB R9 G8 B7", 5, (1, 1, 11)),
+    ("Dr Ph Hu Ma RK GK BD SB RB R9 G8 B7", 5, (1, 1, 16)),
+    ("Dr Ph Hu Ma RK GK BD SB RB R9 G8 B7", 5, (1, 1, 15)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (2, 2, 10)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (3, 3, 8)),
+    ("Ph RK GK BD SD GD RB BB R9 B2", 6, (4, 4, 10)),
+    ("Ph RK GK BD SD GD RB BB R9 B9 S2", 6, (4, 6, 12)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (5, 5, 9)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (5, 5, 14)),
+    ("Ph Ma RA GK BD SB R9 G8 B7 S6 R5 B4 R3 R2", 7, (6, 5, 8)),
+    ("Ph Ma RA GK BD SB R9 G8 B7 S6 R5 B4 R3 R2", 7, (6, 5, 14)),
+    ("Ph RK GK BK SK GD R9 B9 S9 G9", 6, (7, 4, 8)),
+]
+
+
+@pytest.mark.parametrize("cards, k, combination", _cases)
+def test_prob_of_higher_combi_gf(cards, k, combination):
+    matches, hands = possible_hands_hi(parse_cards(cards), k, combination, with_bombs=False)
+    assert prob_of_higher_combi_gf(parse_cards(cards), k, combination) == pytest.approx(sum(matches) / len(hands), abs=1e-15)
+
+
+@pytest.mark.parametrize("cards, k, combination", _cases)
+def test_prob_of_lower_combi_gf(cards, k, combination):
+    matches, hands = possible_hands_lo(parse_cards(cards), k, combination)
+    p_expected = sum(matches) / len(hands) if combination[0] != 7 else 1.0
+    assert prob_of_lower_combi_gf(parse_cards(cards), k, combination) == pytest.approx(p_expected, abs=1e-15)
+
+
+def test_prob_of_higher_color_bomb_gf():
+    # zwei höhere Farbbomben derselben Farbe auf einer Hand dürfen nur einmal gezählt werden
+    cards = parse_cards("RA RK RD RB RZ R8 R7 R6 R5 R4 R3 S2 G2")
+    for k in [11, 12]:
+        matches, hands = possible_hands_hi(cards, k, (7, 5, 13), with_bombs=False)
+        assert prob_of_higher_combi_gf(cards, k, (7, 5, 13)) == pytest.approx(sum(matches) / len(hands), abs=1e-15)
+
+
+def test_prob_of_any_4_bomb_gf():
+    cards = parse_cards("Ph RK GK BK SK GD R9 B9 S9 G9")
+    assert prob_of_any_4_bomb_gf(cards, 4) == pytest.approx(2 / 210)
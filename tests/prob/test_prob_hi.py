@@ -1,8 +1,9 @@
 import pytest
 from src.lib.cards import parse_cards
 from src.lib.combinations import stringify_combination, CombinationType
+from src.lib.prob.prob_cache import get_prob_cache
 # noinspection PyProtectedMember
-from src.lib.prob.prob_hi import possible_hands_hi, prob_of_higher_combi_or_bomb
+from src.lib.prob.prob_hi import possible_hands_hi, prob_of_higher_combi_or_bomb, prob_of_higher_combi_batch
 
 @pytest.mark.parametrize("cards, k, figure, matches_expected, total_expected, msg", [
     # Einzelkarte
@@ -236,6 +237,8 @@ def test_possible_hands_hi(cards, k, figure, matches_expected, total_expected, m
     # Farbbombe mit längerer Farbbombe
     ("SD RZ R9 R8 R7 R6 R5", 6, (7, 5, 11), 0.14285714285714285, "Farbbombe mit längerer Farbbombe (1)"),
     ("SK RB RZ R9 R8 R7 R6 S2", 7, (7, 5, 11), 0.25, "Farbbombe mit längerer Farbbombe (2)"),
+    ("RA RK RD RB RZ R8 R7 R6 R5 R4 R3 S2 G2", 11, (7, 5, 13), 0.6153846153846154, "Farbbombe mit höherer und längerer Farbbombe derselben Farbe (1)"),
+    ("RA RK RD RB RZ R8 R7 R6 R5 R4 R3 S2 G2", 12, (7, 5, 13), 1.0, "Farbbombe mit höherer und längerer Farbbombe derselben Farbe (2)"),
 ])
 def test_prob_of_higher_combi_or_bomb_explicit(cards, k, figure, expected, msg):
     """prob_of_higher_combi_or_bomb() testen (explizit ausgesuchte Fälle)"""
@@ -467,3 +470,18 @@ def test_prob_of_higher_combi_or_bomb_raster(cards, k, combination):
         assert pytest.approx(p_actual_min, abs=1e-15) == p_expected, msg
     else:
         assert p_actual_min - 1e-15 <= p_expected <= p_actual_max + 1e-15, msg
+
+
+@pytest.mark.parametrize("cards, k", [
+    ("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5 B4 R3 R2", 5),
+    ("Hu Ma RZ GZ BZ SZ R9 R8 R7 R6 G6 B2", 6),
+    ("Ph GB GZ G8 G7 G4 B2 S2", 0),
+])
+def test_prob_of_higher_combi_batch(cards, k):
+    """prob_of_higher_combi_batch() muss dieselben Werte liefern wie prob_of_higher_combi_or_bomb()"""
+    combinations = [(1, 1, 0), (1, 1, 11), (1, 1, 16), (2, 2, 11), (1, 1, 11), (3, 3, 5), (6, 5, 9), (7, 4, 8), (7, 5, 9)]
+    actual = prob_of_higher_combi_batch(parse_cards(cards), k, combinations)
+    get_prob_cache().clear()  # die Einzelwerte neu berechnen
+    assert actual.shape == (len(combinations), 2)
+    for i, combination in enumerate(combinations):
+        assert tuple(actual[i]) == prob_of_higher_combi_or_bomb(parse_cards(cards), k, combination), stringify_combination(combination)
@@ -1,8 +1,9 @@
 import pytest
 from src.lib.cards import parse_cards
 from src.lib.combinations import stringify_combination, CombinationType
+from src.lib.prob.prob_cache import get_prob_cache
 # noinspection PyProtectedMember
-from src.lib.prob.prob_lo import possible_hands_lo, prob_of_lower_combi
+from src.lib.prob.prob_lo import possible_hands_lo, prob_of_lower_combi, prob_of_lower_combi_batch
 
 @pytest.mark.parametrize("cards, k, figure, matches_expected, total_expected, msg", [
     # Einzelkarte
@@ -319,3 +320,18 @@ def test_prob_of_lower_combi_raster(cards, k, combination):
     # print(f'("{cards}", {k}, ({combination[0]}, {combination[1]}, {combination[2]}), {sum(matches)}, {len(hands)}, {p_expected}, "{msg}"),')
     actual = prob_of_lower_combi(parse_cards(cards), k, combination)
     assert pytest.approx(actual, abs=1e-15) == p_expected, msg
+
+
+@pytest.mark.parametrize("cards, k", [
+    ("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5 B4 R3 R2", 5),
+    ("Hu Ma RZ GZ BZ SZ R9 R8 R7 R6 G6 B2", 6),
+    ("Ph GB GZ G8 G7 G4 B2 S2", 0),
+])
+def test_prob_of_lower_combi_batch(cards, k):
+    """prob_of_lower_combi_batch() muss dieselben Werte liefern wie prob_of_lower_combi()"""
+    combinations = [(1, 1, 0), (1, 1, 11), (1, 1, 16), (2, 2, 11), (1, 1, 11), (3, 3, 5), (6, 5, 9), (7, 4, 8)]
+    actual = prob_of_lower_combi_batch(parse_cards(cards), k, combinations)
+    get_prob_cache().clear()  # die Einzelwerte neu berechnen
+    assert actual.shape == (len(combinations),)
+    for i, combination in enumerate(combinations):
+        assert actual[i] == prob_of_lower_combi(parse_cards(cards), k, combination), stringify_combination(combination)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from src.lib.cards import parse_cards
+from src.lib.prob.prob_hi import possible_hands_hi
+from src.lib.prob.prob_lo import possible_hands_lo
+from src.lib.prob.prob_mc import estimate_prob_of_higher_combi, estimate_prob_of_lower_combi
+
+
+@pytest.mark.parametrize("cards, k, combination", [
+    ("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5", 5, (1, 1, 11)),
+    ("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5", 5, (1, 1, 16)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (2, 2, 10)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (5, 5, 9)),
+    ("RK GK BD SD GD RD R9 B9 S9 G9", 6, (4, 4, 10)),
+    ("Ph G9 G8 G7 G6 G5 B4 S4 R3 R2", 6, (6, 5, 7)),
+    ("G9 G8 G7 G6 G5 B9 S4 R3 R2 R9", 6, (7, 4, 7)),
+])
+def test_estimate_prob_of_higher_combi(cards, k, combination):
+    """Die exakte Wahrscheinlichkeit liegt im Konfidenzintervall"""
+    for with_bombs in [False, True]:
+        matches, hands = possible_hands_hi(parse_cards(cards), k, combination, with_bombs=with_bombs)
+        p_expected = sum(matches) / len(hands)
+        est = estimate_prob_of_higher_combi(parse_cards(cards), k, combination, with_bombs=with_bombs, tolerance=0.005, confidence=0.999, rng=np.random.default_rng(1))
+        assert est.low <= p_expected <= est.high, combination
+        assert est.samples > 0
+
+
+@pytest.mark.parametrize("cards, k, combination", [
+    ("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5", 5, (1, 1, 11)),
+    ("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5", 5, (1, 1, 15)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (2, 2, 13)),
+    ("Ph RK GK BD SD GD R9 B2 S2 G2", 6, (5, 5, 13)),
+    ("Ph G9 G8 G7 G6 G5 B4 S4 R3 R2", 6, (6, 5, 10)),
+])
+def test_estimate_prob_of_lower_combi(cards, k, combination):
+    """Die exakte Wahrscheinlichkeit liegt im Konfidenzintervall"""
+    matches, hands = possible_hands_lo(parse_cards(cards), k, combination)
+    p_expected = sum(matches) / len(hands)
+    est = estimate_prob_of_lower_combi(parse_cards(cards), k, combination, tolerance=0.005, confidence=0.999, rng=np.random.default_rng(1))
+    assert est.low <= p_expected <= est.high, combination
+
+
+def test_estimate_without_sampling():
+    cards = parse_cards("Dr Ph RK GK BD SB")
+    assert estimate_prob_of_higher_combi(cards, 0, (1, 1, 11)).samples == 0
+    assert estimate_prob_of_higher_combi(cards, 3, (1, 1, 0)).p == 1.0  # Hund
+    assert estimate_prob_of_lower_combi(cards, 3, (1, 1, 0)).p == 0.0  # Hund
+    assert estimate_prob_of_lower_combi(cards, 3, (7, 4, 5)).p == 1.0  # Bombe
+
+
+def test_estimate_stops_at_tolerance():
+    cards = parse_cards("Dr Ph RK GK BD SB RB R9 G8 B7 S6 R5 B4 R3 R2")
+    est = estimate_prob_of_higher_combi(cards, 7, (2, 2, 10), tolerance=0.05, max_samples=1000000, rng=np.random.default_rng(2))
+    assert (est.high - est.low) / 2 <= 0.05
+    assert est.samples < 1000000
+    est = estimate_prob_of_higher_combi(cards, 7, (2, 2, 10), tolerance=0.0, max_samples=3000, rng=np.random.default_rng(2))
+    assert est.samples == 3000
@@ -0,0 +1,44 @@
+import math
+import numpy as np
+import pytest
+from src.lib.cards import parse_cards
+from src.lib.prob.prob_hi import possible_hands_hi, prob_of_any_4_bomb
+from src.lib.prob.prob_lo import possible_hands_lo
+from src.lib.prob.prob_oracle import oracle_probs
+
+_combinations = [(1, 1, 0), (1, 1, 11), (1, 1, 16), (1, 1, 15), (2, 2, 10), (3, 3, 8), (4, 4, 10), (5, 5, 9),
+                 (6, 5, 8), (6, 5, 14), (7, 4, 8), (7, 5, 10)]
+
+
+@pytest.mark.parametrize("cards, k", [
+    ("Dr Ph Hu Ma RK GK BD SB RB R9 G8 B7 S6 R5", 6),
+    ("Ph RK GK BK SK GD R9 B9 S9 G9 B2 S2", 5),
+    ("Ph Ma RA GK BD SB R9 G8 B7 S6 R5 B4 R3 R2", 7),
+])
+def test_oracle_probs(cards, k):
+    cards = parse_cards(cards)
+    result = oracle_probs(cards, k, _combinations, workers=1, depth=2)
+    assert result.hands == math.comb(len(cards), k)
+    assert result.p_4 == pytest.approx(prob_of_any_4_bomb(cards, k), abs=1e-15)
+    for i, combination in enumerate(_combinations):
+        matches, hands = possible_hands_lo(cards, k, combination)
+        p_low = sum(matches) / len(hands) if combination[0] != 7 else 1.0
+        assert result.p_low[i] == pytest.approx(p_low, abs=1e-15), combination
+        if combination == (7, 5, 10):
+            assert np.isnan(result.p_high[i])  # Farbbombe
+            continue
+        matches, hands = possible_hands_hi(cards, k, combination, with_bombs=False)
+        assert result.p_high[i] == pytest.approx(sum(matches) / len(hands), abs=1e-15), combination
+        if combination[0] != 7:
+            assert max(result.p_high[i], result.p_4) - 1e-15 <= result.p_high_4[i] <= result.p_high[i] + result.p_4 + 1e-15
+        else:
+            assert result.p_high_4[i] == result.p_high[i]
+
+
+def test_oracle_probs_with_pool():
+    cards = parse_cards("Dr Ph Hu Ma RA GA RK GK BD SB RB R9 G8 B7 S6 R5 B4 R3 R2 G2")
+    expected = oracle_probs(cards, 8, _combinations, workers=1)
+    actual = oracle_probs(cards, 8, _combinations, workers=2, depth=4)
+    assert actual.vectors == expected.vectors
+    assert np.array_equal(actual.p_low, expected.p_low)
+    assert np.array_equal(actual.p_high_4, expected.p_high_4, equal_nan=True)
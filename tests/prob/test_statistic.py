@@ -0,0 +1,194 @@
+import itertools
+import numpy as np
+import pytest
+import src.lib.prob.statistic as statistic_module
+from src.lib.cards import parse_cards, ranks_to_vector, deck
+from src.lib.combinations import build_combinations, build_action_space, CombinationType
+from src.lib.partitions import iter_partitions, filter_playable_partitions, build_best_partition
+from src.lib.prob.prob_hi import possible_hands_hi
+from src.lib.prob.prob_lo import possible_hands_lo
+from src.lib.prob.prob_mc import has_higher_combi, has_lower_combi
+from src.lib.prob.statistic import STATISTIC_DTYPE, calc_statistic_array, calc_statistic, Statistic, partition_quality
+
+
+@pytest.mark.parametrize("hand_str, others_str, number_of_cards", [
+    ("Ph RA GK BD SB RZ R9 S9 G8", "Dr Hu Ma SA BK GD SZ B9 R8 G7 S6 B5 R4 G3 S2", [9, 5, 5, 5]),
+    ("R9 R8 R7 R6 R5 G5 Hu Ma", "Ph RA SA GK BK RD SB G9 S8 B7 R4 G4 B3 S2", [8, 4, 6, 4]),
+    ("RA GA SK BK RD GD B9 S9 R8 G3 S6 B5 R4 Ma", "R7 G7 B7 S7 R6 G6 B6 RB GB BB SZ GZ", [14, 4, 4, 4]),
+    ("S5 G5 B5 R5 Dr", "RA RK RD RB RZ G9 B8 S7 G6 B4 S3 R2 G2", [5, 5, 3, 5]),
+])
+def test_calc_statistic_array(hand_str, others_str, number_of_cards):
+    """Vergleicht lo, hi und eq mit der vollständigen Aufzählung der Hände des rechten Gegners."""
+    hand = parse_cards(hand_str)
+    others = parse_cards(others_str)
+    combis = build_combinations(hand)
+    statistic = calc_statistic_array(0, hand, combis, number_of_cards, (0, 0, 0), hand + others)
+    assert statistic.dtype == STATISTIC_DTYPE
+    assert len(statistic) == len(combis)
+    k = number_of_cards[1]
+    hands = list(itertools.combinations(others, k))
+    hand_combinations = [{combination for _, combination in build_combinations(list(cards))} for cards in hands]
+    for row, (_, combination) in zip(statistic, combis):
+        if combination == (CombinationType.SINGLE, 1, 0):
+            assert row["hi_right"] == 1.0  # der Hund wird immer überstochen
+        else:
+            matches, _ = possible_hands_hi(others, k, combination, with_bombs=True)
+            assert row["hi_right"] == pytest.approx(sum(matches) / len(hands), abs=1e-12)
+        if combination[0] == CombinationType.BOMB:
+            assert row["lo_right"] == 1.0
+        else:
+            matches, _ = possible_hands_lo(others, k, combination)
+            assert row["lo_right"] == pytest.approx(sum(matches) / len(hands), abs=1e-12)
+        p_equal = sum(combination in combinations for combinations in hand_combinations) / len(hands)
+        assert row["eq_right"] == pytest.approx(p_equal, abs=1e-12)
+        assert row["hi_opp"] == pytest.approx(1 - (1 - row["hi_right"]) * (1 - row["hi_left"]))
+
+
+def _count_vectors(pool, subsets):
+    """Hilfsfunktion: Anzahl Karten je Rang und Karten je Farbe und Rang der Teilmengen (siehe has_higher_combi())."""
+    h = np.array([ranks_to_vector([pool[i] for i in subset]) for subset in subsets], dtype=np.int64)
+    colors = np.zeros((len(subsets), 4, 17), dtype=np.int64)
+    for b, subset in enumerate(subsets):
+        for v, color in (pool[i] for i in subset):
+            if 2 <= v <= 14:
+                colors[b, color - 1, v] = 1
+    return h, colors
+
+
+@pytest.mark.parametrize("hand_str, others_str, number_of_cards, max_error_right, max_error_opp", [
+    ("Ph RA GK BD SB RZ R9 S9 G8", "Dr Hu Ma SA BK GD SZ B9 R8 G7 S6 B5 R4", [9, 5, 3, 5], 1e-12, 0.15),
+    ("R9 R8 Hu Ma", "G9 G8 G7 G6 G5 G4 S9 S8 S7 S6 S5 RA BA", [4, 6, 3, 4], 0.01, 0.09),
+    ("RA GA SK BK Ph", "B7 B6 B5 B4 B3 R7 R6 R5 R4 R3 SZ GZ B2", [5, 6, 2, 5], 1e-12, 0.05),
+])
+def test_calc_statistic_array_error(hand_str, others_str, number_of_cards, max_error_right, max_error_opp):
+    """
+    Begrenzt den Fehler der Näherungen gegenüber der vollständigen Aufzählung (siehe Moduldokumentation).
+
+    Farbbomben werden als unabhängig von der Kombination angenommen (betrifft hi je Gegner), die Hände der beiden Gegner
+    als unabhängig voneinander (betrifft die Werte für "mindestens ein Gegner").
+    """
+    hand = parse_cards(hand_str)
+    pool = parse_cards(others_str)
+    k_right, k_left = number_of_cards[1], number_of_cards[3]
+    statistic = calc_statistic_array(0, hand, build_combinations(hand), number_of_cards, (0, 0, 0), hand + pool)
+
+    # alle Aufteilungen: rechter Gegner, dann linker Gegner aus den übrigen Karten
+    rights = list(itertools.combinations(range(len(pool)), k_right))
+    lefts = list(itertools.combinations(range(len(pool)), k_left))
+    left_index = {subset: i for i, subset in enumerate(lefts)}
+    pairs = np.array([(i, left_index[subset]) for i, right in enumerate(rights)
+                      for subset in itertools.combinations([x for x in range(len(pool)) if x not in right], k_left)])
+    h_right, colors_right = _count_vectors(pool, rights)
+    h_left, colors_left = _count_vectors(pool, lefts)
+
+    for row, (_, combination) in zip(statistic, build_combinations(hand)):
+        if combination == (CombinationType.SINGLE, 1, 0):
+            continue  # der Hund wird immer überstochen
+        right = has_higher_combi(h_right, colors_right, combination, with_bombs=True)
+        left = has_higher_combi(h_left, colors_left, combination, with_bombs=True)
+        assert row["hi_right"] == pytest.approx(right.mean(), abs=max_error_right)
+        assert row["hi_opp"] == pytest.approx((right[pairs[:, 0]] | left[pairs[:, 1]]).mean(), abs=max_error_opp)
+        if combination[0] != CombinationType.BOMB:
+            right = has_lower_combi(h_right, combination)
+            left = has_lower_combi(h_left, combination)
+            assert row["lo_right"] == pytest.approx(right.mean(), abs=1e-12)
+            assert row["lo_opp"] == pytest.approx((right[pairs[:, 0]] | left[pairs[:, 1]]).mean(), abs=max_error_opp)
+
+
+def test_statistic_cache_lru(monkeypatch):
+    """Der Cache der Statistik verdrängt den am längsten nicht verwendeten Eintrag."""
+    monkeypatch.setattr(statistic_module.config, "STATISTIC_CACHE_SIZE", 2)
+    statistic_module._statistic_cache.clear()
+    hand = parse_cards("RA GK BD SB RZ")
+    combis = build_combinations(hand)
+    pools = [[card for card in deck if card not in hand][i:i + 15] + hand for i in (0, 15, 30)]
+    for pool in pools[:2]:
+        calc_statistic_array(0, hand, combis, [5, 5, 5, 5], (0, 0, 0), pool)
+    keys = list(statistic_module._statistic_cache)
+    calc_statistic_array(0, hand, combis, [5, 5, 5, 5], (0, 0, 0), pools[0])  # erster Eintrag wird zuletzt verwendet
+    calc_statistic_array(0, hand, combis, [5, 5, 5, 5], (0, 0, 0), pools[2])
+    assert len(statistic_module._statistic_cache) == 2
+    assert keys[0] in statistic_module._statistic_cache
+    assert keys[1] not in statistic_module._statistic_cache
+    statistic_module._statistic_cache.clear()
+
+
+def test_statistic_shares_cache(monkeypatch):
+    """Statistic legt die Werte im Cache ab und übernimmt sie von dort (auch für einen anderen Spieler)."""
+    monkeypatch.setattr(statistic_module.config, "STATISTIC_CACHE_SIZE", 10)
+    statistic_module._statistic_cache.clear()
+    hand = parse_cards("RA GK BD SB RZ")
+    combis = build_combinations(hand)
+    pool = [card for card in deck if card not in hand][:15] + hand
+    statistic = Statistic(0)
+    statistic.update(hand, [5, 5, 5, 5], pool)
+    expected = statistic.get_array(combis, (0, 0, 0))
+    assert len(statistic_module._statistic_cache) == 1
+    monkeypatch.setattr(statistic_module, "_calc_values", lambda *args: pytest.fail("Werte wurden neu berechnet"))
+    statistic = Statistic(1)
+    statistic.update(hand, [5, 5, 5, 5], pool)
+    assert np.array_equal(statistic.get_array(combis, (0, 0, 0)), expected)
+    assert np.array_equal(calc_statistic_array(2, hand, combis, [5, 5, 5, 5], (0, 0, 0), pool), expected)
+    statistic_module._statistic_cache.clear()
+
+
+def test_statistic_update(monkeypatch):
+    """Die schrittweise aktualisierte Statistik stimmt nach jedem Zug mit der vollständigen Berechnung überein."""
+    monkeypatch.setattr(statistic_module.config, "STATISTIC_CACHE_SIZE", 0)  # sonst übernimmt Statistic die erwarteten Werte
+    hands = [parse_cards("RA GA SK BK BD GD B9 S9 R8 G3 S6 B5 R4 Ma"),
+             parse_cards("R7 G7 B7 S7 R6 G6 B6 SB GB BB SZ GZ Ph Hu"),
+             parse_cards("RK RD RB RZ R9 G9 B8 S5 G4 B4 S3 R2 G2 B2"),
+             parse_cards("Dr SA BA GK S4 SD BZ B3 G8 S8 R3 G5 R5 S2")]
+    moves = [(1, "R7 G7 B7 S7"), (0, "G3"), (3, "Dr"), (2, "RK RD RB RZ R9"), (1, "Ph"), (0, "RA GA"), (3, "G8 S8 R3")]
+    statistic = Statistic(0)
+    for player, cards in moves:
+        unplayed = [card for hand in hands for card in hand]
+        number_of_cards = [len(hand) for hand in hands]
+        for trick in [(0, 0, 0), (CombinationType.SINGLE, 1, 9)]:
+            combis = build_combinations(hands[0])
+            statistic.update(hands[0], number_of_cards, unplayed)
+            expected = calc_statistic_array(0, hands[0], combis, number_of_cards, trick, unplayed)
+            actual = statistic.get_array(combis, trick)
+            for name in STATISTIC_DTYPE.names:
+                assert actual[name] == pytest.approx(expected[name], abs=1e-12)
+        hands[player] = [card for card in hands[player] if card not in parse_cards(cards)]
+
+
+def _best_quality(combis, action_space, statistic):
+    """Hilfsfunktion: beste Güte unter den kürzesten spielbaren Partitionen (alle Partitionen werden aufgelistet)."""
+    partitions = filter_playable_partitions(list(iter_partitions(combis)), action_space)
+    length = min(len(partition) for partition in partitions)
+    return max(partition_quality(partition, action_space, statistic) for partition in partitions if len(partition) == length), length
+
+
+@pytest.mark.parametrize("hand_str, trick", [
+    ("S5 G5 B5 R5 Dr", (0, 0, 0)),
+    ("Ph RA GK BD SB RZ R9 S9 G8", (0, 0, 0)),
+    ("R9 R8 R7 R6 R5 G5 Hu Ma", (CombinationType.SINGLE, 1, 6)),
+    ("R5 R4 G4 B4 S4 R3 G3 B3 S3 R2 G2 B2 S2 Ph", (0, 0, 0)),
+    ("RA GA SK BK RD GD B9 S9 R8 G7 S6 B5 R4 Ma", (CombinationType.PAIR, 2, 8)),
+])
+def test_build_best_partition(hand_str, trick):
+    """Testet, dass build_best_partition() die Güte der besten kürzesten spielbaren Partition erreicht."""
+    hand = parse_cards(hand_str)
+    combis = build_combinations(hand)
+    unplayed = [card for card in deck if card not in hand][:3 * len(hand)] + hand
+    statistic = calc_statistic(0, hand, combis, [len(hand)] * 4, trick, unplayed)
+    action_space = build_action_space(combis, trick, 0)
+    q, length = _best_quality(combis, action_space, statistic)
+    partition = build_best_partition(combis, action_space, statistic)
+    assert len(partition) == length
+    assert partition_quality(partition, action_space, statistic) == pytest.approx(q)
+    assert sorted(card for cards, _ in partition for card in cards) == sorted(hand)
+
+
+def test_build_best_partition_not_playable():
+    """Ohne spielbare Kombination gibt es keine beste Partition; mit erschöpftem Zeitbudget gibt es trotzdem eine."""
+    hand = parse_cards("R5 G4 B3 S2")
+    combis = build_combinations(hand)
+    unplayed = [card for card in deck if card not in hand][:12] + hand
+    statistic = calc_statistic(0, hand, combis, [4, 4, 4, 4], (CombinationType.SINGLE, 1, 14), unplayed)
+    assert build_best_partition(combis, build_action_space(combis, (CombinationType.SINGLE, 1, 14), 0), statistic) is None
+    action_space = build_action_space(combis, (0, 0, 0), 0)
+    assert len(build_best_partition(combis, action_space, statistic, time_budget=0)) == 4
+    assert len(build_best_partition(combis, action_space, statistic, max_nodes=0)) == 4
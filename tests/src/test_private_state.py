@@ -1,9 +1,10 @@
 
+import dataclasses
 import pytest
-from unittest.mock import create_autospec, patch
-from src.lib.combinations import CombinationType
+from unittest.mock import patch
 from src.private_state import PrivateState
-from src.lib.cards import parse_cards, CardSuit
+from src.lib.partitions import remove_partitions
+from src.lib.cards import parse_cards, cards_to_mask, CardSuit
 
 
 # Fixture für einen initialisierten PrivateState
@@ -123,65 +124,110 @@ def test_private_state_partitions_property(initial_priv_state):
     assert isinstance(partitions, list)
     # assert len(partitions) > 0 # Erwarte mind. eine Partition für eine normale Hand
     assert priv._partition_cache is partitions
+    assert priv._partition_store.partitions is partitions  # der Cache wird vom Partitionsspeicher geführt
     # assert priv._partitions_aborted is False # Sollte False sein, wenn build_partitions durchläuft
 
     partitions_cached = priv.partitions
     assert partitions_cached is partitions
 
-# -------------------------------------------------
-# test_has_bomb mit drei verschiedene Techniken
+def test_private_state_remove_hand_cards(initial_priv_state):
+    """Testet, ob beim Entfernen von Karten die Caches inkrementell aktualisiert werden."""
+    priv = initial_priv_state
+    priv.hand_cards = parse_cards("S5 G5 S6 S7 S8 R9 RZ")
+    combis = priv.combinations
+    partitions = priv.partitions
+    assert priv._partitions_aborted is False
+
+    priv.remove_hand_cards(parse_cards("S5 G5"))
+    assert priv.hand_cards == parse_cards("RZ R9 S8 S7 S6")
+    assert priv.hand_mask == cards_to_mask(parse_cards("RZ R9 S8 S7 S6"))
+    # die verbleibenden Kombinationen werden übernommen, nicht neu berechnet
+    assert priv._combination_cache == [combi for combi in combis if not set(parse_cards("S5 G5")).intersection(combi[0])]
+    assert priv._partitions_aborted is False
+    assert sorted(len(partition) for partition in priv._partition_cache) == [1, 5]
+    assert all(sum(len(combi[0]) for combi in partition) == 5 for partition in priv.partitions)
+    assert len(partitions) > len(priv.partitions)
+
+    # nach einem Abbruch der Partitionsberechnung wird neu berechnet
+    priv._partitions_aborted = True
+    priv.remove_hand_cards(parse_cards("RZ"))
+    assert priv._partition_cache == []
+    assert len(priv.partitions) == 1
+    assert priv._partitions_aborted is False
 
-# Variante a) Mit create_autospec ein Mock-Objekt von PrivateState erstellen.
+def test_private_state_partition_store(initial_priv_state):
+    """Testet, ob der Partitionsspeicher mit dem Partitions-Cache synchron bleibt."""
+    priv = initial_priv_state
+    priv.hand_cards = parse_cards("S5 G5 S6 S7 S8 R9 RZ")
+    expected = remove_partitions(priv.partitions, parse_cards("S5 G5"))
+    store = priv.partition_store
+    assert store.partitions is priv.partitions
+    assert priv.partition_store is store
 
-@pytest.mark.parametrize(
-    "combinations, expected",
-    [
-        ([([], (CombinationType.BOMB, 4, 12))], True),
-        ([([], (CombinationType.TRIPLE, 3, 11))], False),
-        ([], False),
-    ],
-)
-def test_has_bomb_with_autospec(combinations, expected):
-    """
-    Test für Property has_bomb.
-    """
-    mock_private_state = create_autospec(PrivateState, instance=True)
-    type(mock_private_state).combinations = combinations
-    type(mock_private_state).has_bomb = PrivateState.has_bomb
-    assert mock_private_state.has_bomb is expected
+    priv.remove_hand_cards(parse_cards("S5 G5"))
+    assert priv.partition_store is store  # wurde inkrementell aktualisiert
+    assert priv.partitions is store.partitions
+    assert priv.partitions == expected
 
-# Variante b) Mock-Klasse durch Vererbung erstellen
+    priv.hand_cards = []
+    assert len(priv.partition_store) == 0
 
-class MockPrivateState(PrivateState):
-    def __init__(self, combinations):
-        self.hand_cards = []
-        self._combination_cache = combinations or []
+# -------------------------------------------------
+# test_has_bomb
 
 @pytest.mark.parametrize(
-    "combinations, expected",
+    "hand, expected",
     [
-        ([([], (CombinationType.BOMB, 4, 12))], True),
-        ([([], (CombinationType.TRIPLE, 3, 11))], False),
-        ([], False),
+        ("S5 G5 B5 R5 Dr", True),  # 4er-Bombe
+        ("S9 S8 S7 S6 S5 Ph", True),  # Farbbombe
+        ("SA SK SD SB Dr", False),  # der Drache zählt nicht als Farbkarte
+        ("S9 S8 S7 S6 G5", False),  # Straße in zwei Farben
+        ("S5 G5 B5 Ph", False),  # der Phönix ersetzt keine Bombenkarte
+        ("", False),
     ],
 )
-def test_has_bomb_with_mock_class(combinations, expected):
+def test_has_bomb(hand, expected):
     """
     Test für Property has_bomb.
     """
-    state = MockPrivateState(combinations)
-    assert state.has_bomb == expected
+    priv = PrivateState(player_index=1)
+    priv.hand_cards = parse_cards(hand)
+    assert priv.has_bomb is expected
 
 @patch("src.private_state.build_combinations")
-def test_has_bomb_with_mocked_build_partitions(mock_build_combinations):
+def test_has_bomb_without_combinations(mock_build_combinations):
     """
     Test für Property has_bomb.
-    Variante c) build_partitions patchen.
+    Die Kombinationsmöglichkeiten werden dafür nicht berechnet.
+    """
+    priv = PrivateState(player_index=1)
+    priv.hand_cards = parse_cards("S5 G5 B5 R5 Dr")
+    assert priv.has_bomb is True
+    mock_build_combinations.assert_not_called()
+
+def test_has_bomb_after_remove_hand_cards():
+    """
+    Test für Property has_bomb nach dem Entfernen von Karten.
     """
-    mock_build_combinations.return_value = [([], (CombinationType.BOMB, 4, 12))]
     priv = PrivateState(player_index=1)
-    priv._hand_cards = [(2,2)]
+    priv.hand_cards = parse_cards("S5 G5 B5 R5 G9 G8 G7 G6 Dr")
+    assert priv.has_bomb is True
+    priv.remove_hand_cards(parse_cards("S5"))
+    assert priv.has_bomb is True  # Farbbombe G9-G5 bleibt
+    priv.remove_hand_cards(parse_cards("G7"))
+    assert priv.has_bomb is False
+
+def test_has_bomb_with_hand_cards_field():
+    """
+    Test für Property has_bomb und hand_mask, wenn die Handkarten im Konstruktor bzw. mit dataclasses.replace() gesetzt werden.
+    """
+    hand = parse_cards("S5 G5 B5 R5 Dr")
+    priv = PrivateState(player_index=1, _hand_cards=hand)
+    assert priv.hand_mask == cards_to_mask(hand)
     assert priv.has_bomb is True
+    priv = dataclasses.replace(priv, _hand_cards=parse_cards("S5 G5"))
+    assert priv.hand_mask == cards_to_mask(parse_cards("S5 G5"))
+    assert priv.has_bomb is False
 
 # -------------------------------------------------------
 # Alte Tests (ursprünglich mit unittest geschrieben)
@@ -1,6 +1,7 @@
+import dataclasses
 import pytest
 
-from src.lib.cards import CardSuit
+from src.lib.cards import CardSuit, cards_to_mask, parse_cards
 from src.public_state import PublicState
 from src.lib.combinations import CombinationType
 
@@ -70,6 +71,16 @@ def test_public_state_to_dict(initial_pub_state):
     # Prüfe den zweiten Spielzug (Passen)
     assert pub_dict["tricks"][0][1] == (1, [], (CombinationType.PASS, 0, 0))
 
+def test_public_state_played_mask():
+    """played_mask wird aus den gespielten Karten abgeleitet (auch bei dataclasses.replace())."""
+    played = parse_cards("S5 G5 Dr")
+    pub = PublicState(table_name="TestTable", player_names=["Alice", "Bob", "Charlie", "David"], played_cards=played)
+    assert pub.played_mask == cards_to_mask(played)
+    assert len(pub.unplayed_cards) == 53
+    assert pub.to_dict()["played_mask"] == cards_to_mask(played)
+    pub = dataclasses.replace(pub, played_cards=played[:1])
+    assert pub.played_mask == cards_to_mask(played[:1])
+
 def test_public_state_count_active_players(initial_pub_state):
     """Testet die Zählung aktiver Spieler."""
     pub = initial_pub_state